@@ -5,6 +5,7 @@ import sqlite3
 import os
 import sys
 from pathlib import Path
+from db_writer import connect
 
 def resource_path(relative_path):
     """ Get absolute path to resource, works for dev and for PyInstaller """
@@ -16,8 +17,8 @@ base_dir = Path.home() / 'Library' / 'Application Support' / 'RemindEnchanted'
 base_dir.mkdir(parents=True, exist_ok=True)
 db_path = base_dir / 'regular_data.db'
 
-# Connect to the database
-conn = sqlite3.connect(db_path, check_same_thread=False)
+# Connect to the database (switching it to WAL mode, which is stored in the file)
+conn = connect(db_path, check_same_thread=False)
 cursor = conn.cursor()
 
 # Create the table for images with columns for date, time, and image_path
@@ -45,8 +46,7 @@ CREATE TABLE IF NOT EXISTS transcriptions (
 )
 ''')
 
-# Add indexes to optimize searches
-cursor.execute("CREATE INDEX IF NOT EXISTS idx_images_metadata ON images (metadata)")
+# Add indexes to optimize searches (the OCR text is searched through the FTS5 index in lexical_index.py)
 cursor.execute("CREATE INDEX IF NOT EXISTS idx_images_date ON images (date)")
 cursor.execute("CREATE INDEX IF NOT EXISTS idx_images_time ON images (time)")
 cursor.execute("CREATE INDEX IF NOT EXISTS idx_transcriptions_transcription ON transcriptions (transcription)")
@@ -0,0 +1,89 @@
+# Purpose: This module keeps the documents accepted by swift.py's bulk /add endpoint in a durable SQLite queue until they are embedded into the vector store, so a client gets their ids back at once and nothing accepted is lost if the server stops before indexing them.
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+# Define the queue database path
+base_dir = Path.home() / 'Library' / 'Application Support' / 'RemindEnchanted'
+add_queue_path = base_dir / 'add_queue.db'
+
+# Failed indexing attempts after which a document is marked failed
+ADD_MAX_ATTEMPTS = 5
+
+class AddQueue:
+    """Documents waiting to be indexed, and the outcome of those that were.
+
+    status is "queued" until the document is in the vector store ("indexed") or has failed
+    ADD_MAX_ATTEMPTS times ("failed").
+    """
+
+    def __init__(self, path=add_queue_path):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS documents (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            id TEXT UNIQUE,
+            text TEXT,
+            metadata TEXT,
+            status TEXT,
+            attempts INTEGER DEFAULT 0,
+            error TEXT,
+            queued_at REAL,
+            indexed_at REAL
+        )
+        ''')
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_queued ON documents(seq) WHERE status = 'queued'")
+        self.conn.commit()
+
+    def enqueue(self, documents):
+        """Queue (id, text, metadata) triples in one transaction."""
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT INTO documents (id, text, metadata, status, queued_at) VALUES (?, ?, ?, 'queued', ?)",
+                                  [(doc_id, text, json.dumps(metadata), now) for doc_id, text, metadata in documents])
+
+    def next_batch(self, limit):
+        """Return up to limit queued (id, text, metadata) triples, oldest first."""
+        with self.lock:
+            rows = self.conn.execute("SELECT id, text, metadata FROM documents WHERE status = 'queued' ORDER BY seq LIMIT ?",
+                                     (limit,)).fetchall()
+        return [(doc_id, text, json.loads(metadata)) for doc_id, text, metadata in rows]
+
+    def mark_indexed(self, ids):
+        with self.lock, self.conn:
+            self.conn.executemany("UPDATE documents SET status = 'indexed', error = NULL, indexed_at = ? WHERE id = ?",
+                                  [(time.time(), doc_id) for doc_id in ids])
+
+    def mark_failed(self, ids, error):
+        """Count a failed attempt for the documents; those out of attempts are marked failed."""
+        with self.lock, self.conn:
+            self.conn.executemany("UPDATE documents SET attempts = attempts + 1, error = ?, status = CASE WHEN "
+                                  "attempts + 1 >= ? THEN 'failed' ELSE status END WHERE id = ?",
+                                  [(str(error), ADD_MAX_ATTEMPTS, doc_id) for doc_id in ids])
+
+    def status(self, ids):
+        """Return {id: {"status", "error", "queued_at", "indexed_at"}} for the known ids."""
+        ids = list(ids)
+        found = {}
+        with self.lock:
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                for doc_id, status, error, queued_at, indexed_at in self.conn.execute(
+                        f"SELECT id, status, error, queued_at, indexed_at FROM documents WHERE id IN "
+                        f"({', '.join('?' * len(chunk))})", chunk):
+                    found[doc_id] = {"status": status, "error": error, "queued_at": queued_at, "indexed_at": indexed_at}
+        return found
+
+    def counts(self):
+        """Return the number of documents in each status."""
+        with self.lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM documents GROUP BY status").fetchall())
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -1,11 +1,17 @@
 import json
 import os
+import sqlite3
+import time
+from datetime import datetime
 from pathlib import Path
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import OllamaEmbeddings
 from langchain.schema import Document
 import logging
+from transcript_log import load_cursor, read_entries, save_cursor
+from embedding_cache import CachedEmbeddings, EmbeddingCache
+from sessions import build_sessions, chunk_text, session_is_open, session_text
+from lexical_index import LexicalIndex
+from answer_cache import AnswerCache, document_span
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -14,70 +20,144 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 base_dir = Path.home() / 'Library' / 'Application Support' / 'RemindEnchanted'
 base_dir.mkdir(parents=True, exist_ok=True)
 
-json_file_path = base_dir / 'new_texts.json'
-processed_ids_path = base_dir / 'processed_ids.json'
+# Name under which this reader's position in the transcript log is saved
+cursor_name = 'adding_vectore'
+ledger_path = base_dir / 'vector_ledger.db'
 persist_directory = base_dir / 'vectoreDB'
 
-def load_processed_ids():
-    if processed_ids_path.exists():
-        with open(processed_ids_path, 'r') as f:
-            return set(json.load(f))
-    return set()
-
-def save_processed_ids(processed_ids):
-    with open(processed_ids_path, 'w') as f:
-        json.dump(list(processed_ids), f)
-
-def process_new_documents():
-    processed_ids = load_processed_ids()
-    embedding_model = OllamaEmbeddings(model='nomic-embed-text')
-    
-    # Load or create vectorstore
-    if persist_directory.exists():
-        logging.info("Loading existing vector store")
-        vectorstore = Chroma(persist_directory=str(persist_directory), embedding_function=embedding_model)
-    else:
-        logging.info("Creating new vector store")
-        vectorstore = Chroma(embedding_function=embedding_model, persist_directory=str(persist_directory))
-
-    # Load and process new documents
-    if not json_file_path.exists():
-        logging.warning(f"JSON file not found: {json_file_path}")
-        return
-
-    with open(json_file_path, 'r') as f:
-        data = json.load(f)
-
-    new_docs = []
-    new_ids = set()
-    for entry in data:
-        date = entry['date']
-        for item in entry['entries']:
-            doc_id = f"{date}-{item['time']}"
-            if doc_id not in processed_ids:
-                text = f"Date: {date}, Time: {item['time']}\n{item['text']}"
-                new_docs.append(Document(page_content=text, metadata={"id": doc_id, "date": date, "time": item['time']}))
-                new_ids.add(doc_id)
-
-    if new_docs:
-        # Split documents into chunks
-        text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(chunk_size=4500, chunk_overlap=1000)
-        doc_splits = text_splitter.split_documents(new_docs)
-
-        # Add new documents to vectorstore
-        vectorstore.add_documents(doc_splits)
-        vectorstore.persist()
+# Texts per embedding batch, and batches sent to the embedding server at the same time
+EMBED_BATCH_SIZE = 16
+EMBED_CONCURRENCY = 4
+
+class IndexedLedger:
+    """The transcript entries already in the vector store, keyed by their entry id (the images row id,
+    unique per capture), with the session each was indexed in.
+
+    Entries of the session still in progress are kept as pending until it closes, so the log
+    cursor can move past them.
+    """
+
+    def __init__(self, path=ledger_path):
+        self.conn = sqlite3.connect(str(path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS indexed_entries (
+            entry_id INTEGER PRIMARY KEY,
+            session_id INTEGER,
+            indexed_at REAL
+        )
+        ''')
+        self.conn.execute("CREATE TABLE IF NOT EXISTS pending_entries (entry_id INTEGER PRIMARY KEY, entry TEXT)")
+        self.conn.commit()
+
+    def unindexed(self, entry_ids):
+        """Return the ids among entry_ids that are not in the vector store yet."""
+        entry_ids = list(entry_ids)
+        indexed = set()
+        for start in range(0, len(entry_ids), 500):
+            chunk = entry_ids[start:start + 500]
+            indexed.update(row[0] for row in self.conn.execute(
+                f"SELECT entry_id FROM indexed_entries WHERE entry_id IN ({', '.join('?' * len(chunk))})", chunk))
+        return [entry_id for entry_id in entry_ids if entry_id not in indexed]
+
+    def pending(self):
+        """Return the entries of the session still in progress, in capture order."""
+        return [json.loads(row[0]) for row in self.conn.execute("SELECT entry FROM pending_entries ORDER BY entry_id")]
+
+    def record(self, sessions, pending_entries):
+        """Record the entries of the indexed sessions and replace the pending entries, in one transaction."""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO indexed_entries VALUES (?, ?, ?)",
+                                  [(entry['id'], session['entries'][0]['id'], now)
+                                   for session in sessions for entry in session['entries']])
+            self.conn.execute("DELETE FROM pending_entries")
+            self.conn.executemany("INSERT INTO pending_entries VALUES (?, ?)",
+                                  [(entry['id'], json.dumps(entry)) for entry in pending_entries])
 
-        # Update processed IDs
-        processed_ids.update(new_ids)
-        save_processed_ids(processed_ids)
+# Warm handles, built once per process and reused by every run
+embedding_model = None
+vectorstore = None
+lexical_index = None
+answer_cache = None
+ledger = None
 
-        logging.info(f"Processed and added {len(new_docs)} new documents to the vector store")
+def open_vectorstore():
+    """Build the embedding model, the vector store, the full-text index and the answer cache on first use."""
+    global embedding_model, vectorstore, lexical_index, answer_cache
+    if vectorstore is None:
+        embedding_model = CachedEmbeddings(model='nomic-embed-text', batch_size=EMBED_BATCH_SIZE,
+                                           concurrency=EMBED_CONCURRENCY, cache=EmbeddingCache())
+
+        # Load or create vectorstore
+        if persist_directory.exists():
+            logging.info("Loading existing vector store")
+            vectorstore = Chroma(persist_directory=str(persist_directory), embedding_function=embedding_model)
+        else:
+            logging.info("Creating new vector store")
+            vectorstore = Chroma(embedding_function=embedding_model, persist_directory=str(persist_directory))
+        lexical_index = LexicalIndex()
+        answer_cache = AnswerCache()
+    return vectorstore
+
+def session_document(session, text):
+    first, last = session['entries'][0], session['entries'][-1]
+    metadata = {"id": first['id'], "date": first['date'], "time": first['time'], "start_time": first['time'],
+                "end_time": last['time'], "entries": len(session['entries'])}
+    if session['start'] is not None:
+        # Epoch seconds for range filters in swift.py; times have minute resolution, so the end covers its minute
+        metadata['timestamp'] = session['start'].timestamp()
+        metadata['end_timestamp'] = session['end'].timestamp() + 59
+    return Document(page_content=text, metadata=metadata)
+
+def process_new_documents(now=None):
+    """Add the activity sessions closed since the last run to the vector store; returns how many were added.
+
+    New log entries are grouped with the pending ones into sessions. Every session but a last
+    one still in progress is embedded once, as token-budgeted chunks; the entries of the one in
+    progress become the new pending entries.
+    """
+    global ledger
+    now = now or datetime.now()
+    # Load the entries appended to the transcript log since the last run
+    entries, cursor = read_entries(load_cursor(cursor_name))
+    if ledger is None:
+        ledger = IndexedLedger()
+    pending = ledger.pending()
+    if not entries and not pending:
+        return 0
+
+    pending_ids = {entry['id'] for entry in pending}
+    unindexed = set(ledger.unindexed(entry['id'] for entry in entries if entry['id'] not in pending_ids))
+    sessions = build_sessions(pending + [entry for entry in entries if entry['id'] in unindexed])
+    still_open = sessions[-1]['entries'] if sessions and session_is_open(sessions[-1], now) else []
+    closed = sessions[:-1] if still_open else sessions
+
+    if closed:
+        # Chunk ids derive from the session's first entry id, so adding a session again after a
+        # crash (before the ledger commit) replaces its chunks instead of duplicating them
+        open_vectorstore()
+        chunks, chunk_ids = [], []
+        for session in closed:
+            for index, text in enumerate(chunk_text(session_text(session))):
+                chunks.append(session_document(session, text))
+                chunk_ids.append(f"session-{session['entries'][0]['id']}-{index}")
+
+        # Add new documents to vectorstore and the full-text index, then record them in the ledger
+        vectorstore.add_documents(chunks, ids=chunk_ids)
+        vectorstore.persist()
+        lexical_index.add(chunk_ids, [chunk.page_content for chunk in chunks], [chunk.metadata for chunk in chunks])
+        # Cached answers about these sessions' time no longer see everything there is
+        answer_cache.invalidate({document_span(chunk.metadata) for chunk in chunks})
+        logging.info(f"Added {len(closed)} sessions ({sum(len(session['entries']) for session in closed)} entries, "
+                     f"{len(chunks)} chunks) to the vector store")
     else:
-        logging.info("No new documents to process")
+        logging.info("No finished sessions to process")
+    ledger.record(closed, still_open)
 
-    # Optional: Remove the JSON file after processing
-    # os.remove(json_file_path)
+    # Only move past the entries once they are in the vector store or pending
+    save_cursor(cursor_name, cursor)
+    return len(closed)
 
 if __name__ == "__main__":
     process_new_documents()
\ No newline at end of file
@@ -0,0 +1,152 @@
+# Purpose: This module bounds the load swift.py puts on the LLM server: at most a fixed number of generations run at a time, a bounded number of requests wait for one, and further requests are turned away with a Retry-After estimate instead of queueing unseen inside Ollama. Every admitted request carries a deadline.
+
+import math
+import threading
+import time
+
+# LLM generations running at the same time, requests allowed to wait for one, and seconds a request may take
+MAX_GENERATIONS = 2
+MAX_QUEUED = 8
+QUERY_DEADLINE = 120.0
+
+class Overloaded(Exception):
+    """Raised when the admission queue is full; retry_after is the suggested wait in seconds."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Too many queries in progress, retry in {retry_after} s")
+        self.retry_after = retry_after
+
+class DeadlineExceeded(Exception):
+    """Raised when a request runs past its deadline."""
+
+class GenerationLimiter:
+    """Admission control for LLM generations.
+
+    admit() takes a request in while fewer than max_generations + max_queued are, and
+    returns its Admission; the request then holds one of max_generations slots for each
+    LLM call it makes. Generation times are averaged to estimate Retry-After.
+    """
+
+    def __init__(self, max_generations=MAX_GENERATIONS, max_queued=MAX_QUEUED, deadline=QUERY_DEADLINE):
+        self.max_generations = max_generations
+        self.max_queued = max_queued
+        self.deadline = deadline
+        self.slots = threading.BoundedSemaphore(max_generations)
+        self.lock = threading.Lock()
+        self.admitted = 0
+        self.generating = 0
+        self.abandoned = 0  # Generations still running for requests that have ended
+        self.average_generation = 5.0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def admit(self, deadline=None):
+        """Return an Admission for a new request, or raise Overloaded when the queue is full."""
+        with self.lock:
+            if self.admitted >= self.max_generations + self.max_queued:
+                self.rejected += 1
+                raise Overloaded(self.retry_after())
+            self.admitted += 1
+        return Admission(self, time.monotonic() + (deadline or self.deadline))
+
+    def retry_after(self):
+        """Seconds until a place frees up, if the requests ahead drain at the average generation time."""
+        waiting = max(self.admitted + self.abandoned - self.max_generations, 0) + 1
+        return max(1, math.ceil(self.average_generation * waiting / self.max_generations))
+
+    def record_generation(self, seconds):
+        with self.lock:
+            self.average_generation = 0.8 * self.average_generation + 0.2 * seconds
+
+    def stats(self):
+        with self.lock:
+            return {"admitted": self.admitted, "generating": self.generating,
+                    "queued": self.admitted - (self.generating - self.abandoned), "max_generations": self.max_generations,
+                    "max_queued": self.max_queued, "abandoned": self.abandoned, "average_generation": round(self.average_generation, 2),
+                    "rejected": self.rejected, "timed_out": self.timed_out}
+
+class Admission:
+    """One admitted request: its deadline, and the generation slot it holds, if any.
+
+    release() gives both back; it is safe to call more than once.
+    """
+
+    def __init__(self, limiter, deadline):
+        self.limiter = limiter
+        self.deadline = deadline
+        self.holding = False
+        self.detached = False
+        self.released = False
+        self.generation_started = None
+
+    def remaining(self):
+        return self.deadline - time.monotonic()
+
+    def check_deadline(self):
+        if self.remaining() <= 0:
+            with self.limiter.lock:
+                self.limiter.timed_out += 1
+            raise DeadlineExceeded("The query ran past its deadline")
+
+    def wait_for_slot(self, timeout=None):
+        """Wait up to timeout seconds (or the deadline) for a generation slot; returns whether it was taken.
+
+        Raises DeadlineExceeded once the deadline has passed without a slot.
+        """
+        self.check_deadline()
+        wait = self.remaining() if timeout is None else min(timeout, self.remaining())
+        if not self.limiter.slots.acquire(timeout=max(wait, 0)):
+            self.check_deadline()
+            return False
+        self.holding = True
+        self.generation_started = time.monotonic()
+        with self.limiter.lock:
+            self.limiter.generating += 1
+        return True
+
+    def release_slot(self):
+        if self.holding:
+            self.holding = False
+            self.limiter.record_generation(time.monotonic() - self.generation_started)
+            with self.limiter.lock:
+                self.limiter.generating -= 1
+            self.limiter.slots.release()
+
+    def detach_slot(self):
+        """Hand the generation slot over to the thread running the generation.
+
+        Returns a function that gives the slot back, to be called once the generation has
+        really ended; the admission no longer holds it, so a request that gives up at its
+        deadline does not free a slot Ollama is still working in.
+        """
+        if not self.holding:
+            return lambda: None
+        self.holding = False
+        with self.limiter.lock:
+            self.detached = True
+        started = self.generation_started
+
+        def free_slot():
+            self.limiter.record_generation(time.monotonic() - started)
+            with self.limiter.lock:
+                self.limiter.generating -= 1
+                self.detached = False
+                if self.released:
+                    self.limiter.abandoned -= 1
+            self.limiter.slots.release()
+        return free_slot
+
+    def release(self):
+        self.release_slot()
+        with self.limiter.lock:
+            if not self.released:
+                self.released = True
+                self.limiter.admitted -= 1
+                if self.detached:
+                    self.limiter.abandoned += 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
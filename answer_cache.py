@@ -0,0 +1,176 @@
+# Purpose: This module caches chat answers so a repeated recall question skips retrieval and generation. Answers are found by their normalized question and time window, or by the embedding of a close rewording asked about the same window. They expire after a TTL, the least recently used go first when the cache is full, and writing documents to the vector store drops exactly the answers whose window they fall in. The cache is an SQLite file, so the pipeline daemon's writes invalidate the answers swift.py serves.
+
+import json
+import math
+import re
+import sqlite3
+import threading
+import time
+import logging
+from array import array
+from pathlib import Path
+import numpy as np
+
+# Define the cache database path
+base_dir = Path.home() / 'Library' / 'Application Support' / 'RemindEnchanted'
+answer_cache_path = base_dir / 'answer_cache.db'
+
+# Seconds an answer is served for, and answers kept
+ANSWER_CACHE_TTL = 6 * 3600
+ANSWER_CACHE_SIZE = 512
+# Cosine similarity above which another question about the same window counts as the same question
+ANSWER_SIMILARITY = 0.95
+
+# The window of a question without a time range, and the span of a document without timestamps: the
+# latter only overlaps the former, as only searches without a time range can return such a document
+ALL_TIME = (0.0, math.inf)
+UNDATED = (math.inf, math.inf)
+
+def normalize_query(question):
+    """Lowercase a question, drop its punctuation and collapse its whitespace."""
+    return " ".join(re.findall(r"[\w'-]+", question.lower()))
+
+def window_of(time_range):
+    """Return the (start, end) epoch seconds of a TimeRange, or ALL_TIME for None."""
+    if time_range is None:
+        return ALL_TIME
+    return time_range.start.timestamp(), time_range.end.timestamp()
+
+def document_span(metadata):
+    """Return the (start, end) epoch seconds a stored document covers, from its metadata."""
+    if metadata.get('timestamp') is None:
+        return UNDATED
+    return metadata['timestamp'], metadata.get('end_timestamp', metadata['timestamp'])
+
+class AnswerCache:
+    """Answers stored in SQLite by normalized question and window.
+
+    Keys round the window to the minute, the resolution of the capture times, so that "the
+    last two hours" asked twice within a minute is the same question. Writes are recorded
+    for a TTL as well, so an answer whose retrieval started before a write to its window is
+    not stored.
+    """
+
+    def __init__(self, path=answer_cache_path, ttl=ANSWER_CACHE_TTL, max_entries=ANSWER_CACHE_SIZE,
+                 similarity=ANSWER_SIMILARITY):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS answers (
+            key TEXT PRIMARY KEY,
+            window_key TEXT,
+            window_start REAL,
+            window_end REAL,
+            embedding BLOB,
+            answer TEXT,
+            context TEXT,
+            created_at REAL,
+            used_at REAL
+        )
+        ''')
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_window ON answers(window_key)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_used_at ON answers(used_at)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS writes (written_at REAL, span_start REAL, span_end REAL)")
+        self.conn.commit()
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.invalidated = 0
+
+    @staticmethod
+    def window_key(window):
+        return "|".join("all" if math.isinf(bound) else str(int(bound // 60)) for bound in window)
+
+    def lookup(self, question, time_range, embedding=None):
+        """Return the cached (answer, context) for a question about a time range, or None.
+
+        The normalized question is looked up first; if it is not cached and the question's
+        embedding is given, the most similar question cached for the same window is used
+        when it is close enough.
+        """
+        window_key = self.window_key(window_of(time_range))
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute("SELECT key, answer, context FROM answers WHERE key = ? AND created_at > ?",
+                                    (f"{window_key}|{normalize_query(question)}", now - self.ttl)).fetchone()
+            if row is None and embedding is not None:
+                row = self.most_similar(window_key, embedding, now)
+                if row is not None:
+                    self.similar_hits += 1
+            elif row is not None:
+                self.hits += 1
+            if row is None:
+                self.misses += 1
+                return None
+            with self.conn:
+                self.conn.execute("UPDATE answers SET used_at = ? WHERE key = ?", (now, row[0]))
+        return row[1], json.loads(row[2])
+
+    def most_similar(self, window_key, embedding, now):
+        rows = self.conn.execute("SELECT key, answer, context, embedding FROM answers "
+                                 "WHERE window_key = ? AND created_at > ? AND embedding IS NOT NULL",
+                                 (window_key, now - self.ttl)).fetchall()
+        if not rows:
+            return None
+        query = np.asarray(embedding, dtype=np.float32)
+        vectors = np.stack([np.frombuffer(row[3], dtype=np.float32) for row in rows])
+        scores = vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query) + 1e-12)
+        best = int(np.argmax(scores))
+        return rows[best][:3] if scores[best] >= self.similarity else None
+
+    def store(self, question, time_range, answer, context, embedding=None, retrieved_at=None):
+        """Cache an answer; returns False if documents were written to its window since retrieved_at.
+
+        The least recently used answers beyond max_entries are dropped.
+        """
+        window = window_of(time_range)
+        window_key = self.window_key(window)
+        now = time.time()
+        blob = array('f', embedding).tobytes() if embedding is not None else None
+        with self.lock, self.conn:
+            if retrieved_at is not None and self.conn.execute(
+                    "SELECT 1 FROM writes WHERE written_at >= ? AND span_start <= ? AND span_end >= ? LIMIT 1",
+                    (retrieved_at, window[1], window[0])).fetchone():
+                return False
+            self.conn.execute("INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                              (f"{window_key}|{normalize_query(question)}", window_key, window[0], window[1], blob,
+                               answer, json.dumps(context), now, now))
+            self.conn.execute("DELETE FROM answers WHERE created_at <= ?", (now - self.ttl,))
+            self.conn.execute("DELETE FROM answers WHERE key IN (SELECT key FROM answers ORDER BY used_at DESC "
+                              "LIMIT -1 OFFSET ?)", (self.max_entries,))
+        return True
+
+    def invalidate(self, spans):
+        """Drop the answers whose window overlaps any of the (start, end) spans of newly written documents.
+
+        Returns how many were dropped.
+        """
+        spans = list(spans)
+        if not spans:
+            return 0
+        now = time.time()
+        with self.lock, self.conn:
+            dropped = sum(self.conn.execute("DELETE FROM answers WHERE window_start <= ? AND window_end >= ?",
+                                            (end, start)).rowcount for start, end in spans)
+            self.conn.executemany("INSERT INTO writes VALUES (?, ?, ?)", [(now, start, end) for start, end in spans])
+            self.conn.execute("DELETE FROM writes WHERE written_at <= ?", (now - self.ttl,))
+            self.invalidated += dropped
+        if dropped:
+            logging.info(f"Dropped {dropped} cached answers covering new documents")
+        return dropped
+
+    def stats(self):
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+            lookups = self.hits + self.similar_hits + self.misses
+            return {"hits": self.hits, "similar_hits": self.similar_hits, "misses": self.misses,
+                    "hit_rate": (self.hits + self.similar_hits) / lookups if lookups else 0.0,
+                    "invalidated": self.invalidated, "entries": entries}
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,55 @@
+# Purpose: This module builds the prompt that answers a chat question from retrieved documents: it packs the most relevant documents into a token budget and wraps them with the question once, and times the stages of answering a query.
+
+import time
+from sessions import chunk_text, count_tokens
+
+# Tokens of retrieved context sent to the LLM with a question
+CONTEXT_TOKEN_BUDGET = 3000
+
+ANSWER_PROMPT = """Given the following context:
+
+{context}
+
+Answer the question: '{question}' by interpreting what the user was likely doing with this information. Answer specifically the question about the specific subject with the context you have and nothing else."""
+
+def pack_context(texts, token_budget=CONTEXT_TOKEN_BUDGET):
+    """Keep the texts that fit in token_budget, most relevant first; returns (texts, tokens).
+
+    Duplicates are dropped and a text that does not fit is skipped in favour of later, shorter
+    ones. If not even the most relevant one fits, it is cut down to the budget.
+    """
+    packed, used, seen = [], 0, set()
+    for text in texts:
+        if text in seen:
+            continue
+        seen.add(text)
+        tokens = count_tokens(text) + 1  # And the newline that separates it from the next one
+        if used + tokens > token_budget:
+            if not packed:
+                packed.append(chunk_text(text, token_budget - 1, 0)[0])
+                used = token_budget
+            continue
+        packed.append(text)
+        used += tokens
+    return packed, used
+
+def build_answer_prompt(question, texts, token_budget=CONTEXT_TOKEN_BUDGET):
+    """Return (prompt, packed texts, prompt tokens) for answering a question from retrieved texts."""
+    packed, _ = pack_context(texts, token_budget)
+    prompt = ANSWER_PROMPT.format(context="\n".join(packed), question=question)
+    return prompt, packed, count_tokens(prompt)
+
+class StageTimer:
+    """Wall-clock time of consecutive stages; mark(name) ends the stage running since the last mark."""
+
+    def __init__(self):
+        self.stages = {}
+        self.last = time.perf_counter()
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.stages[name] = self.stages.get(name, 0.0) + now - self.last
+        self.last = now
+
+    def summary(self):
+        return ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.stages.items())
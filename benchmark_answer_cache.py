@@ -0,0 +1,117 @@
+# Purpose: This script replays a stream of recall questions, with documents written in between, against the /query answer path with and without the answer cache. It reports the hit rate of each cache tier and the mean latency, and checks that no cached answer is stale: each stub answer counts the documents in the question's window, so an answer served after a write to that window without invalidation would differ from a fresh one.
+
+import argparse
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+import numpy as np
+from answer_cache import AnswerCache, document_span, window_of
+from query_router import TimeRange, day_range
+
+QUESTIONS = [
+    ["what was I working on this morning", "What was I working on this morning?", "what was i working on, this morning",
+     "what was I busy with this morning"],
+    ["which documents did I read yesterday", "Which documents did I read yesterday?", "what documents did I read yesterday"],
+    ["what did I do today", "What did I do today?", "what have I done today"],
+    ["what websites did I visit in the last 2 hours", "What websites did I visit in the last 2 hours?",
+     "which websites did I visit in the last 2 hours"],
+    ["what was my last meeting about", "What was my last meeting about?", "what was the last meeting I had about"],
+    ["what was I coding this afternoon", "What was I coding this afternoon?", "what code was I writing this afternoon"],
+]
+
+class StandInEmbedding:
+    """Gives the wordings of one question nearly the same vector and different questions unrelated ones,
+    as a real embedding model scores rewordings."""
+
+    def __init__(self, dimensions=256, seed=0):
+        rng = np.random.default_rng(seed)
+        self.vectors = {}
+        for wordings in QUESTIONS:
+            base = rng.normal(0, 1, dimensions)
+            for wording in wordings:
+                self.vectors[wording] = base + rng.normal(0, 0.1, dimensions)
+
+    def embed(self, question):
+        return self.vectors[question].tolist()
+
+def question_windows(now):
+    """The time range each question refers to, as the router resolves it at `now`."""
+    today = now.date()
+    return [
+        TimeRange(datetime.combine(today, datetime.min.time()) + timedelta(hours=5),
+                  datetime.combine(today, datetime.min.time()) + timedelta(hours=12), "this morning"),
+        day_range(today - timedelta(days=1), today - timedelta(days=1), "yesterday"),
+        day_range(today, today, "today"),
+        TimeRange(now - timedelta(hours=2), now, "last 2 hours"),
+        None,
+        TimeRange(datetime.combine(today, datetime.min.time()) + timedelta(hours=12),
+                  datetime.combine(today, datetime.min.time()) + timedelta(hours=17), "this afternoon"),
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the answer cache on a stream of questions and writes.")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--write-every', type=int, default=10, help="queries between two document writes")
+    parser.add_argument('--embed-ms', type=float, default=5.0)
+    parser.add_argument('--retrieve-ms', type=float, default=20.0)
+    parser.add_argument('--generate-ms', type=float, default=150.0)
+    args = parser.parse_args()
+
+    now = datetime.now().replace(hour=15, minute=30, second=0, microsecond=0)
+    windows = question_windows(now)
+    embedding = StandInEmbedding()
+    rng = random.Random(0)
+    stream = [rng.randrange(len(QUESTIONS)) for _ in range(args.queries)]
+    # Writes land in the current minute most of the time, sometimes earlier in the day
+    writes = [now - timedelta(minutes=rng.choice([0, 0, 0, 30, 200, 500])) for _ in range(args.queries // args.write_every)]
+
+    for use_cache in (False, True):
+        with tempfile.TemporaryDirectory() as folder:
+            cache = AnswerCache(Path(folder) / 'answer_cache.db')
+            documents, latencies, stale = [], [], 0
+
+            def fresh_answer(time_range):
+                start, end = window_of(time_range)
+                return f"{sum(1 for s, e in documents if s <= end and e >= start)} documents"
+
+            for number, index in enumerate(stream):
+                if number and number % args.write_every == 0:
+                    written = writes[number // args.write_every - 1]
+                    metadata = {"timestamp": written.timestamp(), "end_timestamp": written.timestamp() + 59}
+                    documents.append(document_span(metadata))
+                    if use_cache:
+                        cache.invalidate([document_span(metadata)])
+
+                question, time_range = rng.choice(QUESTIONS[index]), windows[index]
+                start = time.perf_counter()
+                time.sleep(args.embed_ms / 1000)
+                vector = embedding.embed(question)
+                cached = cache.lookup(question, time_range, vector) if use_cache else None
+                if cached is None:
+                    time.sleep((args.retrieve_ms + args.generate_ms) / 1000)
+                    answer = fresh_answer(time_range)
+                    if use_cache:
+                        cache.store(question, time_range, answer, [], vector)
+                else:
+                    answer = cached[0]
+                latencies.append(time.perf_counter() - start)
+                stale += answer != fresh_answer(time_range)
+
+            stats = cache.stats()
+            name = "With cache" if use_cache else "No cache"
+            print(f"{name:10}: mean {sum(latencies) / len(latencies) * 1000:.0f} ms per question, "
+                  f"{stats['hits']} exact hits, {stats['similar_hits']} similar hits, {stats['misses']} misses, "
+                  f"{stats['invalidated']} answers invalidated, {stale} stale answers")
+
+            if use_cache:
+                # An answer whose retrieval started before a write to its window must not be cached
+                retrieved_at = time.time()
+                cache.invalidate([document_span({"timestamp": now.timestamp()})])
+                stored = cache.store("what did I do today", windows[2], "0 documents", [], None, retrieved_at)
+                print(f"Answer generated across a write to its window cached: {stored}")
+            cache.close()
+
+if __name__ == "__main__":
+    main()
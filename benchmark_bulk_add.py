@@ -0,0 +1,76 @@
+# Purpose: This script compares adding documents one at a time, as /add does (one embedding request and one vector store write per document, the client waiting for both), with the bulk path: documents acknowledged once queued, then embedded in concurrent batches and written to the vector store once per batch. It runs against the stand-in embedding server of benchmark_embeddings.py and a real Chroma store, and checks that queued documents survive a restart.
+
+import argparse
+import tempfile
+import time
+import uuid
+from pathlib import Path
+import chromadb
+from add_queue import AddQueue
+from benchmark_embeddings import start_stub_server
+from embedding_cache import CachedEmbeddings
+
+def one_by_one(collection, embeddings, documents):
+    """Return the seconds each document made its client wait."""
+    waits = []
+    for doc_id, text, metadata in documents:
+        start = time.perf_counter()
+        collection.add(ids=[doc_id], embeddings=embeddings.embed_documents([text]), documents=[text], metadatas=[metadata])
+        waits.append(time.perf_counter() - start)
+    return waits
+
+def bulk(collection, embeddings, queue, documents, batch_size):
+    """Return (seconds to acknowledge the request, seconds until every document is indexed)."""
+    start = time.perf_counter()
+    queue.enqueue(documents)
+    acknowledged = time.perf_counter() - start
+    while True:
+        batch = queue.next_batch(batch_size)
+        if not batch:
+            break
+        texts = [text for _, text, _ in batch]
+        collection.add(ids=[doc_id for doc_id, _, _ in batch], embeddings=embeddings.embed_documents(texts),
+                       documents=texts, metadatas=[metadata for _, _, metadata in batch])
+        queue.mark_indexed([doc_id for doc_id, _, _ in batch])
+    return acknowledged, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark one-by-one and bulk document adds.")
+    parser.add_argument('--documents', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=0.02, help="seconds the stand-in server takes per request")
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--embed-batch-size', type=int, default=16)
+    parser.add_argument('--concurrency', type=int, default=4)
+    args = parser.parse_args()
+
+    now = time.time()
+    documents = [(f"added-{uuid.uuid4()}", f"Note {i}: meeting notes about project {i % 17}, follow-up on ticket PROJ-{i}",
+                  {"timestamp": now - i * 60, "end_timestamp": now - i * 60}) for i in range(args.documents)]
+    server, base_url = start_stub_server(args.latency)
+
+    with tempfile.TemporaryDirectory() as folder:
+        client = chromadb.PersistentClient(path=str(Path(folder) / 'vectoreDB'))
+
+        sequential = CachedEmbeddings(base_url=base_url, concurrency=1)
+        waits = one_by_one(client.create_collection("one_by_one"), sequential, documents)
+        print(f"One by one: {sum(waits):.2f} s for {args.documents} documents "
+              f"({args.documents / sum(waits):.0f} documents/s), {sum(waits) / len(waits) * 1000:.0f} ms per request")
+
+        queue = AddQueue(Path(folder) / 'add_queue.db')
+        batched = CachedEmbeddings(base_url=base_url, batch_size=args.embed_batch_size, concurrency=args.concurrency)
+        collection = client.create_collection("bulk")
+        acknowledged, indexed = bulk(collection, batched, queue, documents, args.batch_size)
+        print(f"Bulk: acknowledged in {acknowledged * 1000:.0f} ms, all indexed in {indexed:.2f} s "
+              f"({args.documents / indexed:.0f} documents/s), {collection.count()} in the store, "
+              f"statuses {queue.counts()}")
+
+        # Documents queued when the server stops are still queued when it starts again
+        queue.enqueue([(f"added-{uuid.uuid4()}", "queued before a restart", {"timestamp": now})])
+        queue.close()
+        queue = AddQueue(Path(folder) / 'add_queue.db')
+        print(f"After a restart: {len(queue.next_batch(args.batch_size))} document still queued")
+        queue.close()
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
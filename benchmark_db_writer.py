@@ -0,0 +1,53 @@
+# Purpose: This script measures OCR-result insert throughput (rows per second) of the previous connect-insert-commit-close pattern against the long-lived WAL DatabaseWriter with group commits.
+
+import argparse
+import gc
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from db_writer import CREATE_IMAGES_TABLE, INSERT_IMAGE, DatabaseWriter
+
+def sample_row(i):
+    return {"image": None, "text": f"Recognized text of screenshot {i} " * 20, "date": "18 Oct 2026", "time": "10:00"}
+
+def insert_per_row(db_path, rows):
+    """The previous behaviour: a new connection, schema check, insert, commit, close and gc.collect per row."""
+    start = time.perf_counter()
+    for i in range(rows):
+        image_data = sample_row(i)
+        conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        cursor = conn.cursor()
+        cursor.execute(CREATE_IMAGES_TABLE)
+        cursor.execute(INSERT_IMAGE, (image_data['image'], image_data['text'], image_data['date'], image_data['time']))
+        conn.commit()
+        conn.close()
+        gc.collect()
+    return rows / (time.perf_counter() - start)
+
+def insert_with_writer(db_path, rows):
+    """One DatabaseWriter with group commits."""
+    writer = DatabaseWriter(db_path)
+    writer.flush()  # Exclude opening the connection and creating the table
+    start = time.perf_counter()
+    for i in range(rows):
+        writer.insert_image(sample_row(i))
+    writer.flush()
+    elapsed = time.perf_counter() - start
+    writer.close()
+    return rows / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-row SQLite commits against the group-commit writer.")
+    parser.add_argument('--rows', type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        per_row = insert_per_row(Path(folder) / 'per_row.db', args.rows)
+        grouped = insert_with_writer(Path(folder) / 'writer.db', args.rows)
+
+    print(f"Connection and commit per row: {per_row:,.0f} rows/s")
+    print(f"DatabaseWriter (WAL, group commit): {grouped:,.0f} rows/s ({grouped / per_row:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# Purpose: This script measures embedding throughput against a local stand-in for the Ollama embedding server: sequential requests (the old OllamaEmbeddings pattern), concurrent batches, a re-run served from the embedding cache, and recovery from injected server errors.
+
+import argparse
+import hashlib
+import json
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from embedding_cache import CachedEmbeddings, EmbeddingCache
+
+class StubEmbeddingHandler(BaseHTTPRequestHandler):
+    """Answers POST /api/embeddings like Ollama, after a fixed delay, failing every fail_every-th request with a 503."""
+
+    latency = 0.05
+    dimensions = 768
+    fail_every = 0
+    count = 0
+    count_lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        with self.count_lock:
+            type(self).count += 1
+            failing = self.fail_every and self.count % self.fail_every == 0
+        time.sleep(self.latency)
+        if self.path != "/api/embeddings" or failing:
+            self.send_response(404 if self.path != "/api/embeddings" else 503)
+            self.end_headers()
+            return
+
+        seed = hashlib.sha256(body["prompt"].encode('utf-8')).digest()
+        embedding = [seed[i % len(seed)] / 255 for i in range(self.dimensions)]
+        payload = json.dumps({"embedding": embedding}).encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_stub_server(latency, fail_every=0):
+    StubEmbeddingHandler.latency = latency
+    StubEmbeddingHandler.fail_every = fail_every
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubEmbeddingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def timed_embed(embeddings, texts):
+    start = time.perf_counter()
+    vectors = embeddings.embed_documents(texts)
+    return time.perf_counter() - start, vectors
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding throughput against a stand-in embedding server.")
+    parser.add_argument('--texts', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds the stand-in server takes per request")
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--fail-every', type=int, default=7, help="make every n-th request fail in the retry run")
+    args = parser.parse_args()
+
+    texts = [f"Date: 01 Jun 2024, Time: 10:{i % 60:02d}\nScreen text number {i}" for i in range(args.texts)]
+    server, base_url = start_stub_server(args.latency)
+
+    sequential = CachedEmbeddings(base_url=base_url, batch_size=args.texts, concurrency=1)
+    sequential_seconds, expected = timed_embed(sequential, texts)
+    print(f"Sequential: {sequential_seconds:.2f} s ({args.texts / sequential_seconds:.1f} texts/s)")
+
+    with tempfile.TemporaryDirectory() as folder:
+        cache = EmbeddingCache(Path(folder) / 'embedding_cache.db')
+        concurrent = CachedEmbeddings(base_url=base_url, batch_size=args.batch_size,
+                                      concurrency=args.concurrency, cache=cache)
+        concurrent_seconds, vectors = timed_embed(concurrent, texts)
+        print(f"Concurrent ({args.concurrency} x batches of {args.batch_size}): {concurrent_seconds:.2f} s "
+              f"({args.texts / concurrent_seconds:.1f} texts/s)")
+
+        requests = concurrent.requests
+        cached_seconds, cached_vectors = timed_embed(concurrent, texts)
+        print(f"Re-run from the cache: {cached_seconds * 1000:.1f} ms, {concurrent.requests - requests} requests, "
+              f"{concurrent.cache_hits} cache hits")
+        cache.close()
+
+    server.shutdown()
+    server, base_url = start_stub_server(args.latency, args.fail_every)
+    retrying = CachedEmbeddings(base_url=base_url, batch_size=args.batch_size, concurrency=args.concurrency,
+                                backoff=0.05)
+    retry_seconds, retried_vectors = timed_embed(retrying, texts)
+    print(f"With every {args.fail_every}th request failing: {retry_seconds:.2f} s, {retrying.retries} retries")
+    server.shutdown()
+
+    close = all(abs(a - b) < 1e-6 for x, y in zip(expected, cached_vectors) for a, b in zip(x, y))
+    print(f"Results match: {vectors == expected and retried_vectors == expected and close}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# Purpose: This script compares OCR throughput of one recogniser process per image (the old RemindOCR call pattern) against the persistent OCR worker pool, using the stub or EasyOCR backend so it can run on Linux.
+
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from pipeline_db import OCRPool, resource_path
+
+def make_images(folder, count):
+    """Write count small placeholder image files to recognise."""
+    from PIL import Image, ImageDraw
+
+    paths = []
+    for i in range(count):
+        image = Image.new('RGB', (600, 120), 'white')
+        ImageDraw.Draw(image).text((10, 40), f"Screenshot number {i}", fill='black')
+        path = Path(folder) / f"bench_{i}.png"
+        image.save(path)
+        paths.append(path)
+    return paths
+
+def run_spawn_per_image(paths, backend):
+    """Recognise each image in a freshly started worker process, one after another."""
+    start = time.perf_counter()
+    for path in paths:
+        subprocess.run([sys.executable, resource_path('ocr_worker.py'), '--backend', backend, str(path)],
+                       capture_output=True, text=True, check=True)
+    return time.perf_counter() - start
+
+def run_pool(paths, backend, workers, batch_size):
+    """Recognise all images through a warm worker pool."""
+    pool = OCRPool(workers, backend, batch_size)
+    pool.recognize(paths[0])  # Let the workers finish loading before timing
+    start = time.perf_counter()
+    futures = [pool.submit(path) for path in paths]
+    for future in futures:
+        future.result()
+    elapsed = time.perf_counter() - start
+    pool.close()
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark spawn-per-image OCR against the OCR worker pool.")
+    parser.add_argument('--backend', default="stub", choices=["stub", "easyocr"])
+    parser.add_argument('--images', type=int, default=40)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--batch-size', type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        paths = make_images(folder, args.images)
+        spawn_seconds = run_spawn_per_image(paths, args.backend)
+        pool_seconds = run_pool(paths, args.backend, args.workers, args.batch_size)
+
+    print(f"Spawn per image: {spawn_seconds:.2f} s ({args.images / spawn_seconds:.1f} images/s)")
+    print(f"Worker pool ({args.workers} workers, batches of {args.batch_size}): "
+          f"{pool_seconds:.2f} s ({args.images / pool_seconds:.1f} images/s)")
+
+if __name__ == "__main__":
+    main()
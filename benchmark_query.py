@@ -0,0 +1,97 @@
+# Purpose: This script compares the /query answer path before and after the single-retrieval change: the old path searched once, wrapped the context into the question and let RetrievalQA search again with that long text and stuff five more documents; the new one searches once and packs the context to a token budget. Stub embedding, search and LLM stages cost time per token, as local models do, and prompt tokens are counted with the real tokenizer.
+
+import argparse
+import random
+import time
+from answer_context import StageTimer, build_answer_prompt
+from sessions import count_tokens
+
+# The prompt RetrievalQA's "stuff" chain wraps around its documents and question
+STUFF_PROMPT = """Use the following pieces of context to answer the question at the end. If you don't know the answer, just say that you don't know, don't try to make up an answer.
+
+{context}
+
+Question: {question}
+Helpful Answer:"""
+
+OLD_WRAPPER = ("Given the following context: \n\n{context}\n\n Answer the question: '{question}' by interpreting what the "
+               "user was likely doing with this information. Answer specifically the question about the specific subject "
+               "with the context you have and nothing else.")
+
+WORDS = ("editor terminal commit branch invoice meeting calendar browser article python rust notes draft review "
+         "slides budget email chat design ticket deploy").split()
+
+class StubModels:
+    """Embedding, vector search and LLM stand-ins whose cost grows with the tokens they are given."""
+
+    def __init__(self, corpus, embed_ms_per_token, search_ms, prefill_ms_per_token, generate_ms):
+        self.corpus = corpus
+        self.embed_ms_per_token = embed_ms_per_token
+        self.search_ms = search_ms
+        self.prefill_ms_per_token = prefill_ms_per_token
+        self.generate_ms = generate_ms
+
+    def search(self, text, k=5):
+        time.sleep((count_tokens(text) * self.embed_ms_per_token + self.search_ms) / 1000)
+        return random.Random(text).sample(self.corpus, k)
+
+    def generate(self, prompt):
+        time.sleep((count_tokens(prompt) * self.prefill_ms_per_token + self.generate_ms) / 1000)
+        return "answer"
+
+def old_path(models, question):
+    timer = StageTimer()
+    docs = models.search(question)
+    timer.mark("retrieve")
+    wrapped = OLD_WRAPPER.format(context="\n".join(docs), question=question)
+    chain_docs = models.search(wrapped)  # RetrievalQA retrieves again, with the whole wrapped prompt as the query
+    timer.mark("retrieve again")
+    prompt = STUFF_PROMPT.format(context="\n\n".join(chain_docs), question=wrapped)
+    timer.mark("pack")
+    models.generate(prompt)
+    timer.mark("generate")
+    return timer, count_tokens(prompt)
+
+def new_path(models, question):
+    timer = StageTimer()
+    docs = models.search(question)
+    timer.mark("retrieve")
+    prompt, _, prompt_tokens = build_answer_prompt(question, docs)
+    timer.mark("pack")
+    models.generate(prompt)
+    timer.mark("generate")
+    return timer, prompt_tokens
+
+def make_corpus(count, words_per_document, seed=0):
+    rng = random.Random(seed)
+    return [f"Date: 01 Jun 2024, Time: 10:{i % 60:02d} - 10:{(i + 4) % 60:02d}\n"
+            + " ".join(rng.choice(WORDS) for _ in range(words_per_document)) for i in range(count)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the old and new /query answer paths with stub models.")
+    parser.add_argument('--documents', type=int, default=200)
+    parser.add_argument('--words-per-document', type=int, default=400)
+    parser.add_argument('--questions', type=int, default=5)
+    parser.add_argument('--embed-ms-per-token', type=float, default=0.05)
+    parser.add_argument('--search-ms', type=float, default=5.0)
+    parser.add_argument('--prefill-ms-per-token', type=float, default=0.25)
+    parser.add_argument('--generate-ms', type=float, default=500.0)
+    args = parser.parse_args()
+
+    models = StubModels(make_corpus(args.documents, args.words_per_document), args.embed_ms_per_token,
+                        args.search_ms, args.prefill_ms_per_token, args.generate_ms)
+    questions = [f"What was I doing with the {word} yesterday?" for word in WORDS[:args.questions]]
+
+    for name, path in (("Old path", old_path), ("New path", new_path)):
+        totals, tokens = {}, 0
+        for question in questions:
+            timer, prompt_tokens = path(models, question)
+            tokens += prompt_tokens
+            for stage, seconds in timer.stages.items():
+                totals[stage] = totals.get(stage, 0.0) + seconds
+        stages = ", ".join(f"{stage} {seconds / len(questions) * 1000:.0f} ms" for stage, seconds in totals.items())
+        print(f"{name}: {sum(totals.values()) / len(questions) * 1000:.0f} ms per question ({stages}), "
+              f"{tokens // len(questions)} prompt tokens")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# Purpose: This script measures recall@k and latency of vector-only, full-text-only and hybrid (reciprocal rank fusion) retrieval on a synthetic corpus of screen text. The stand-in embedding gives synonyms nearly the same vector, as a real model would, and identifiers (ticket numbers, file names, error codes, URLs) a vector of their own that a long document dilutes.
+
+import argparse
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import numpy as np
+from lexical_index import STOPWORDS, LexicalIndex
+from hybrid_retrieval import reciprocal_rank_fusion, search_within_budget
+
+class StandInEmbedding:
+    """Bag-of-words embedding: the mean of per-word random vectors, with both forms of a concept sharing one.
+
+    Stopwords are left out, as they barely move a real model's embedding.
+    """
+
+    def __init__(self, dimensions=128, seed=0):
+        self.dimensions = dimensions
+        self.rng = np.random.default_rng(seed)
+        self.vectors = {}
+
+    def alias(self, word, other):
+        self.vectors[word] = self.vector(other) + self.rng.normal(0, 0.1, self.dimensions)
+
+    def vector(self, word):
+        if word not in self.vectors:
+            self.vectors[word] = self.rng.normal(0, 1, self.dimensions)
+        return self.vectors[word]
+
+    def embed(self, text):
+        vector = np.mean([self.vector(word) for word in text.lower().split() if word not in STOPWORDS], axis=0)
+        return vector / np.linalg.norm(vector)
+
+def make_identifier(rng, number):
+    return rng.choice([f"PROJ-{number}", f"report_{number}_final.xlsx", f"0x{number * 7919:08x}",
+                       f"wiki.example.com/page/{number}"])
+
+def make_corpus(documents, concepts_per_document, seed=0):
+    """Return (texts, concept words per text, identifier per text, synonym of each concept word)."""
+    rng = random.Random(seed)
+    concepts = [f"concept{i}" for i in range(400)]
+    synonyms = {concept: f"alt{concept[7:]}" for concept in concepts}
+    filler = [f"filler{i}" for i in range(50)]
+
+    texts, doc_concepts, identifiers = [], [], []
+    for number in range(documents):
+        chosen = rng.sample(concepts, concepts_per_document)
+        identifier = make_identifier(rng, number)
+        words = chosen + rng.choices(filler, k=concepts_per_document) + [identifier]
+        rng.shuffle(words)
+        texts.append(" ".join(words))
+        doc_concepts.append(chosen)
+        identifiers.append(identifier)
+    return texts, doc_concepts, identifiers, synonyms
+
+def make_queries(count, doc_concepts, identifiers, synonyms, seed=1):
+    """Return (kind, question, relevant document) triples of three kinds.
+
+    "semantic" paraphrases a document with synonyms, which share no word with it; "identifier"
+    asks about the identifier a document contains; "mixed" combines both.
+    """
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        target = rng.randrange(len(identifiers))
+        paraphrase = " ".join(synonyms[concept] for concept in rng.sample(doc_concepts[target], 6))
+        queries.append(("semantic", f"what was I doing with {paraphrase}", target))
+        queries.append(("identifier", f"what was {identifiers[target]} about", target))
+        short = " ".join(synonyms[concept] for concept in rng.sample(doc_concepts[target], 2))
+        queries.append(("mixed", f"what did I see about {identifiers[target]} and {short}", target))
+    return queries
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vector, full-text and hybrid retrieval on a synthetic corpus.")
+    parser.add_argument('--documents', type=int, default=5000)
+    parser.add_argument('--concepts-per-document', type=int, default=40)
+    parser.add_argument('--queries', type=int, default=100, help="queries of each kind")
+    parser.add_argument('--k', type=int, default=5)
+    args = parser.parse_args()
+
+    texts, doc_concepts, identifiers, synonyms = make_corpus(args.documents, args.concepts_per_document)
+    embedding = StandInEmbedding()
+    for concept, synonym in synonyms.items():
+        embedding.alias(synonym, concept)
+    matrix = np.stack([embedding.embed(text) for text in texts])
+    queries = make_queries(args.queries, doc_concepts, identifiers, synonyms)
+
+    with tempfile.TemporaryDirectory() as folder:
+        index = LexicalIndex(Path(folder) / 'lexical_index.db')
+        index.add([str(i) for i in range(len(texts))], texts, [{"doc": i} for i in range(len(texts))])
+        pool = ThreadPoolExecutor(max_workers=4)
+
+        def vector_search(question):
+            scores = matrix @ embedding.embed(question)
+            top = np.argpartition(-scores, args.k)[:args.k]
+            return [(int(i), int(i)) for i in top[np.argsort(-scores[top])]]
+
+        def text_search(question):
+            return [(metadata["doc"], metadata["doc"]) for _, metadata in index.search(question, args.k)]
+
+        def hybrid_search(question):
+            rankings = search_within_budget(pool, [lambda: vector_search(question), lambda: text_search(question)])
+            return [(doc, doc) for doc in reciprocal_rank_fusion(rankings, args.k)]
+
+        for name, search in (("Vector", vector_search), ("Full-text", text_search), ("Hybrid", hybrid_search)):
+            hits, latencies = {}, []
+            for kind, question, target in queries:
+                start = time.perf_counter()
+                results = [doc for _, doc in search(question)]
+                latencies.append(time.perf_counter() - start)
+                hits.setdefault(kind, []).append(target in results)
+            recall = ", ".join(f"{kind} {sum(found) / len(found):.0%}" for kind, found in hits.items())
+            print(f"{name:9}: recall@{args.k} {recall}; latency p50 {percentile(latencies, 0.5) * 1000:.1f} ms, "
+                  f"p95 {percentile(latencies, 0.95) * 1000:.1f} ms")
+        pool.shutdown()
+        index.close()
+
+if __name__ == "__main__":
+    main()
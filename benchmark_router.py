@@ -0,0 +1,89 @@
+# Purpose: This script measures how long /query spends deciding whether to search and over which dates: the old path asks the LLM twice per question, the router answers locally and only falls back to the LLM when unsure. A stub LLM with a fixed delay stands in for llama3.1.
+
+import argparse
+import time
+from datetime import datetime
+from query_router import route_query
+
+NOW = datetime(2024, 6, 12, 15, 30)  # A Wednesday
+
+# (question, needs a search, expected (start, end) as "%Y-%m-%d %H:%M" or None for no window)
+QUESTIONS = [
+    ("What did I do yesterday?", True, ("2024-06-11 00:00", "2024-06-11 23:59")),
+    ("What was I reading this morning?", True, ("2024-06-12 05:00", "2024-06-12 12:00")),
+    ("Which websites did I visit last Tuesday?", True, ("2024-06-11 00:00", "2024-06-11 23:59")),
+    ("What did I work on last week?", True, ("2024-06-03 00:00", "2024-06-09 23:59")),
+    ("Summarize my meetings from Monday to Wednesday", True, ("2024-06-10 00:00", "2024-06-12 23:59")),
+    ("What was I writing on June 3rd?", True, ("2024-06-03 00:00", "2024-06-03 23:59")),
+    ("What did I watch in the past 3 hours?", True, ("2024-06-12 12:30", "2024-06-12 15:30")),
+    ("Which documents did I open 2 days ago?", True, ("2024-06-10 00:00", "2024-06-10 23:59")),
+    ("What was the email I read today about the invoice?", True, ("2024-06-12 00:00", "2024-06-12 23:59")),
+    ("What project was I on between 2024-05-01 and 2024-05-15?", True, ("2024-05-01 00:00", "2024-05-15 23:59")),
+    ("What did I search for yesterday afternoon?", True, ("2024-06-11 12:00", "2024-06-11 17:00")),
+    ("What was I looking at since Monday?", True, ("2024-06-10 00:00", "2024-06-12 15:30")),
+    ("What did I read from Thursday to Monday?", True, ("2024-06-06 00:00", "2024-06-10 23:59")),
+    ("What was I working on in March?", True, ("2024-03-01 00:00", "2024-03-31 23:59")),
+    ("What was my last message to Paul?", True, None),
+    ("What is the capital of Australia?", False, None),
+    ("Explain how a B-tree works", False, None),
+    ("Translate good morning into Spanish", False, None),
+    ("Who was the first person on the moon?", False, None),
+    ("Summarize the rust article", None, None),
+]
+
+class StubLLM:
+    """Answers every prompt after a fixed delay, as a local model would; it always asks for a search over all dates."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    def __call__(self, prompt):
+        self.calls += 1
+        time.sleep(self.latency)
+        return "SEARCH_REQUIRED" if "SEARCH_REQUIRED" in prompt else "ALL"
+
+def format_range(time_range):
+    if time_range is None:
+        return None
+    return time_range.start.strftime("%Y-%m-%d %H:%M"), time_range.end.strftime("%Y-%m-%d %H:%M")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LLM query routing against the local router.")
+    parser.add_argument('--llm-latency', type=float, default=0.8, help="seconds the stub LLM takes per call")
+    args = parser.parse_args()
+
+    llm = StubLLM(args.llm_latency)
+
+    def classify_with_llm(question):
+        return "SEARCH_REQUIRED" in llm(f"Respond with SEARCH_REQUIRED or GENERAL_KNOWLEDGE.\n\nQuestion: {question}")
+
+    def time_range_with_llm(question):
+        llm(f"Determine the time range.\n\nQuestion: {question}")
+        return None  # The stub answers ALL
+
+    start = time.perf_counter()
+    for question, _, _ in QUESTIONS:
+        if classify_with_llm(question):
+            time_range_with_llm(question)
+    llm_seconds = time.perf_counter() - start
+    llm_calls = llm.calls
+
+    llm.calls = 0
+    correct = 0
+    start = time.perf_counter()
+    for question, needs_search, expected_range in QUESTIONS:
+        routed_search, time_range = route_query(question, classify_with_llm, time_range_with_llm, now=NOW)
+        ok = needs_search is None or (routed_search == needs_search and format_range(time_range) == expected_range)
+        correct += ok
+        if not ok:
+            print(f"Mismatch: {question!r} -> {routed_search}, {format_range(time_range)}")
+    router_seconds = time.perf_counter() - start
+
+    count = len(QUESTIONS)
+    print(f"LLM routing: {llm_seconds / count * 1000:.0f} ms per question, {llm_calls} LLM calls")
+    print(f"Local router: {router_seconds / count * 1000:.1f} ms per question, {llm.calls} LLM fallback calls, "
+          f"{correct}/{count} routed as expected")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# Purpose: This script loads a running swift.py with concurrent chat queries and reports how it holds up: answered, rejected (429) and timed-out queries, latency and time to first token percentiles (p50/p95/p99), the Retry-After values given, and the deepest generation queue seen inside the (stand-in) Ollama server. Start stub_ollama.py, then swift.py with OLLAMA_HOST pointing at it, then this script.
+
+import argparse
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+
+QUESTIONS = ["What was I working on this morning?", "Which documents did I read yesterday?",
+             "What websites did I visit today?", "What was my last meeting about?",
+             "What was I coding this afternoon?", "What did I do in the last 2 hours?"]
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else float('nan')
+
+def run_query(url, question, stream, timeout):
+    """Send one query; returns (outcome, seconds, seconds to the first token, Retry-After)."""
+    body = json.dumps({"query": question}).encode('utf-8')
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    first_token = None
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            if not stream:
+                response.read()
+                return "answered", time.perf_counter() - start, None, None
+            outcome, event = "answered", None
+            for raw in response:
+                line = raw.decode('utf-8').rstrip("\n")
+                if line.startswith("event: "):
+                    event = line[7:]
+                elif event == "token" and first_token is None:
+                    first_token = time.perf_counter() - start
+                elif event == "error" and line.startswith("data: "):
+                    outcome = "timed out" if "deadline" in line else "error"
+            return outcome, time.perf_counter() - start, first_token, None
+    except urllib.error.HTTPError as e:
+        outcome = {429: "rejected", 504: "timed out"}.get(e.code, f"HTTP {e.code}")
+        return outcome, time.perf_counter() - start, None, e.headers.get('Retry-After')
+    except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+        return f"failed ({type(e).__name__})", time.perf_counter() - start, None, None
+
+def main():
+    parser = argparse.ArgumentParser(description="Load a running swift.py with concurrent chat queries.")
+    parser.add_argument('--url', default="http://localhost:8005")
+    parser.add_argument('--ollama-url', default="http://127.0.0.1:11435", help="stub_ollama.py, to sample its queue")
+    parser.add_argument('--clients', type=int, default=16, help="concurrent clients")
+    parser.add_argument('--requests', type=int, default=10, help="queries per client")
+    parser.add_argument('--blocking', action='store_true', help="use /query instead of /query/stream")
+    parser.add_argument('--timeout', type=float, default=300)
+    args = parser.parse_args()
+
+    endpoint = "/query" if args.blocking else "/query/stream"
+    run = int(time.time())
+    results, lock = [], threading.Lock()
+    deepest_queue = [0]
+    running = threading.Event()
+    running.set()
+
+    def client(number):
+        for index in range(args.requests):
+            # Questions differ per run, client and round, so the answer cache does not answer them
+            question = f"{QUESTIONS[(number + index) % len(QUESTIONS)]} (run {run}, client {number}, round {index})"
+            result = run_query(args.url + endpoint, question, not args.blocking, args.timeout)
+            with lock:
+                results.append(result)
+            if result[0] == "rejected" and result[3]:
+                time.sleep(int(result[3]))  # A well-behaved client waits as told
+
+    def sample_ollama_queue():
+        while running.is_set():
+            try:
+                with urllib.request.urlopen(f"{args.ollama_url}/stats", timeout=1) as response:
+                    deepest_queue[0] = max(deepest_queue[0], json.load(response)["waiting"])
+            except (urllib.error.URLError, TimeoutError, ConnectionError):
+                pass
+            time.sleep(0.1)
+
+    sampler = threading.Thread(target=sample_ollama_queue, daemon=True)
+    sampler.start()
+    start = time.perf_counter()
+    clients = [threading.Thread(target=client, args=(number,)) for number in range(args.clients)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    running.clear()
+
+    outcomes = Counter(outcome for outcome, _, _, _ in results)
+    latencies = [seconds for outcome, seconds, _, _ in results if outcome == "answered"]
+    first_tokens = [first for outcome, _, first, _ in results if outcome == "answered" and first is not None]
+    retry_after = [int(value) for outcome, _, _, value in results if outcome == "rejected" and value]
+    print(f"{len(results)} queries from {args.clients} clients to {endpoint} in {elapsed:.1f} s: "
+          + ", ".join(f"{count} {outcome}" for outcome, count in outcomes.most_common()))
+    print(f"Latency of answered queries: p50 {percentile(latencies, 0.5):.2f} s, p95 {percentile(latencies, 0.95):.2f} s, "
+          f"p99 {percentile(latencies, 0.99):.2f} s")
+    if first_tokens:
+        print(f"Time to first token: p50 {percentile(first_tokens, 0.5):.2f} s, p95 {percentile(first_tokens, 0.95):.2f} s, "
+              f"p99 {percentile(first_tokens, 0.99):.2f} s")
+    if retry_after:
+        print(f"Retry-After given: {min(retry_after)}-{max(retry_after)} s")
+    print(f"Deepest generation queue inside Ollama: {deepest_queue[0]}")
+
+if __name__ == "__main__":
+    main()
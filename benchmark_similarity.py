@@ -0,0 +1,83 @@
+# Purpose: This script compares the CPU cost per frame and the save decisions of the tiered change detector against the full SSIM and histogram check on a fixed, synthetic set of screen frames.
+
+import time
+import numpy as np
+import record_photo
+
+FRAME_SHAPE = (1000, 1200, 3)
+
+def draw_text_lines(img, rng, top, bottom, left, right, line_height=18):
+    """Paint rows of dark 'glyphs' onto a light area to imitate lines of text."""
+    for y in range(top, bottom - line_height, line_height + 6):
+        x = left
+        while x < right - 40:
+            word = int(rng.integers(20, 90))
+            img[y:y + line_height - 4, x:min(x + word, right)] = rng.integers(20, 80)
+            x += word + 10
+
+def make_fixed_frames(seed=0):
+    """Build a deterministic list of (name, previous, current) frame pairs covering typical screen activity."""
+    rng = np.random.default_rng(seed)
+    base = np.full(FRAME_SHAPE, 235, dtype=np.uint8)
+    base[:, :220] = 60  # sidebar
+    base[:40] = 90  # menu bar
+    draw_text_lines(base, rng, 60, 980, 10, 210)
+    draw_text_lines(base, rng, 60, 980, 240, 1180)
+
+    pairs = [('unchanged', base, base.copy())]
+
+    cursor = base.copy()
+    cursor[500:518, 700:702] = 0
+    pairs.append(('cursor blink', base, cursor))
+
+    typed = base.copy()
+    draw_text_lines(typed, np.random.default_rng(seed + 1), 940, 970, 240, 900)
+    pairs.append(('one line typed', base, typed))
+
+    scrolled = np.roll(base, -24, axis=0)
+    scrolled[:40] = base[:40]
+    pairs.append(('scrolled one line', base, scrolled))
+
+    switched = np.full(FRAME_SHAPE, 30, dtype=np.uint8)
+    draw_text_lines(switched, np.random.default_rng(seed + 2), 0, 1000, 0, 1200)
+    pairs.append(('window switch', base, switched))
+
+    dimmed = (base * 0.8).astype(np.uint8)
+    pairs.append(('brightness change', base, dimmed))
+
+    noisy = np.clip(base.astype(np.int16) + rng.integers(-3, 4, FRAME_SHAPE), 0, 255).astype(np.uint8)
+    pairs.append(('compression noise', base, noisy))
+    return pairs
+
+def time_per_call(func, repeats):
+    """Return the average CPU seconds spent per call of func."""
+    start = time.process_time()
+    for _ in range(repeats):
+        result = func()
+    return (time.process_time() - start) / repeats, result
+
+def run_benchmark(repeats=5):
+    """Run both detectors over the fixed frames and print CPU time and decision agreement."""
+    pairs = make_fixed_frames()
+    agreements = 0
+    total_full, total_tiered = 0.0, 0.0
+
+    print(f"{'case':<20}{'full ms':>10}{'tiered ms':>12}{'full':>8}{'tiered':>8}")
+    for name, previous, current in pairs:
+        full_cpu, full_same = time_per_call(
+            lambda: record_photo.combined_similarity_check(current, previous), repeats)
+        # The previous frame's signature is cached by the recorder, so only the new frame is prepared per tick
+        previous_frame = record_photo.make_frame(previous)
+        tiered_cpu, tiered_same = time_per_call(
+            lambda: record_photo.tiered_similarity_check(record_photo.make_frame(current), previous_frame), repeats)
+
+        agreements += int(bool(full_same) == bool(tiered_same))
+        total_full += full_cpu
+        total_tiered += tiered_cpu
+        print(f"{name:<20}{full_cpu * 1000:>10.2f}{tiered_cpu * 1000:>12.2f}{str(bool(full_same)):>8}{str(bool(tiered_same)):>8}")
+
+    print(f"\nMean CPU per frame: full {total_full / len(pairs) * 1000:.2f} ms, tiered {total_tiered / len(pairs) * 1000:.2f} ms")
+    print(f"Decision agreement: {agreements}/{len(pairs)}")
+
+if __name__ == "__main__":
+    run_benchmark()
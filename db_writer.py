@@ -0,0 +1,154 @@
+# Purpose: This module opens regular_data.db in WAL mode and provides a single long-lived writer thread that groups inserts into batched commits, so the capture pipeline, ingestion and cleanup scripts no longer block each other.
+
+import sqlite3
+import queue
+import threading
+import time
+import logging
+from pathlib import Path
+
+# Define the database path
+base_dir = Path.home() / 'Library' / 'Application Support' / 'RemindEnchanted'
+db_path = base_dir / 'regular_data.db'
+
+CREATE_IMAGES_TABLE = '''
+CREATE TABLE IF NOT EXISTS images (
+    id INTEGER PRIMARY KEY,
+    image BLOB,
+    metadata TEXT,
+    date TEXT,
+    time TEXT,
+    processed INTEGER DEFAULT 0
+)
+'''
+
+INSERT_IMAGE = "INSERT INTO images (image, metadata, date, time, processed) VALUES (?, ?, ?, ?, 0)"
+
+def connect(path=db_path, **kwargs):
+    """Open a connection in WAL mode.
+
+    With WAL, readers work from a snapshot and never block the writer (or the other way round);
+    the busy timeout only covers two writers meeting.
+    """
+    conn = sqlite3.connect(str(path), timeout=30, **kwargs)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL: a crash can only lose the last commits
+    return conn
+
+class DatabaseWriter:
+    """The one writer of a process: a thread owning a persistent WAL connection.
+
+    Statements are queued and executed on the writer thread. The same SQL text reuses the
+    connection's prepared statement. They are committed together once batch_rows statements
+    (or statement groups) are pending or batch_interval seconds have passed since the first
+    one. Each can carry an on_commit(row_id) callback, run on the writer thread after its row
+    is committed, and an on_error(error) callback, run there instead if it is rolled back.
+    """
+
+    FLUSH = object()
+    STOP = object()
+
+    def __init__(self, path=db_path, batch_rows=50, batch_interval=0.25):
+        self.path = path
+        self.batch_rows = batch_rows
+        self.batch_interval = batch_interval
+        self.requests = queue.Queue()
+        self.flushed = threading.Condition()
+        self.commits = 0
+        self.thread = threading.Thread(target=self.run, name='db-writer', daemon=True)
+        self.thread.start()
+
+    def execute(self, sql, params=(), on_commit=None, on_error=None):
+        """Queue a write statement."""
+        self.execute_group([(sql, params)], on_commit, on_error)
+
+    def execute_group(self, statements, on_commit=None, on_error=None):
+        """Queue (sql, params) statements that are always committed together; on_commit gets the first one's row id."""
+        self.requests.put((statements, on_commit, on_error))
+
+    def insert_image(self, image_data, on_commit=None, extra_statements=(), on_error=None):
+        """Queue the insert of an OCR result into the images table, together with any extra statements."""
+        insert = (INSERT_IMAGE, (image_data['image'], image_data['text'], image_data['date'], image_data['time']))
+        self.execute_group([insert, *extra_statements], on_commit, on_error)
+
+    def flush(self):
+        """Commit everything queued so far and wait until it is done."""
+        with self.flushed:
+            commits = self.commits
+            self.requests.put(self.FLUSH)
+            self.flushed.wait_for(lambda: self.commits > commits or not self.thread.is_alive())
+
+    def close(self):
+        """Commit everything queued so far and stop the writer thread."""
+        self.requests.put(self.STOP)
+        self.thread.join()
+
+    def run(self):
+        conn = connect(self.path)
+        conn.execute(CREATE_IMAGES_TABLE)
+        conn.commit()
+
+        pending = []
+        deadline = None
+        while True:
+            timeout = None if not pending else max(deadline - time.monotonic(), 0)
+            try:
+                request = self.requests.get(timeout=timeout)
+            except queue.Empty:
+                request = self.FLUSH
+
+            if request is not self.FLUSH and request is not self.STOP:
+                statements, on_commit, on_error = request
+                if not conn.in_transaction:
+                    conn.execute("BEGIN")  # Otherwise releasing the savepoint would commit on its own
+                conn.execute("SAVEPOINT statement_group")
+                try:
+                    row_id = None
+                    for sql, params in statements:
+                        cursor = conn.execute(sql, params)
+                        row_id = cursor.lastrowid if row_id is None else row_id
+                    conn.execute("RELEASE statement_group")
+                    pending.append((on_commit, on_error, row_id))
+                    if len(pending) == 1:
+                        deadline = time.monotonic() + self.batch_interval
+                except sqlite3.Error as e:
+                    conn.execute("ROLLBACK TO statement_group")
+                    conn.execute("RELEASE statement_group")
+                    logging.error(f"Error saving to database: {e}")
+                    self.report_error(on_error, e)
+
+            if request is self.FLUSH or request is self.STOP or len(pending) >= self.batch_rows \
+                    or (pending and time.monotonic() >= deadline):
+                self.commit(conn, pending)
+                pending = []
+            if request is self.STOP:
+                break
+        conn.close()
+
+    def commit(self, conn, pending):
+        try:
+            conn.commit()
+        except sqlite3.Error as e:
+            logging.error(f"Error committing to database, {len(pending)} rows lost: {e}")
+            conn.rollback()
+            for _, on_error, _ in pending:
+                self.report_error(on_error, e)
+            pending = []
+
+        for on_commit, _, row_id in pending:
+            if on_commit is not None:
+                try:
+                    on_commit(row_id)
+                except Exception as e:
+                    logging.error(f"Error after saving row {row_id}: {e}")
+
+        with self.flushed:
+            self.commits += 1
+            self.flushed.notify_all()
+
+    def report_error(self, on_error, error):
+        if on_error is not None:
+            try:
+                on_error(error)
+            except Exception as e:
+                logging.error(f"Error after failing to save: {e}")
@@ -1,4 +1,5 @@
 import sqlite3
+from db_writer import connect
 from pathlib import Path
 import logging
 from datetime import datetime, timedelta
@@ -8,24 +9,33 @@ logging.basicConfig(level=logging.INFO)
 base_dir = Path.home() / 'Library' / 'Application Support' / 'RemindEnchanted'
 db_path = base_dir / 'regular_data.db'
 
-try:
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+def delete_old_images(db_path=db_path, days=7):
+    """Supprime les images déjà traitées et plus anciennes que `days` jours; renvoie leur nombre."""
+    conn = None
+    deleted_count = 0
+    try:
+        conn = connect(db_path)
+        cursor = conn.cursor()
 
-    # Supprimer les entrées traitées et plus anciennes que 7 jours
-    seven_days_ago = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
-    cursor.execute("DELETE FROM images WHERE processed = 1 AND date < ?", (seven_days_ago,))
-    
-    deleted_count = cursor.rowcount
-    conn.commit()
-    logging.info(f"Suppression terminée. {deleted_count} images ont été supprimées.")
+        # Supprimer les entrées traitées et plus anciennes que 7 jours. La plus récente est toujours
+        # gardée: sans elle, SQLite réutiliserait son id, qui sert d'identifiant de document au vector store
+        seven_days_ago = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+        cursor.execute("DELETE FROM images WHERE processed = 1 AND date < ? AND id < (SELECT MAX(id) FROM images)",
+                       (seven_days_ago,))
 
-except sqlite3.Error as e:
-    logging.error(f"Une erreur SQLite est survenue : {e}")
+        deleted_count = cursor.rowcount
+        conn.commit()
+        logging.info(f"Suppression terminée. {deleted_count} images ont été supprimées.")
 
-finally:
-    if conn:
-        conn.close()
-        logging.info("Connexion à la base de données fermée.")
+    except sqlite3.Error as e:
+        logging.error(f"Une erreur SQLite est survenue : {e}")
 
-logging.info("Opération de suppression terminée.")
\ No newline at end of file
+    finally:
+        if conn:
+            conn.close()
+            logging.info("Connexion à la base de données fermée.")
+    return deleted_count
+
+if __name__ == "__main__":
+    delete_old_images()
+    logging.info("Opération de suppression terminée.")
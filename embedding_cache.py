@@ -0,0 +1,152 @@
+# Purpose: This module embeds text through the Ollama HTTP API in concurrent batches with retries, and keeps every embedding in a persistent cache keyed by model and text hash, so an unchanged chunk is never embedded twice.
+
+import hashlib
+import json
+import random
+import sqlite3
+import threading
+import time
+import logging
+import urllib.error
+import urllib.request
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from langchain_core.embeddings import Embeddings
+
+# Define the cache database path
+base_dir = Path.home() / 'Library' / 'Application Support' / 'RemindEnchanted'
+embedding_cache_path = base_dir / 'embedding_cache.db'
+
+def text_hash(text):
+    """Return the SHA-256 of a text."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def is_transient(error):
+    """Whether an embedding request failed because of the server (no connection, a 429 or a 5xx) rather than its text."""
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code == 429 or error.code >= 500
+    return isinstance(error, (urllib.error.URLError, TimeoutError, ConnectionError))
+
+class EmbeddingCache:
+    """Embedding vectors stored in SQLite by (model, text hash), as float32."""
+
+    def __init__(self, path=embedding_cache_path):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS embeddings (
+            model TEXT,
+            text_hash TEXT,
+            vector BLOB,
+            PRIMARY KEY (model, text_hash)
+        ) WITHOUT ROWID
+        ''')
+        self.conn.commit()
+
+    def lookup(self, model, hashes):
+        """Return {text hash: vector} for the hashes that are cached."""
+        hashes = list(hashes)
+        found = {}
+        with self.lock:
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                rows = self.conn.execute(f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN "
+                                         f"({', '.join('?' * len(chunk))})", (model, *chunk))
+                for key, blob in rows:
+                    found[key] = array('f', blob).tolist()
+        return found
+
+    def store(self, model, vectors):
+        """Cache (text hash, vector) pairs in one transaction."""
+        with self.lock:
+            self.conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)",
+                                  [(model, key, array('f', vector).tobytes()) for key, vector in vectors])
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+class CachedEmbeddings(Embeddings):
+    """Ollama embeddings for langchain vector stores, computed concurrently and cached.
+
+    embed_documents looks every text up in the cache first, then splits the missing ones into
+    batches of batch_size, of which at most `concurrency` are sent to the server at a time.
+    Each batch is cached as soon as it is done, so a crash mid-backfill only loses the batches
+    in flight. Requests that fail on a connection error, a 429 or a 5xx are retried up to
+    max_retries times with exponential backoff and jitter. Like OllamaEmbeddings, texts are sent
+    to /api/embeddings with embed_instruction or query_instruction in front, and the cache is
+    keyed by the prefixed text, so its vectors are the ones OllamaEmbeddings would return.
+    """
+
+    def __init__(self, model='nomic-embed-text', base_url="http://localhost:11434", batch_size=16, concurrency=4,
+                 max_retries=5, backoff=0.5, timeout=60, cache=None, embed_instruction="passage: ",
+                 query_instruction="query: "):
+        self.model = model
+        self.embed_instruction = embed_instruction
+        self.query_instruction = query_instruction
+        self.base_url = base_url.rstrip('/')
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.cache = cache
+        self.lock = threading.Lock()
+        self.cache_hits = 0
+        self.requests = 0
+        self.retries = 0
+
+    def embed_documents(self, texts):
+        texts = [self.embed_instruction + text for text in texts]
+        hashes = [text_hash(text) for text in texts]
+        vectors = self.cache.lookup(self.model, set(hashes)) if self.cache is not None else {}
+        missing = {}
+        for key, text in zip(hashes, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)  # Identical texts are embedded once
+        with self.lock:
+            self.cache_hits += len(texts) - len(missing)
+
+        items = list(missing.items())
+        batches = [items[start:start + self.batch_size] for start in range(0, len(items), self.batch_size)]
+        if batches:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                for batch_vectors in pool.map(self.embed_batch, batches):
+                    vectors.update(batch_vectors)
+            logging.info(f"Embedded {len(items)} texts in {len(batches)} batches, "
+                         f"{len(texts) - len(missing)} taken from the cache")
+        return [vectors[key] for key in hashes]
+
+    def embed_query(self, text):
+        return self.request_embedding(self.query_instruction + text)
+
+    def embed_batch(self, batch):
+        """Embed one batch of (text hash, text) pairs and cache the result."""
+        vectors = {key: self.request_embedding(text) for key, text in batch}
+        if self.cache is not None:
+            self.cache.store(self.model, vectors.items())
+        return vectors
+
+    def request_embedding(self, text):
+        body = json.dumps({"model": self.model, "prompt": text}).encode('utf-8')
+        for attempt in range(self.max_retries + 1):
+            with self.lock:
+                self.requests += 1
+            try:
+                request = urllib.request.Request(f"{self.base_url}/api/embeddings", data=body,
+                                                 headers={"Content-Type": "application/json"})
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    return json.load(response)["embedding"]
+            except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+                if not is_transient(e) or attempt == self.max_retries:
+                    raise
+                error = e
+
+            with self.lock:
+                self.retries += 1
+            delay = self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+            logging.warning(f"Embedding request failed ({error}), retrying in {delay:.1f} s")
+            time.sleep(delay)
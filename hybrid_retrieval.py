@@ -0,0 +1,46 @@
+# Purpose: This module combines several retrievers for one question: it runs them concurrently under a shared latency budget and fuses their rankings with reciprocal rank fusion.
+
+import logging
+from concurrent.futures import FIRST_COMPLETED, wait
+
+# Seconds the retrievers of a question may take together
+RETRIEVAL_BUDGET = 1.5
+# The usual RRF constant: it damps the weight of the very first ranks
+RRF_RANK_CONSTANT = 60
+
+def reciprocal_rank_fusion(rankings, k, rank_constant=RRF_RANK_CONSTANT):
+    """Fuse ranked lists of (key, item) pairs and return the k best items.
+
+    Each list gives an item 1 / (rank_constant + rank) points; an item found by several
+    retrievers (same key) adds up their points.
+    """
+    scores, items = {}, {}
+    for ranking in rankings:
+        for rank, (key, item) in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rank_constant + rank)
+            items.setdefault(key, item)
+    return [items[key] for key in sorted(scores, key=scores.get, reverse=True)[:k]]
+
+def search_within_budget(pool, searches, budget=RETRIEVAL_BUDGET):
+    """Run the search callables concurrently on pool and return the rankings of those done within budget seconds.
+
+    If none is done in time, the first one to finish is still waited for, so there is always
+    something to answer from. Late searches finish in the background and are ignored.
+    """
+    futures = [pool.submit(search) for search in searches]
+    done, pending = wait(futures, timeout=budget)
+    if not done:
+        done, pending = wait(futures, return_when=FIRST_COMPLETED)
+    if pending:
+        logging.warning(f"{len(pending)} of {len(futures)} searches missed the {budget} s retrieval budget")
+        for future in pending:
+            future.cancel()
+
+    rankings = []
+    for future in futures:
+        if future in done:
+            try:
+                rankings.append(future.result())
+            except Exception as e:
+                logging.error(f"Search failed: {e}")
+    return rankings
@@ -1,11 +1,12 @@
 # Author: Elyes Rayane Melbouci
-# Purpose: This script loads JSON data, fetches new entries from a SQLite database, processes and groups the new data by date, updates existing JSON data, and marks entries as processed in the database.
+# Purpose: This script fetches new entries from a SQLite database, appends them to the all-texts history table (indexed by date), and marks entries as processed in the database. The grouped all_texts.json file is only written when an export is requested.
 
 import json
 import sqlite3
+from db_writer import CREATE_IMAGES_TABLE, connect
 import os
 import logging
-from collections import defaultdict
+import argparse
 import sys
 from pathlib import Path
 
@@ -25,70 +26,110 @@ def load_json(file_path):
             return json.load(file)
     return []
 
-def save_json(file_path, data):
-    """Save JSON data to a file."""
-    with open(file_path, 'w') as file:
-        logging.debug(f"Saving JSON data to {file_path}")
-        json.dump(data, file, indent=4)
+def ensure_schema(conn):
+    """Create the all-texts history table and the indexes ingestion relies on."""
+    conn.execute(CREATE_IMAGES_TABLE)
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS all_texts (
+        id INTEGER PRIMARY KEY,
+        image_id INTEGER UNIQUE,
+        date TEXT,
+        time TEXT,
+        text TEXT
+    )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_all_texts_date ON all_texts (date)")
+    # A B-tree over the whole OCR text only slowed down inserts; full-text search lives in lexical_index.py
+    conn.execute("DROP INDEX IF EXISTS idx_images_metadata")
+    # Only the few unprocessed rows are indexed, so finding them does not scan the whole table
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_images_unprocessed ON images (id) WHERE processed = 0")
+    conn.commit()
 
-def fetch_new_entries(db_path):
+def import_all_texts_json(conn, file_path):
+    """Move the history from a legacy all_texts.json into the table, once, when the table is still empty."""
+    if conn.execute("SELECT 1 FROM all_texts LIMIT 1").fetchone() is not None:
+        return
+    all_texts_data = load_json(file_path)
+    rows = [(item['date'], entry['time'], entry['text']) for item in all_texts_data for entry in item['entries']]
+    if rows:
+        conn.executemany("INSERT INTO all_texts (date, time, text) VALUES (?, ?, ?)", rows)
+        conn.commit()
+        logging.info(f"Imported {len(rows)} entries from {file_path}")
+
+def fetch_new_entries(conn):
     """Fetch new entries from the database where processed is 0."""
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, metadata, date, time FROM images WHERE processed = 0")
-    new_entries = cursor.fetchall()
-    conn.close()
-    logging.debug(f"Fetched new entries: {new_entries}")
+    new_entries = conn.execute("SELECT id, metadata, date, time FROM images WHERE processed = 0 ORDER BY id").fetchall()
+    logging.debug(f"Fetched {len(new_entries)} new entries")
     return new_entries
 
-def update_processed_entries(db_path, ids):
-    """Update entries as processed in the database."""
-    conn = sqlite3.connect(db_path)
-    cursor = conn.executemany("UPDATE images SET processed = 1 WHERE id = ?", [(id,) for id in ids])
-    conn.commit()
-    conn.close()
-    logging.debug(f"Updated entries as processed: {ids}")
+def append_new_entries(conn, new_entries):
+    """Append new entries to the history and mark them as processed in one transaction.
+
+    The unique image_id makes a retry after a crash idempotent. Cost is proportional to the
+    number of new entries, not to the size of the history.
+    """
+    rows = []
+    for entry in new_entries:
+        if len(entry) == 4 and entry[2] and entry[3]:
+            rows.append((entry[0], entry[2], entry[3], entry[1]))
+        else:
+            logging.error(f"Malformed or missing entry: {entry}")
+
+    with conn:
+        conn.executemany("INSERT OR IGNORE INTO all_texts (image_id, date, time, text) VALUES (?, ?, ?, ?)", rows)
+        conn.executemany("UPDATE images SET processed = 1 WHERE id = ?", [(entry[0],) for entry in new_entries])
+    logging.debug(f"Updated entries as processed: {[entry[0] for entry in new_entries]}")
+
+def export_all_texts(conn, file_path):
+    """Stream the history to a JSON file grouped by date, one date at a time, without loading it all."""
+    temp_path = Path(f"{file_path}.tmp")
+    with open(temp_path, 'w') as file:
+        file.write("[")
+        dates = [row[0] for row in conn.execute("SELECT date FROM all_texts GROUP BY date ORDER BY MIN(id)")]
+        for index, date in enumerate(dates):
+            file.write(",\n" if index else "\n")
+            file.write(f'    {{"date": {json.dumps(date)}, "entries": [')
+            entries = conn.execute("SELECT time, text FROM all_texts WHERE date = ? ORDER BY id", (date,))
+            for entry_index, (time_str, text) in enumerate(entries):
+                file.write(", " if entry_index else "")
+                file.write(json.dumps({"time": time_str, "text": text}))
+            file.write("]}")
+        file.write("\n]\n")
+    os.replace(temp_path, file_path)
+    logging.debug(f"Exported all texts to {file_path}")
+
+def run_ingestion(db_path, all_texts_path):
+    """Move the unprocessed OCR rows into the all-texts history; returns how many were moved."""
+    conn = connect(db_path)
+    new_entries = []
+    try:
+        ensure_schema(conn)
+        import_all_texts_json(conn, all_texts_path)
+        new_entries = fetch_new_entries(conn)
+        if new_entries:
+            append_new_entries(conn, new_entries)
+    except sqlite3.Error as e:
+        logging.error(f"Error during ingestion: {e}")
+    finally:
+        conn.close()
+    return len(new_entries)
 
 # Define file and database paths
 base_dir = Path.home() / 'Library' / 'Application Support' / 'RemindEnchanted'
 base_dir.mkdir(parents=True, exist_ok=True)
 
-new_texts_path = base_dir / 'new_texts.json'
 all_texts_path = base_dir / 'all_texts.json'
 db_path = base_dir / 'regular_data.db'
 
-# Load existing JSON data from all_texts.json
-all_texts_data = load_json(all_texts_path)
-
-# Fetch new entries from the database
-new_entries = fetch_new_entries(db_path)
-
-# Initialize the dictionary to group new data by date
-new_grouped_data = defaultdict(list)
-
-# Add new entries to the dictionary
-for entry in new_entries:
-    if len(entry) == 4 and entry[2] and entry[3]:
-        new_grouped_data[entry[2]].append({'time': entry[3], 'text': entry[1]})
-    else:
-        logging.error(f"Malformed or missing entry: {entry}")
-
-# Convert the dictionary to a list of dictionaries
-new_json_data = [{'date': date, 'entries': entries} for date, entries in new_grouped_data.items()]
-
-# Add new entries to all_texts_data
-for date, entries in new_grouped_data.items():
-    existing_entry = next((item for item in all_texts_data if item['date'] == date), None)
-    if existing_entry:
-        existing_entry['entries'].extend(entries)
-    else:
-        all_texts_data.append({'date': date, 'entries': entries})
-
-# Save new data to new_texts.json (overwrite old data)
-save_json(new_texts_path, new_json_data)
-
-# Save complete data to all_texts.json
-save_json(all_texts_path, all_texts_data)
-
-# Mark entries as processed in the database
-update_processed_entries(db_path, [entry[0] for entry in new_entries])
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move new OCR entries into the all-texts history.")
+    parser.add_argument('--export', action='store_true', help="also write the whole history to all_texts.json")
+    args = parser.parse_args()
+
+    run_ingestion(db_path, all_texts_path)
+    if args.export:
+        conn = connect(db_path)
+        try:
+            export_all_texts(conn, all_texts_path)
+        finally:
+            conn.close()
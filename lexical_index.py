@@ -0,0 +1,130 @@
+# Purpose: This module keeps an SQLite FTS5 index of the chunks stored in the vector store, so exact tokens from screen text (ticket numbers, file names, error codes, URLs) can be found with BM25 ranking next to the vector search. Run on its own, it indexes the chunks already in the vector store.
+
+import json
+import re
+import sqlite3
+import threading
+import logging
+from pathlib import Path
+
+# Define the index database path
+base_dir = Path.home() / 'Library' / 'Application Support' / 'RemindEnchanted'
+lexical_index_path = base_dir / 'lexical_index.db'
+# Written once the chunks already in the vector store are indexed, so the launcher runs this only once
+marker_path = base_dir / 'lexical_index_built'
+
+# Runs of word characters, joined by the punctuation found inside identifiers, paths and URLs
+TOKEN_PATTERN = re.compile(r"\w+(?:[-_./:#@]\w+)*")
+WORD_PATTERN = re.compile(r"\w+")
+# Words that say nothing about the content; time words are handled by the time filter
+STOPWORDS = set("""
+a about after all am an and any are as at be been before by can could did do does doing done for from had has have
+how i i'm in is it its last me my of on or our so than that the their them then there these this those to today
+tonight up was we were what when where which while who why will with would yesterday you your morning afternoon
+evening night week month ago past since until between earlier recently show tell find remember look looking
+""".split())
+
+def match_query(question):
+    """Turn a question into an FTS5 query: each remaining term or identifier as a quoted phrase, OR-ed together.
+
+    An identifier such as ABC-123 or invoice_q3.pdf becomes the phrase of its parts, which the
+    default tokenizer matches only when they are adjacent.
+    """
+    terms = []
+    for token in TOKEN_PATTERN.findall(question.lower()):
+        words = WORD_PATTERN.findall(token)
+        if len(words) == 1 and (words[0] in STOPWORDS or len(words[0]) < 2):
+            continue
+        phrase = '"' + " ".join(words) + '"'
+        if phrase not in terms:
+            terms.append(phrase)
+    return " OR ".join(terms)
+
+class LexicalIndex:
+    """BM25 full-text search over the vector store's chunks, keyed by the same chunk ids.
+
+    chunks holds each chunk's id, metadata and time span; chunks_fts holds its text under the
+    same rowid, so adding a chunk again replaces it.
+    """
+
+    def __init__(self, path=lexical_index_path):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS chunks (
+            id INTEGER PRIMARY KEY,
+            chunk_id TEXT UNIQUE,
+            metadata TEXT,
+            timestamp REAL,
+            end_timestamp REAL
+        )
+        ''')
+        self.conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(text, tokenize = 'unicode61 remove_diacritics 2')")
+        self.conn.commit()
+
+    def add(self, chunk_ids, texts, metadatas):
+        """Index chunks, replacing any already indexed under the same ids, in one transaction."""
+        with self.lock, self.conn:
+            for chunk_id, text, metadata in zip(chunk_ids, texts, metadatas):
+                row = self.conn.execute("SELECT id FROM chunks WHERE chunk_id = ?", (chunk_id,)).fetchone()
+                if row is not None:
+                    self.conn.execute("DELETE FROM chunks_fts WHERE rowid = ?", (row[0],))
+                    self.conn.execute("DELETE FROM chunks WHERE id = ?", (row[0],))
+                cursor = self.conn.execute("INSERT INTO chunks (chunk_id, metadata, timestamp, end_timestamp) VALUES (?, ?, ?, ?)",
+                                           (chunk_id, json.dumps(metadata), metadata.get('timestamp'),
+                                            metadata.get('end_timestamp')))
+                self.conn.execute("INSERT INTO chunks_fts (rowid, text) VALUES (?, ?)", (cursor.lastrowid, text))
+
+    def search(self, question, k=5, start=None, end=None):
+        """Return up to k (text, metadata) pairs matching the question, best BM25 score first.
+
+        With start and end (epoch seconds), only chunks whose time span overlaps them are returned.
+        """
+        query = match_query(question)
+        if not query:
+            return []
+        sql = ("SELECT chunks_fts.text, chunks.metadata FROM chunks_fts JOIN chunks ON chunks.id = chunks_fts.rowid "
+               "WHERE chunks_fts MATCH ?")
+        params = [query]
+        if start is not None and end is not None:
+            sql += " AND chunks.timestamp <= ? AND chunks.end_timestamp >= ?"
+            params += [end, start]
+        sql += " ORDER BY bm25(chunks_fts) LIMIT ?"
+        with self.lock:
+            rows = self.conn.execute(sql, (*params, k)).fetchall()
+        return [(text, json.loads(metadata)) for text, metadata in rows]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+def index_vectorstore(batch_size=500):
+    """Index every chunk already in the vector store; returns how many were indexed."""
+    import chromadb
+    from migrate_timestamps import COLLECTION_NAME, persist_directory
+
+    client = chromadb.PersistentClient(path=str(persist_directory))
+    try:
+        collection = client.get_collection(COLLECTION_NAME)
+    except Exception:
+        logging.info("No vector store collection to index")
+        return 0
+
+    index = LexicalIndex()
+    indexed = offset = 0
+    while True:
+        batch = collection.get(include=["documents", "metadatas"], limit=batch_size, offset=offset)
+        if not batch['ids']:
+            break
+        offset += len(batch['ids'])
+        index.add(batch['ids'], batch['documents'], [metadata or {} for metadata in batch['metadatas']])
+        indexed += len(batch['ids'])
+    index.close()
+    logging.info(f"Indexed {indexed} vector store chunks for full-text search")
+    return indexed
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    index_vectorstore()
+    marker_path.touch()
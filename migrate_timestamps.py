@@ -0,0 +1,87 @@
+# Purpose: This script back-fills the numeric timestamp and end_timestamp metadata (epoch seconds) on documents already in the vector store, computed from their date and time strings, so time-scoped queries can filter them inside the vector search.
+
+import logging
+from datetime import datetime, time, timedelta
+from pathlib import Path
+import chromadb
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+base_dir = Path.home() / 'Library' / 'Application Support' / 'RemindEnchanted'
+persist_directory = base_dir / 'vectoreDB'
+# Written once the store has been migrated, so the launcher runs this only once
+marker_path = base_dir / 'timestamps_migrated'
+
+# The name langchain gives the collection when none is set
+COLLECTION_NAME = 'langchain'
+# pipeline_db writes "%d %b %Y"; documents added through /add used to carry "%Y-%m-%d"
+DATE_FORMATS = ["%d %b %Y", "%Y-%m-%d"]
+
+def parse_date(value):
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except (TypeError, ValueError):
+            continue
+    return None
+
+def parse_time(value):
+    try:
+        return datetime.strptime(value, "%H:%M").time()
+    except (TypeError, ValueError):
+        return None
+
+def metadata_timestamps(metadata):
+    """Return (timestamp, end_timestamp) for a document's metadata, or None if it has no readable date.
+
+    Documents with a time cover that minute, sessions cover start_time to end_time, and
+    documents with only a date cover the whole day.
+    """
+    day = parse_date(metadata.get('date'))
+    if day is None:
+        return None
+    start = parse_time(metadata.get('start_time') or metadata.get('time'))
+    end = parse_time(metadata.get('end_time')) or start
+    if start is None:
+        return datetime.combine(day, time.min).timestamp(), datetime.combine(day, time.max).timestamp()
+    return datetime.combine(day, start).timestamp(), (datetime.combine(day, end) + timedelta(seconds=59)).timestamp()
+
+def migrate(batch_size=500):
+    """Add the timestamps to every document that lacks them; returns how many were updated."""
+    client = chromadb.PersistentClient(path=str(persist_directory))
+    try:
+        collection = client.get_collection(COLLECTION_NAME)
+    except Exception:
+        logging.info("No vector store collection to migrate")
+        return 0
+
+    updated = skipped = 0
+    offset = 0
+    while True:
+        batch = collection.get(include=["metadatas"], limit=batch_size, offset=offset)
+        if not batch['ids']:
+            break
+        offset += len(batch['ids'])
+
+        ids, metadatas = [], []
+        for doc_id, metadata in zip(batch['ids'], batch['metadatas']):
+            metadata = metadata or {}
+            if 'timestamp' in metadata and 'end_timestamp' in metadata:
+                continue
+            timestamps = metadata_timestamps(metadata)
+            if timestamps is None:
+                skipped += 1
+                continue
+            metadata['timestamp'], metadata['end_timestamp'] = timestamps
+            ids.append(doc_id)
+            metadatas.append(metadata)
+        if ids:
+            collection.update(ids=ids, metadatas=metadatas)
+            updated += len(ids)
+
+    logging.info(f"Back-filled timestamps on {updated} documents, {skipped} without a readable date")
+    return updated
+
+if __name__ == "__main__":
+    migrate()
+    marker_path.touch()
@@ -0,0 +1,160 @@
+# Purpose: This module keeps a persistent, size-bounded cache of OCR results keyed by the content hash of each image, so screens that come back are not recognised again. An opt-in tier also matches re-encoded copies of a screen by perceptual hash, confirmed by a fine hash of the pixels.
+
+import hashlib
+import sqlite3
+import threading
+import time
+import logging
+from pathlib import Path
+from PIL import Image
+
+# Define the cache database path
+base_dir = Path.home() / 'Library' / 'Application Support' / 'RemindEnchanted'
+cache_db_path = base_dir / 'ocr_cache.db'
+
+# Side of the difference-hash grid; the perceptual hash has PERCEPTUAL_HASH_SIZE ** 2 bits
+PERCEPTUAL_HASH_SIZE = 32
+# Neighbouring thumbnail pixels closer than this many grey levels count as equal
+PERCEPTUAL_HASH_TOLERANCE = 8
+# Scale and grey levels of the image behind the fine hash
+FINE_HASH_SCALE = 2
+FINE_HASH_LEVELS = 16
+
+def perceptual_hash(image, size=PERCEPTUAL_HASH_SIZE, tolerance=PERCEPTUAL_HASH_TOLERANCE):
+    """Return the difference hash of an image as a hex string.
+
+    The image is shrunk to a (size + 1) x size grayscale thumbnail and each bit records whether a
+    pixel is clearly brighter than its right-hand neighbour. Screens are mostly flat areas, so the
+    tolerance keeps a handful of changed pixels (a clock tick, a blinking cursor) from flipping
+    bits there, and such screens share one cache entry.
+    """
+    thumbnail = image.convert('L').resize((size + 1, size), Image.BILINEAR)
+    pixels = list(thumbnail.getdata())
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            bits = (bits << 1) | int(left > right + tolerance)
+    return f"{bits:0{size * size // 4}x}"
+
+def fine_hash(image, scale=FINE_HASH_SCALE, levels=FINE_HASH_LEVELS):
+    """Return the SHA-256 of an image shrunk by scale and reduced to levels grey levels.
+
+    A perceptual hash cannot tell apart screens that differ only in their text; at this
+    resolution an edited word changes many pixels, while re-encoding the same screen mostly
+    does not. Two images with the same fine hash are taken to hold the same text.
+    """
+    grey = image.convert('L')
+    grey = grey.resize((max(grey.width // scale, 1), max(grey.height // scale, 1)), Image.BILINEAR)
+    step = 256 // levels
+    return hashlib.sha256(bytes(value // step for value in grey.getdata())).hexdigest()
+
+def file_content_hash(file_path):
+    """Return the SHA-256 of a file's bytes."""
+    with open(file_path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def file_cache_keys(file_path, near_duplicates=False):
+    """Return the (content hash, perceptual hash, fine hash) cache keys of an image file.
+
+    The perceptual and fine hashes are only computed for near_duplicates, and None otherwise.
+    """
+    if not near_duplicates:
+        return file_content_hash(file_path), None, None
+    with Image.open(file_path) as image:
+        return file_content_hash(file_path), perceptual_hash(image), fine_hash(image)
+
+def array_cache_keys(image_array, near_duplicates=False):
+    """Return the (content hash, perceptual hash, fine hash) cache keys of an image held in memory as an array."""
+    content = hashlib.sha256(str(image_array.shape).encode('ascii'))
+    content.update(image_array.tobytes())
+    if not near_duplicates:
+        return content.hexdigest(), None, None
+    image = Image.fromarray(image_array)
+    return content.hexdigest(), perceptual_hash(image), fine_hash(image)
+
+class OCRCache:
+    """OCR results stored in SQLite, looked up by exact content hash.
+
+    With perceptual_matching=True, an image whose content hash is not cached also matches an
+    entry with the same perceptual hash and the same fine hash, i.e. a re-encoded copy of the
+    same screen. The cache holds at most max_entries results; storing more evicts the least
+    recently used ones. Hit and miss counts are kept in the database so the hit rate survives
+    restarts.
+    """
+
+    def __init__(self, path=cache_db_path, max_entries=5000, perceptual_matching=False):
+        self.max_entries = max_entries
+        self.perceptual_matching = perceptual_matching
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS ocr_cache (
+            content_hash TEXT PRIMARY KEY,
+            perceptual_hash TEXT,
+            text TEXT,
+            last_used REAL,
+            fine_hash TEXT
+        )
+        ''')
+        # Caches written before the fine hash existed get the column; their entries never match perceptually
+        if 'fine_hash' not in [row[1] for row in self.conn.execute("PRAGMA table_info(ocr_cache)")]:
+            self.conn.execute("ALTER TABLE ocr_cache ADD COLUMN fine_hash TEXT")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_ocr_cache_perceptual ON ocr_cache (perceptual_hash)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_ocr_cache_last_used ON ocr_cache (last_used)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS ocr_cache_stats (name TEXT PRIMARY KEY, value INTEGER)")
+        self.conn.execute("INSERT OR IGNORE INTO ocr_cache_stats VALUES ('hits', 0), ('misses', 0)")
+        self.conn.commit()
+
+        stats = dict(self.conn.execute("SELECT name, value FROM ocr_cache_stats"))
+        self.hits, self.misses = stats['hits'], stats['misses']
+        self.size = self.conn.execute("SELECT COUNT(*) FROM ocr_cache").fetchone()[0]
+
+    def lookup(self, content_hash, perceptual_hash=None, fine_hash=None):
+        """Return the cached text for an image, or None on a miss."""
+        with self.lock:
+            row = self.conn.execute("SELECT content_hash, text FROM ocr_cache WHERE content_hash = ?",
+                                    (content_hash,)).fetchone()
+            if row is None and self.perceptual_matching and perceptual_hash is not None and fine_hash is not None:
+                # The perceptual hash finds candidates; only the fine hash says the text is the same
+                row = self.conn.execute("SELECT content_hash, text FROM ocr_cache WHERE perceptual_hash = ? "
+                                        "AND fine_hash = ? ORDER BY last_used DESC LIMIT 1",
+                                        (perceptual_hash, fine_hash)).fetchone()
+
+            if row is None:
+                self.misses += 1
+                self.conn.execute("UPDATE ocr_cache_stats SET value = value + 1 WHERE name = 'misses'")
+            else:
+                self.hits += 1
+                self.conn.execute("UPDATE ocr_cache SET last_used = ? WHERE content_hash = ?", (time.time(), row[0]))
+                self.conn.execute("UPDATE ocr_cache_stats SET value = value + 1 WHERE name = 'hits'")
+            self.conn.commit()
+
+            if (self.hits + self.misses) % 100 == 0:
+                logging.info(f"OCR cache hit rate: {self.hit_rate():.1%} ({self.hits} hits, {self.misses} misses)")
+            return None if row is None else row[1]
+
+    def store(self, content_hash, perceptual_hash, fine_hash, text):
+        """Cache the text recognised for an image, evicting the least recently used entries beyond max_entries."""
+        with self.lock:
+            exists = self.conn.execute("SELECT 1 FROM ocr_cache WHERE content_hash = ?", (content_hash,)).fetchone()
+            self.conn.execute("INSERT OR REPLACE INTO ocr_cache (content_hash, perceptual_hash, text, last_used, fine_hash) "
+                              "VALUES (?, ?, ?, ?, ?)", (content_hash, perceptual_hash, text, time.time(), fine_hash))
+            if not exists:
+                self.size += 1
+            if self.size > self.max_entries:
+                self.conn.execute("DELETE FROM ocr_cache WHERE content_hash IN "
+                                  "(SELECT content_hash FROM ocr_cache ORDER BY last_used LIMIT ?)",
+                                  (self.size - self.max_entries,))
+                self.size = self.max_entries
+            self.conn.commit()
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
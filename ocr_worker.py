@@ -0,0 +1,110 @@
+# Purpose: This script is a long-lived OCR worker. It loads one recognition backend once, then reads batches of image paths or image bytes as JSON lines on stdin and writes the recognized text for each batch as one JSON line on stdout.
+
+import argparse
+import base64
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Simulated costs of the stub backend, used to benchmark the pool without a real recogniser
+STUB_STARTUP_SECONDS = 1.0
+STUB_IMAGE_SECONDS = 0.05
+
+def recognize_with_remindocr(path):
+    """Run the Swift OCR command-line tool; it only accepts one image path per run.
+
+    This backend starts a process for every image, so the pool only adds concurrency to it.
+    """
+    result = subprocess.run(["RemindOCR", str(path)], capture_output=True, text=True, check=True)
+    return result.stdout.strip()
+
+def load_vision():
+    """Load Apple's Vision text recognition (what RemindOCR runs) in this process, through pyobjc."""
+    import objc
+    import Vision
+    from Foundation import NSURL
+
+    def recognize(path):
+        with objc.autorelease_pool():
+            request = Vision.VNRecognizeTextRequest.alloc().init()
+            handler = Vision.VNImageRequestHandler.alloc().initWithURL_options_(NSURL.fileURLWithPath_(str(path)), None)
+            success, error = handler.performRequests_error_([request], None)
+            if not success:
+                raise RuntimeError(f"Vision text recognition failed: {error}")
+            return "\n".join(str(observation.topCandidates_(1)[0].string()) for observation in request.results() or [])
+    return recognize
+
+def load_easyocr():
+    """Load an EasyOCR reader once and return a function recognizing one image."""
+    import easyocr
+
+    reader = easyocr.Reader(['en'], gpu=False)
+    return lambda path: "\n".join(reader.readtext(str(path), detail=0))
+
+def load_stub():
+    """Return a fake recogniser with a fixed startup and per-image cost."""
+    time.sleep(STUB_STARTUP_SECONDS)
+
+    def recognize(path):
+        time.sleep(STUB_IMAGE_SECONDS)
+        return f"stub text for {os.path.basename(str(path))}"
+    return recognize
+
+BACKENDS = {
+    "vision": load_vision,
+    "remindocr": lambda: recognize_with_remindocr,
+    "easyocr": load_easyocr,
+    "stub": load_stub,
+}
+
+def default_backend():
+    """The resident Vision backend where pyobjc's Vision bindings are installed, else RemindOCR."""
+    return "vision" if importlib.util.find_spec("Vision") is not None else "remindocr"
+
+def recognize_item(recognize, item):
+    """Recognize one batch item, given either as {"path": ...} or as base64 image bytes in {"data": ...}."""
+    if "path" in item:
+        return recognize(item["path"])
+
+    fd, temp_path = tempfile.mkstemp(suffix=item.get("suffix", ".png"))
+    try:
+        with os.fdopen(fd, 'wb') as image_file:
+            image_file.write(base64.b64decode(item["data"]))
+        return recognize(temp_path)
+    finally:
+        os.remove(temp_path)
+
+def serve(recognize, stdin=sys.stdin, stdout=sys.stdout):
+    """Answer {"id", "items"} batch requests with {"id", "results"} lines until stdin closes."""
+    for line in stdin:
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        results = []
+        for item in request["items"]:
+            try:
+                results.append({"text": recognize_item(recognize, item)})
+            except Exception as e:
+                results.append({"error": str(e)})
+        stdout.write(json.dumps({"id": request["id"], "results": results}) + "\n")
+        stdout.flush()
+
+def main():
+    parser = argparse.ArgumentParser(description="Long-lived OCR worker speaking JSON lines on stdin/stdout.")
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default=default_backend())
+    parser.add_argument('paths', nargs='*', help="recognize these images once and exit instead of serving stdin")
+    args = parser.parse_args()
+
+    recognize = BACKENDS[args.backend]()
+    if args.paths:
+        for path in args.paths:
+            print(recognize(path))
+    else:
+        serve(recognize)
+
+if __name__ == "__main__":
+    main()
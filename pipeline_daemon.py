@@ -0,0 +1,158 @@
+# Purpose: This script keeps the ingestion, vector store and cleanup stages resident in one long-lived process. Each stage runs when new transcripts arrive (or on a fallback timer), no more often than its own cadence, and its run times are reported.
+
+import logging
+import signal
+import argparse
+import threading
+import time
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+from watchdog.observers import Observer
+from watchdog.events import FileSystemEventHandler
+import ingestion
+import adding_vectore
+import delete_imagedb
+from transcript_log import SEGMENT_PREFIX, SEGMENT_SUFFIX, transcripts_dir
+
+class Stage:
+    """One pipeline stage running on its own thread.
+
+    A stage waits until it is notified of new data or until max_interval seconds have passed
+    (the fallback timer), and never starts less than min_interval seconds after its previous
+    run, so a burst of notifications costs one run. `run` returns how many items it handled.
+    """
+
+    def __init__(self, name, run, min_interval, max_interval):
+        self.name = name
+        self.run = run
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.wakeup = threading.Event()
+        self.runs = 0
+        self.items = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def notify(self):
+        self.wakeup.set()
+
+    def loop(self, stopping):
+        last_run = None
+        while not stopping.is_set():
+            self.wakeup.wait(self.max_interval)
+            if last_run is not None:
+                delay = last_run + self.min_interval - time.monotonic()
+                if delay > 0 and stopping.wait(delay):
+                    break
+            if stopping.is_set():
+                break
+            self.wakeup.clear()
+            last_run = time.monotonic()
+            self.run_once()
+
+    def run_once(self):
+        start = time.perf_counter()
+        try:
+            items = self.run() or 0
+        except Exception as e:
+            logging.error(f"Stage {self.name} failed: {e}")
+            items = 0
+        elapsed = time.perf_counter() - start
+
+        self.runs += 1
+        self.items += items
+        self.total_seconds += elapsed
+        self.max_seconds = max(self.max_seconds, elapsed)
+        logging.info(f"Stage {self.name}: {items} items in {elapsed * 1000:.1f} ms")
+
+    def summary(self):
+        average = self.total_seconds / self.runs if self.runs else 0.0
+        return (f"Stage {self.name}: {self.runs} runs, {self.items} items, {self.total_seconds:.2f} s total, "
+                f"{average * 1000:.1f} ms average, {self.max_seconds * 1000:.1f} ms max")
+
+class NewTranscriptHandler(FileSystemEventHandler):
+    """Notify the stages that consume OCR results whenever a transcript segment is written.
+
+    Every OCR row is appended to the transcript log right after it is committed, so a write to
+    a segment file means both new rows in the database and new entries in the log. Cursor
+    files live in a subdirectory and are ignored, so a stage saving its cursor does not wake
+    itself up again.
+    """
+
+    def __init__(self, stages):
+        self.stages = stages
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        name = event.src_path.rsplit('/', 1)[-1]
+        if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+            for stage in self.stages:
+                stage.notify()
+
+def build_stages(args):
+    return {
+        "ingestion": Stage("ingestion", lambda: ingestion.run_ingestion(ingestion.db_path, ingestion.all_texts_path),
+                           args.ingestion_interval, args.fallback_interval),
+        "adding_vectore": Stage("adding_vectore", adding_vectore.process_new_documents,
+                                args.vector_interval, args.fallback_interval),
+        "deletedb": Stage("deletedb", delete_imagedb.delete_old_images,
+                          args.cleanup_interval, args.cleanup_interval),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the ingestion, vector store and cleanup stages in one resident process.")
+    parser.add_argument('--ingestion-interval', type=float, default=5.0, help="minimum seconds between ingestion runs")
+    parser.add_argument('--vector-interval', type=float, default=30.0, help="minimum seconds between vector store runs")
+    parser.add_argument('--cleanup-interval', type=float, default=3600.0, help="seconds between cleanup runs")
+    parser.add_argument('--fallback-interval', type=float, default=300.0,
+                        help="run ingestion and the vector store at least this often even without new-data events")
+    parser.add_argument('--once', action='store_true', help="run every stage once, report the timings and exit")
+    args = parser.parse_args()
+
+    stages = build_stages(args)
+    if args.once:
+        for stage in stages.values():
+            stage.run_once()
+        for stage in stages.values():
+            logging.info(stage.summary())
+        return
+
+    stopping = threading.Event()
+
+    def handle_termination(signum, frame):
+        logging.info("Stopping the pipeline daemon")
+        stopping.set()
+        for stage in stages.values():
+            stage.notify()
+
+    signal.signal(signal.SIGTERM, handle_termination)
+    signal.signal(signal.SIGINT, handle_termination)
+
+    transcripts_dir.mkdir(parents=True, exist_ok=True)
+    observer = Observer()
+    observer.schedule(NewTranscriptHandler([stages["ingestion"], stages["adding_vectore"]]),
+                      str(transcripts_dir), recursive=False)
+    observer.start()
+
+    # Catch up on whatever arrived while the daemon was not running
+    for stage in stages.values():
+        stage.notify()
+    threads = [threading.Thread(target=stage.loop, args=(stopping,), name=f"stage-{stage.name}", daemon=True)
+               for stage in stages.values()]
+    for thread in threads:
+        thread.start()
+
+    while not stopping.wait(1):
+        pass
+
+    observer.stop()
+    observer.join()
+    for thread in threads:
+        thread.join()
+    for stage in stages.values():
+        logging.info(stage.summary())
+
+if __name__ == "__main__":
+    main()
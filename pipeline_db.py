@@ -2,18 +2,29 @@ import subprocess
 import os
 import time
 import logging
-import sqlite3
 from PIL import Image, ExifTags, ImageFilter
 import PIL
 from datetime import datetime
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 import json
-from collections import defaultdict
+import re
 import sys
 import gc
 from pathlib import Path
 import signal
+import argparse
+import base64
+import queue
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from collections import OrderedDict
+from transcript_log import TranscriptLog
+from text_dedup import TextDeduplicator
+from db_writer import DatabaseWriter, connect, db_path
+from ocr_cache import OCRCache, array_cache_keys, file_cache_keys, file_content_hash
+from ocr_worker import BACKENDS, default_backend
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -23,12 +34,16 @@ def handle_termination(signum, frame):
     logging.info("Termination signal received. Cleaning up...")
     observer.stop()
     observer.join()
+    if ocr_pool is not None:
+        ocr_pool.close()
+    if deduplicator is not None:
+        logging.info(deduplicator.summary())
+    with save_lock:
+        if db_writer is not None:
+            db_writer.close()  # Commits pending rows, which also appends them to the log
+            transcript_log.close()
     sys.exit(0)
 
-# Registering the termination signals
-signal.signal(signal.SIGTERM, handle_termination)
-signal.signal(signal.SIGINT, handle_termination)
-
 def resource_path(relative_path):
     """Get absolute path to resource, works for dev and for PyInstaller."""
     base_path = getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
@@ -43,20 +58,25 @@ chemin_transcriptions = base_dir / 'transcription'
 chemin_images.mkdir(parents=True, exist_ok=True)
 chemin_transcriptions.mkdir(parents=True, exist_ok=True)
 
-# Path to the JSON file for storing data
-json_output_path = base_dir / 'new_texts.json'
-logging.info(f"JSON output path: {json_output_path}")
+# Append-only log of recognized text, the database writer and the processed-file ledger, opened by open_storage()
+transcript_log = None
+db_writer = None
+ledger = None
+
+# Guards opening the storage from several workers
+save_lock = threading.Lock()
+
+# Near-duplicate suppression of OCR text, configured by main()
+deduplicator = None
+dedup_lock = threading.Lock()
 
-# Dictionary to cache already processed files
-processed_files = {}
+# Files are considered complete once no event was seen for them for this many seconds
+QUIET_PERIOD = 1.0
+# Only files with these extensions are handed to OCR
+IMAGE_SUFFIXES = {'.jpeg', '.jpg', '.png'}
 
-def wait_for_file_to_finish(file_path):
-    """Wait for the file size to stabilize indicating it has finished writing."""
-    size = -1
-    while size != os.path.getsize(file_path):
-        size = os.path.getsize(file_path)
-        time.sleep(0.5)
-    logging.debug(f"File size stabilized for: {file_path}")
+# Paths of finished files waiting for OCR
+ready_paths = queue.Queue()
 
 def extract_date_from_image(image_path):
     """Extract date and time from image metadata."""
@@ -72,6 +92,22 @@ def extract_date_from_image(image_path):
         logging.error(f"Error extracting date from image {str(image_path)}: {e}")
     return None
 
+def capture_time_from_path(image_path):
+    """Read the capture time from the recorder's screenshots/<date>/Screen_HH-MM-SS-ffffff path,
+    falling back to the file's modification time."""
+    path = Path(image_path)
+    match = re.match(r"Screen_(\d{2}-\d{2}-\d{2}-\d{6})", path.name)
+    if match:
+        try:
+            return datetime.strptime(f"{path.parent.name} {match[1]}", "%Y-%m-%d %H-%M-%S-%f")
+        except ValueError:
+            pass  # Not a folder named by the recorder
+    try:
+        return datetime.fromtimestamp(os.path.getmtime(image_path))
+    except OSError as e:
+        logging.error(f"Error reading the modification time of {str(image_path)}: {e}")
+    return None
+
 def preprocess_image(image_path):
     """Preprocess the image to improve quality."""
     try:
@@ -84,132 +120,525 @@ def preprocess_image(image_path):
         logging.error(f"Error preprocessing image {str(image_path)}: {e}")
     return None
 
-def save_to_db_and_json(image_data, json_output_path):
-    """Save data to SQLite database and JSON file."""
-    try:
-        db_path = base_dir / 'regular_data.db'
-        logging.info(f"Database path: {db_path}")
-        conn = sqlite3.connect(str(db_path), check_same_thread=False)
-        cursor = conn.cursor()
-
-        # Ensure 'images' table exists, create if not
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS images (
-            id INTEGER PRIMARY KEY,
-            image BLOB,
-            metadata TEXT,
-            date TEXT,
-            time TEXT,
-            processed INTEGER DEFAULT 0
-        )
-        ''')
-
-        # Insert into SQLite database
-        cursor.execute("INSERT INTO images (image, metadata, date, time, processed) VALUES (?, ?, ?, ?, 0)", 
-                       (image_data['image'], image_data['text'], image_data['date'], image_data['time']))
-        conn.commit()
-
-        logging.debug(f"Data saved to database: {image_data}")
-
-        # Load existing data
-        if os.path.exists(json_output_path) and os.path.getsize(json_output_path) > 0:
-            with open(json_output_path, 'r') as json_file:
-                transcriptions = json.load(json_file)
+CREATE_LEDGER_TABLE = '''
+CREATE TABLE IF NOT EXISTS processed_files (
+    path TEXT PRIMARY KEY,
+    content_hash TEXT,
+    processed_at REAL
+)
+'''
+
+RECORD_PROCESSED_FILE = "INSERT OR REPLACE INTO processed_files (path, content_hash, processed_at) VALUES (?, ?, ?)"
+
+class ProcessedLedger:
+    """Crash-safe record of the image files already OCR'd, kept in the processed_files table.
+
+    A file's ledger row is committed in the same transaction as its OCR row, so after a crash a
+    file is either fully saved or still unprocessed; it stays claimed until that commit. Rows
+    are written through the process's DatabaseWriter, and the ledger's own connection only
+    reads. Memory stays bounded: only the files being processed and an LRU of the recent_size
+    most recently finished paths are held in memory; everything else is an indexed lookup.
+    """
+
+    def __init__(self, writer, path=db_path, recent_size=10000):
+        self.writer = writer
+        self.recent_size = recent_size
+        self.lock = threading.RLock()
+        self.in_progress = set()
+        self.recent = OrderedDict()
+        self.conn = connect(path, check_same_thread=False)
+        self.created = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'processed_files'").fetchone() is None
+        if self.created:
+            self.writer.execute(CREATE_LEDGER_TABLE)
+            self.writer.flush()
+
+    def record_statement(self, path, content_hash):
+        """Return the statement recording a file as processed, to commit with the file's OCR row."""
+        return RECORD_PROCESSED_FILE, (path, content_hash, time.time())
+
+    def is_processed(self, path):
+        with self.lock:
+            if path in self.recent:
+                self.recent.move_to_end(path)
+                return True
+            return self.conn.execute("SELECT 1 FROM processed_files WHERE path = ?", (path,)).fetchone() is not None
+
+    def is_known(self, path):
+        """Return True if a file is being processed or was processed before."""
+        with self.lock:
+            return path in self.in_progress or self.is_processed(path)
+
+    def claim(self, path):
+        """Mark a file as taken so concurrent workers never OCR it twice; returns False if it already was."""
+        with self.lock:
+            if self.is_known(path):
+                return False
+            self.in_progress.add(path)
+            return True
+
+    def finish(self, path, processed=True):
+        """Release a claimed file, remembering it as processed unless processing failed."""
+        with self.lock:
+            self.in_progress.discard(path)
+            if processed:
+                self.remember(path)
+
+    def remember(self, path):
+        with self.lock:
+            self.recent[path] = True
+            self.recent.move_to_end(path)
+            while len(self.recent) > self.recent_size:
+                self.recent.popitem(last=False)
+
+    def unseen_files(self, folder):
+        """List the image files in one folder that have no ledger row, using a range scan of its paths."""
+        prefix = os.path.join(str(folder), '')
+        with self.lock:
+            known = {row[0] for row in self.conn.execute(
+                "SELECT path FROM processed_files WHERE path >= ? AND path < ?", (prefix, prefix[:-1] + chr(ord(os.sep) + 1)))}
+        with os.scandir(folder) as entries:
+            return sorted(entry.path for entry in entries
+                          if entry.is_file() and Path(entry.name).suffix.lower() in IMAGE_SUFFIXES
+                          and entry.path not in known and entry.path not in self.in_progress)
+
+    def record_existing(self, paths):
+        """Mark files as processed without OCR (used to baseline files OCR'd before the ledger existed)."""
+        if paths:
+            now = time.time()
+            self.writer.execute_group([(RECORD_PROCESSED_FILE, (path, None, now)) for path in paths])
+            self.writer.flush()
+
+def catch_up_scan(workers=4):
+    """Queue the screenshots written while the pipeline was not running.
+
+    The date folders are listed in parallel and only files without a ledger row are queued. The
+    first time the ledger exists, files already on disk were OCR'd by earlier versions, so they
+    are recorded as processed instead of being OCR'd again.
+    """
+    folders = sorted(entry.path for entry in os.scandir(chemin_images) if entry.is_dir())
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='catch-up') as executor:
+        unseen_by_folder = list(executor.map(ledger.unseen_files, folders))
+
+    unseen = [path for paths in unseen_by_folder for path in paths]
+    if ledger.created:
+        ledger.record_existing(unseen)
+        logging.info(f"Processed-file ledger created; recorded {len(unseen)} existing screenshots")
+        return
+    for path in unseen:
+        ready_paths.put(path)
+    logging.info(f"Catch-up scan queued {len(unseen)} screenshots missed while the pipeline was down")
+
+def open_storage():
+    """Open the transcript log, the database writer and the processed-file ledger once per process."""
+    global transcript_log, db_writer, ledger
+    with save_lock:
+        if db_writer is None:
+            transcript_log = TranscriptLog()
+            db_writer = DatabaseWriter()
+            ledger = ProcessedLedger(db_writer)
+
+class OCRPool:
+    """A pool of long-lived OCR worker processes (ocr_worker.py) fed with batches of images.
+
+    Each worker loads its backend once and answers JSON-line batch requests on stdin/stdout.
+    submit() queues one image; a dispatcher thread per worker groups up to batch_size queued
+    images, waiting at most batch_timeout seconds to fill a batch, and resolves their futures.
+    A worker that dies is restarted and its batch fails.
+    """
+
+    def __init__(self, workers=2, backend=None, batch_size=4, batch_timeout=0.2):
+        self.backend = backend or default_backend()
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.requests = queue.Queue()
+        self.closed = False
+        self.dispatchers = [threading.Thread(target=self.dispatch_loop, name=f'ocr-worker-{i}', daemon=True)
+                            for i in range(workers)]
+        for dispatcher in self.dispatchers:
+            dispatcher.start()
+
+    def start_worker(self):
+        return subprocess.Popen([sys.executable, resource_path('ocr_worker.py'), '--backend', self.backend],
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1)
+
+    def submit(self, path=None, data=None):
+        """Queue an image file path, or encoded image bytes, and return a Future of its text."""
+        future = Future()
+        if path is not None:
+            item = {"path": str(path)}
         else:
-            transcriptions = []
-
-        # Group data by date
-        grouped_transcriptions = defaultdict(list)
-        for entry in transcriptions:
-            grouped_transcriptions[entry['date']].append({"time": entry['time'], "text": entry['text']})
-        
-        # Add new transcription
-        grouped_transcriptions[image_data['date']].append({"time": image_data['time'], "text": image_data['text']})
-
-        # Prepare data for saving
-        consolidated_transcriptions = [{"date": date, "entries": entries} for date, entries in grouped_transcriptions.items()]
-
-        # Save updated data
-        with open(json_output_path, 'w') as json_file:
-            json.dump(consolidated_transcriptions, json_file, indent=4)
-
-        logging.debug(f"Data saved to JSON file: {image_data}")
-        
-    except sqlite3.Error as e:
-        logging.error(f"Error saving to database: {e}")
-    finally:
-        conn.close()
-        gc.collect()
+            item = {"data": base64.b64encode(data).decode('ascii')}
+        self.requests.put((item, future))
+        return future
+
+    def recognize(self, path):
+        """Recognize one image file, blocking until its batch has been processed."""
+        return self.submit(path).result()
+
+    def next_batch(self):
+        """Wait for one request, then gather more until the batch is full or batch_timeout has passed."""
+        first = self.requests.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.batch_timeout
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                request = self.requests.get(timeout=max(remaining, 0)) if remaining > 0 else self.requests.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                self.requests.put(None)  # Leave the stop signal for this dispatcher's next call
+                break
+            batch.append(request)
+        return batch
+
+    def dispatch_loop(self):
+        worker = self.start_worker()
+        batch_id = 0
+        while True:
+            batch = self.next_batch()
+            if batch is None:
+                break
+            batch_id += 1
+            try:
+                worker.stdin.write(json.dumps({"id": batch_id, "items": [item for item, _ in batch]}) + "\n")
+                worker.stdin.flush()
+                line = worker.stdout.readline()
+                if not line:
+                    raise RuntimeError(f"OCR worker exited with code {worker.poll()}")
+                for (_, future), result in zip(batch, json.loads(line)["results"]):
+                    if "error" in result:
+                        future.set_exception(RuntimeError(result["error"]))
+                    else:
+                        future.set_result(result["text"])
+            except Exception as e:
+                logging.error(f"OCR worker failed, restarting it: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                worker.kill()
+                worker = self.start_worker()
+        worker.stdin.close()
+        worker.wait()
+
+    def close(self):
+        """Stop the dispatchers and their worker processes once the queued images are done."""
+        if not self.closed:
+            self.closed = True
+            for _ in self.dispatchers:
+                self.requests.put(None)
+            for dispatcher in self.dispatchers:
+                dispatcher.join()
+
+# Shared OCR worker pool, started by main(); without it each image spawns its own RemindOCR run
+ocr_pool = None
+# Cache of OCR results for screens seen before, opened by main()
+ocr_cache = None
+
+def recognize_text(file_path):
+    """Recognize the text of an image file, through the OCR worker pool when it is running."""
+    if ocr_pool is not None:
+        return ocr_pool.recognize(file_path)
+    result = subprocess.run(["RemindOCR", str(file_path)], capture_output=True, text=True, check=True)
+    return result.stdout.strip()
+
+def recognize_with_cache(file_path, cache_keys):
+    """Return the cached text for an image, or recognize it and cache the result.
+
+    cache_keys is the (content hash, perceptual hash, fine hash) triple of the image, or None to skip the cache.
+    """
+    if ocr_cache is None or cache_keys is None:
+        return recognize_text(file_path)
+
+    recognized_text = ocr_cache.lookup(*cache_keys)
+    if recognized_text is not None:
+        logging.info(f"OCR cache hit for {file_path}")
+        return recognized_text
+    recognized_text = recognize_text(file_path)
+    ocr_cache.store(*cache_keys, recognized_text)
+    return recognized_text
+
+def store_recognized_text(recognized_text, date_time, extra_statements=(), on_saved=None, on_failed=None):
+    """Save recognized text with the date and time it was captured, committing extra_statements with it.
+
+    on_saved() is called on the writer thread once everything is committed, on_failed() if it
+    is rolled back instead.
+    """
+    image_data = {
+        "image": None,  # Not inserting the image in the database
+        "date": date_time.strftime("%d %b %Y"),
+        "time": date_time.strftime("%H:%M"),
+        "text": recognized_text
+    }
+
+    logging.debug(f"Processed data: {image_data}")
+
+    open_storage()
+
+    # Deduplication and queueing happen under one lock so a delta is always saved after its parent
+    with dedup_lock:
+        action, stored_text, parent = ("full", recognized_text, None)
+        if deduplicator is not None:
+            action, stored_text, parent = deduplicator.check(recognized_text)
+
+        if action == "drop":
+            logging.debug("Near-duplicate text dropped")
+            if extra_statements:
+                db_writer.execute_group(list(extra_statements),
+                                        on_commit=None if on_saved is None else lambda row_id: on_saved(),
+                                        on_error=None if on_failed is None else lambda error: on_failed())
+            elif on_saved is not None:
+                on_saved()
+            return
+        image_data['text'] = stored_text
+
+        def append_to_log(row_id):
+            # Runs on the writer thread once the row is committed, so the log only lists saved rows
+            entry = {"id": row_id, "date": image_data['date'], "time": image_data['time'], "text": image_data['text']}
+            if action == "delta":
+                entry['parent'] = parent['row_id']
+            elif parent is not None:
+                parent['row_id'] = row_id
+            transcript_log.append(entry)
+            if on_saved is not None:
+                on_saved()
+
+        db_writer.insert_image(image_data, on_commit=append_to_log, extra_statements=extra_statements,
+                               on_error=None if on_failed is None else lambda error: on_failed())
+
+class FileEventCoalescer(FileSystemEventHandler):
+    """Collapse the created/modified/moved/closed events of each file into one "file is complete" hand-off.
+
+    A rename onto an image path (write-then-rename) or a close after writing completes a file at once.
+    Otherwise a file is complete once it has been quiet for quiet_period seconds, which flush_loop checks
+    on its own thread. The observer thread only records timestamps and never blocks.
+    """
+
+    def __init__(self, ready_paths, quiet_period=QUIET_PERIOD):
+        super().__init__()
+        self.ready_paths = ready_paths
+        self.quiet_period = quiet_period
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+
+    def is_candidate(self, path):
+        return Path(path).suffix.lower() in IMAGE_SUFFIXES and not ledger.is_known(path)
+
+    def touch(self, path):
+        """Record activity on a path and restart its quiet period."""
+        if self.is_candidate(path):
+            with self.lock:
+                self.pending[path] = time.monotonic()
+
+    def complete(self, path):
+        """Hand a finished path to the worker queue right away."""
+        with self.lock:
+            self.pending.pop(path, None)
+        if self.is_candidate(path):
+            self.ready_paths.put(path)
 
-class MyHandler(FileSystemEventHandler):
     def on_created(self, event):
-        """Handle new file creation events."""
-        if event.is_directory:
-            observer.schedule(FileHandler(), event.src_path, recursive=False)
-        else:
-            self.handle_file(event.src_path)
+        if not event.is_directory:
+            self.touch(event.src_path)
 
-    def handle_file(self, file_path):
-        """Process the newly created file."""
-        if file_path in processed_files:
-            return
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.touch(event.src_path)
 
-        try:
-            wait_for_file_to_finish(file_path)
-
-            if str(chemin_images) in file_path:
-                logging.info(f"Processing new image file: {file_path}")
-                
-                # Call the Swift command-line tool
-                try:
-                    result = subprocess.run(["RemindOCR", file_path], capture_output=True, text=True, check=True)
-                    recognized_text = result.stdout.strip()
-                    logging.info(f"Recognized text: {recognized_text}")
-
-                    # Save to JSON
-                    date_time = extract_date_from_image(file_path)
-                    if not date_time:
-                        date_time = datetime.now()
-                    date_str = date_time.strftime("%d %b %Y")
-                    time_str = date_time.strftime("%H:%M")
-
-                    image_data = {
-                        "image": None,  # Not inserting the image in the database
-                        "date": date_str,
-                        "time": time_str,
-                        "text": recognized_text
-                    }
-
-                    logging.debug(f"Processed data: {image_data}")
-
-                    save_to_db_and_json(image_data, json_output_path)
-
-                    # Mark the file as processed
-                    processed_files[file_path] = True
-                    gc.collect()  # Collect garbage to free up memory
-
-                except subprocess.CalledProcessError as e:
-                    logging.error(f"OCR process failed: {e}")
-                except Exception as e:
-                    logging.error(f"Error processing file: {e}")
-
-        except Exception as e:
-            logging.error(f"Error processing file {str(file_path)}: {e}")
-
-class FileHandler(FileSystemEventHandler):
-    def on_created(self, event):
-        """Handle new file creation events."""
+    def on_moved(self, event):
         if not event.is_directory:
-            MyHandler().handle_file(event.src_path)
+            with self.lock:
+                self.pending.pop(event.src_path, None)
+            self.complete(event.dest_path)
 
-# Observer to monitor main directories (detect new date folders)
-observer = Observer()
-observer.schedule(MyHandler(), str(chemin_images), recursive=True)
-observer.schedule(MyHandler(), str(chemin_transcriptions), recursive=True)
-observer.start()
+    def on_closed(self, event):
+        if not event.is_directory:
+            self.complete(event.src_path)
+
+    def flush_quiet_paths(self):
+        """Hand off every pending path that has been quiet for the whole quiet period."""
+        now = time.monotonic()
+        with self.lock:
+            quiet = [path for path, last_seen in self.pending.items() if now - last_seen >= self.quiet_period]
+            for path in quiet:
+                del self.pending[path]
+        for path in quiet:
+            self.ready_paths.put(path)
+
+    def flush_loop(self):
+        while not self.stop_event.wait(self.quiet_period / 2):
+            self.flush_quiet_paths()
+
+def handle_file(file_path):
+    """Process a finished image file."""
+    if str(chemin_images) not in file_path or not ledger.claim(file_path):
+        return
+
+    logging.info(f"Processing new image file: {file_path}")
+    try:
+        # Reuse the text of an identical screen, or call the OCR workers
+        cache_keys = file_cache_keys(file_path, ocr_cache.perceptual_matching) if ocr_cache is not None else None
+        recognized_text = recognize_with_cache(file_path, cache_keys)
+        logging.info(f"Recognized text: {recognized_text}")
+
+        # Save the recognized text and record the file in the ledger in the same commit
+        # The recorder's JPEGs carry no EXIF, and files caught up after a restart must keep their capture time
+        date_time = extract_date_from_image(file_path) or capture_time_from_path(file_path) or datetime.now()
+        content_hash = cache_keys[0] if cache_keys else file_content_hash(file_path)
+        # The file stays claimed until its text and ledger row are committed, or rolled back
+        store_recognized_text(recognized_text, date_time, [ledger.record_statement(file_path, content_hash)],
+                              on_saved=lambda: ledger.finish(file_path),
+                              on_failed=lambda: ledger.finish(file_path, processed=False))
+        gc.collect()  # Collect garbage to free up memory
+
+    except subprocess.CalledProcessError as e:
+        logging.error(f"OCR process failed: {e}")
+        ledger.finish(file_path, processed=False)
+    except Exception as e:
+        logging.error(f"Error processing file {str(file_path)}: {e}")
+        ledger.finish(file_path, processed=False)
 
-try:
+def file_worker():
+    """Process finished files from the worker queue; several run at once and the ledger keeps them apart."""
     while True:
-        time.sleep(1)  # Avoid a busy-wait loop
-except KeyboardInterrupt:
-    handle_termination(signal.SIGINT, None)
\ No newline at end of file
+        file_path = ready_paths.get()
+        if file_path is None:
+            break
+        handle_file(file_path)
+
+# Capture events handed over in-process by the recorder in direct mode
+capture_events = queue.Queue(maxsize=8)
+
+def process_capture_event(event, archive_path=None):
+    """OCR a capture event received in memory and save the text with its capture time.
+
+    The OCR backends read image files, so the frame is dumped to an uncompressed temporary
+    bitmap for the call; there is no JPEG encode, no watchdog event and no size polling. The
+    archived copy of the frame, if any, is recorded in the ledger in the same commit as the text.
+    """
+    from record_photo import capture_event_image
+
+    fd, temp_path = tempfile.mkstemp(suffix='.bmp')
+    os.close(fd)
+    try:
+        image = capture_event_image(event)
+        cache_keys = array_cache_keys(image, ocr_cache.perceptual_matching) if ocr_cache is not None else None
+        recognized_text = ocr_cache.lookup(*cache_keys) if cache_keys is not None else None
+        if recognized_text is None:
+            Image.fromarray(image).convert('RGB').save(temp_path, 'BMP')
+            recognized_text = recognize_text(temp_path)
+            if cache_keys is not None:
+                ocr_cache.store(*cache_keys, recognized_text)
+        logging.info(f"Recognized text: {recognized_text}")
+        if archive_path is None:
+            store_recognized_text(recognized_text, event['captured_at'])
+        else:
+            store_recognized_text(recognized_text, event['captured_at'], [ledger.record_statement(archive_path, None)],
+                                  on_saved=lambda: ledger.finish(archive_path),
+                                  on_failed=lambda: ledger.finish(archive_path, processed=False))
+    except subprocess.CalledProcessError as e:
+        logging.error(f"OCR process failed: {e}")
+        if archive_path is not None:
+            ledger.finish(archive_path, processed=False)
+    except Exception as e:
+        logging.error(f"Error processing capture event: {e}")
+        if archive_path is not None:
+            ledger.finish(archive_path, processed=False)
+    finally:
+        os.remove(temp_path)
+
+def capture_event_worker():
+    """OCR (capture event, archive path) pairs from the in-memory queue until a None sentinel is received."""
+    while True:
+        item = capture_events.get()
+        if item is None:
+            break
+        process_capture_event(*item)
+
+def start_direct_capture(archive=False, interval=2, duration=86400):
+    """Run the screen recorder in this process and hand its frames straight to OCR.
+
+    With archive=True the frames are also written to the screenshots folder; those paths are
+    claimed in the ledger first so the watchdog fallback does not OCR them a second time, and
+    recorded in it with the frame's text.
+    """
+    from record_photo import CapturePipeline, capture_event_path, create_folder_for_today, save_capture_event
+
+    daily_folder = create_folder_for_today()
+
+    def hand_off(event):
+        archive_path = None
+        if archive:
+            # The frame is OCR'd from memory; its archived copy is claimed now and recorded with the text
+            archive_path = str(capture_event_path(daily_folder, event))
+            ledger.claim(archive_path)
+            save_capture_event(daily_folder, event)
+        capture_events.put((event, archive_path))  # Blocks when OCR falls behind, so the recorder drops frames instead
+
+    threading.Thread(target=capture_event_worker, name='ocr-direct', daemon=True).start()
+    pipeline = CapturePipeline(daily_folder, interval, 0.9, 10, sink=hand_off)
+    threading.Thread(target=pipeline.run, args=(duration,), name='screenshot-capture', daemon=True).start()
+    return pipeline
+
+# Observer to monitor the screenshot and transcription directories
+observer = Observer()
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR new screenshots and store the recognized text.")
+    parser.add_argument('--direct', action='store_true',
+                        help="record the screen in this process and pass frames to OCR in memory")
+    parser.add_argument('--archive', action='store_true',
+                        help="in direct mode, also save the frames to the screenshots folder")
+    parser.add_argument('--ocr-backend', default=default_backend(), choices=sorted(BACKENDS),
+                        help="recogniser loaded by the OCR workers (default: vision if pyobjc's Vision is installed, "
+                             "else remindocr, which starts a process per image)")
+    parser.add_argument('--ocr-workers', type=int, default=2, help="number of long-lived OCR worker processes")
+    parser.add_argument('--ocr-batch-size', type=int, default=4, help="images sent to a worker at once")
+    parser.add_argument('--ocr-cache-size', type=int, default=5000,
+                        help="OCR results kept for screens seen before (0 disables the cache)")
+    parser.add_argument('--ocr-near-duplicates', action='store_true',
+                        help="also reuse the OCR text of re-encoded copies of a cached screen")
+    parser.add_argument('--dedup-threshold', type=float, default=0.8,
+                        help="line similarity above which OCR text is stored as a delta or dropped (0 disables)")
+    args = parser.parse_args()
+
+    global ocr_pool, ocr_cache, deduplicator
+    if args.dedup_threshold > 0:
+        deduplicator = TextDeduplicator(args.dedup_threshold)
+    ocr_pool = OCRPool(args.ocr_workers, args.ocr_backend, args.ocr_batch_size)
+    if args.ocr_cache_size > 0:
+        ocr_cache = OCRCache(max_entries=args.ocr_cache_size, perceptual_matching=args.ocr_near_duplicates)
+
+    # Registering the termination signals
+    signal.signal(signal.SIGTERM, handle_termination)
+    signal.signal(signal.SIGINT, handle_termination)
+
+    open_storage()
+    threading.Thread(target=catch_up_scan, name='catch-up-scan', daemon=True).start()
+
+    # The watchdog path stays active for screenshots dropped in from outside.
+    # Both watches are recursive, so new date folders need no extra observers.
+    coalescer = FileEventCoalescer(ready_paths)
+    observer.schedule(coalescer, str(chemin_images), recursive=True)
+    observer.schedule(coalescer, str(chemin_transcriptions), recursive=True)
+    threading.Thread(target=coalescer.flush_loop, name='event-coalescer', daemon=True).start()
+    # Enough file workers to keep every OCR worker's batches full
+    for i in range(args.ocr_workers * args.ocr_batch_size):
+        threading.Thread(target=file_worker, name=f'ocr-files-{i}', daemon=True).start()
+    observer.start()
+
+    if args.direct:
+        start_direct_capture(archive=args.archive)
+
+    try:
+        while True:
+            time.sleep(1)  # Avoid a busy-wait loop
+    except KeyboardInterrupt:
+        handle_termination(signal.SIGINT, None)
+
+if __name__ == "__main__":
+    main()
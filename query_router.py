@@ -0,0 +1,222 @@
+# Purpose: This module routes chat questions without a model round-trip: a lexical classifier decides whether a question needs the personal knowledge base, and a deterministic parser turns temporal expressions ("yesterday", "last Tuesday", "this morning", dates and ranges) into a time window. The LLM is only asked when either of them is unsure.
+
+import calendar
+import re
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+
+# Below this confidence the classifier defers to the LLM
+ROUTER_MIN_CONFIDENCE = 0.6
+
+# A time window; start and end are datetimes, label is the expression it was read from
+TimeRange = namedtuple('TimeRange', ['start', 'end', 'label'])
+
+WEEKDAYS = [day.lower() for day in calendar.day_name]
+MONTHS = {name.lower(): number for number, name in enumerate(calendar.month_name) if name}
+MONTHS.update({name.lower(): number for number, name in enumerate(calendar.month_abbr) if name})
+MONTHS['sept'] = 9
+MONTH_NAMES = "|".join(sorted(MONTHS, key=len, reverse=True))
+WEEKDAY_NAMES = "|".join(WEEKDAYS)
+
+# Parts of the day as (start hour, end hour)
+DAY_PARTS = {"morning": (5, 12), "afternoon": (12, 17), "evening": (17, 22), "night": (20, 24)}
+UNITS = {"minute": timedelta(minutes=1), "hour": timedelta(hours=1), "day": timedelta(days=1),
+         "week": timedelta(weeks=1), "month": timedelta(days=30)}
+NUMBER_WORDS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+                "eight": 8, "nine": 9, "ten": 10, "couple of": 2, "few": 3}
+NUMBER = r"(\d+|" + "|".join(NUMBER_WORDS) + r")"
+
+PERSONAL = re.compile(r"\b(i|i'm|i've|i'd|me|my|mine|myself|we|our|us)\b")
+ACTIVITY = re.compile(r"\b(did|doing|done|was|were|work(ed|ing)? on|read(ing)?|wrote|writ(e|ing)|watch(ed|ing)?|saw|seen|"
+                      r"look(ed|ing) at|open(ed)?|visit(ed)?|brows(e|ed|ing)|search(ed)?|spent|meeting|call|email|"
+                      r"message|chat|screen|document|file|page|tab|website|project)\b")
+GENERAL = re.compile(r"^\s*(what is|what are|what's|who is|who was|who are|define|explain|how (do|does|to|can)|"
+                     r"why (is|are|do|does)|translate|calculate|convert|tell me a|write (a|an|me)|"
+                     r"give me an? (example|definition|joke))\b")
+# Words that suggest a time reference the parser may not understand
+TEMPORAL_HINT = re.compile(r"\b(when|ago|last|past|earlier|previous|before|after|during|since|until|o'clock|"
+                           r"\d{1,2} ?(am|pm)|weekend|noon|midnight)\b")
+
+def classify_query(question):
+    """Return (needs_search, confidence) for a question from its wording alone."""
+    text = question.lower()
+    personal = bool(PERSONAL.search(text))
+    activity = bool(ACTIVITY.search(text))
+    temporal = parse_time_range(text)[0] is not None
+    if personal and (activity or temporal):
+        return True, 0.95
+    if activity and temporal:
+        return True, 0.85
+    if GENERAL.search(text) and not temporal:
+        return False, 0.85 if not personal else 0.5
+    if personal or temporal:
+        return True, 0.7
+    return False, 0.4
+
+def day_range(first, last, label):
+    """The window from the start of day first to the end of day last."""
+    return TimeRange(datetime.combine(first, time.min), datetime.combine(last, time.max), label)
+
+def resolve_year(month, day, year, today):
+    """The date for a day and month; without a year, the latest one that is not in the future."""
+    if year is not None:
+        return datetime(year, month, day).date()
+    candidate = datetime(today.year, month, day).date()
+    return candidate if candidate <= today else datetime(today.year - 1, month, day).date()
+
+def explicit_date(text, today):
+    """Read a written date (2024-06-01, June 1st 2024, 1 June), or return None."""
+    try:
+        match = re.search(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b", text)
+        if match:
+            return datetime(int(match[1]), int(match[2]), int(match[3])).date()
+        match = re.search(rf"\b({MONTH_NAMES})\.? (\d{{1,2}})(?:st|nd|rd|th)?\b(?:,? (\d{{4}}))?", text)
+        if match:
+            return resolve_year(MONTHS[match[1]], int(match[2]), match[3] and int(match[3]), today)
+        match = re.search(rf"\b(\d{{1,2}})(?:st|nd|rd|th)? (?:of )?({MONTH_NAMES})\b\.?(?:,? (\d{{4}}))?", text)
+        if match:
+            return resolve_year(MONTHS[match[2]], int(match[1]), match[3] and int(match[3]), today)
+    except ValueError:
+        pass  # Not a real date, e.g. February 30
+    return None
+
+def month_range(text, today):
+    """Read a whole month ("in March", "during june 2024", "since march"), or return None.
+
+    A bare month name only counts after a preposition, before a year or on its own, so the
+    verb "may" is not read as a month. Without a year it is the latest March that has begun.
+    """
+    month = rf"({MONTH_NAMES})\b\.?"
+    year = r"(?:,? (\d{4})\b)?"
+    match = (re.search(rf"\b(?:in|during|for|of|last) {month}{year}", text) or re.fullmatch(month + year, text)
+             or re.search(rf"\b{month},? (\d{{4}})\b", text))
+    if not match:
+        return None
+    month, year = MONTHS[match[1]], match[2]
+    year = int(year) if year else today.year if month <= today.month else today.year - 1
+    first = datetime(year, month, 1).date()
+    last = min(first.replace(day=calendar.monthrange(year, month)[1]), today)
+    if first > today:
+        return None
+    return day_range(first, last, match[0].strip())
+
+def number_value(word):
+    return int(word) if word.isdigit() else NUMBER_WORDS[word]
+
+def parse_time_range(question, now=None):
+    """Read the time window a question refers to.
+
+    Returns (time_range, confident). time_range is None when the question names no window
+    (search everything); confident is False when it seems to name one the parser cannot read,
+    in which case the caller should ask the LLM.
+    """
+    now = now or datetime.now()
+    today = now.date()
+    text = " ".join(question.lower().split())
+
+    # Ranges: "from monday to wednesday", "between june 1 and june 3", "since tuesday"
+    match = re.search(r"\b(?:from|between) (.+?) (?:to|and|until|till|through) (.+?)(?:[?.!,]|$)", text)
+    if match:
+        first, _ = parse_time_range(match[1], now)
+        last, _ = parse_time_range(match[2], now)
+        if first is not None and last is not None:
+            if first.start > last.end:
+                # Both ends were resolved back from now ("from saturday to tuesday" on a Monday);
+                # the start is the one before the end
+                first, _ = parse_time_range(match[1], last.end)
+            if first is None or first.start > last.end:
+                return None, False
+            return TimeRange(first.start, last.end, match[0].strip()), True
+    match = re.search(r"\bsince (.+?)(?:[?.!,]|$)", text)
+    if match:
+        first, _ = parse_time_range(match[1], now)
+        if first is not None:
+            return TimeRange(first.start, now, match[0].strip()), True
+
+    # Relative spans: "in the last 3 days", "past two hours", "2 weeks ago"
+    match = re.search(rf"\b(last|past) (?:{NUMBER} )?(minute|hour|day|week|month)s?\b", text)
+    if match and (match[2] or match[1] == "past" or match[3] in ("minute", "hour", "day")):
+        span = UNITS[match[3]] * (number_value(match[2]) if match[2] else 1)
+        return TimeRange(now - span, now, match[0]), True
+    match = re.search(rf"\b{NUMBER} (day|week|month)s? ago\b", text)
+    if match:
+        day = today - UNITS[match[2]] * number_value(match[1])
+        return day_range(day, day, match[0]), True
+
+    # Parts of a day: "this morning", "yesterday afternoon", "tonight", "last night"
+    if re.search(r"\blast night\b", text):
+        yesterday = today - timedelta(days=1)
+        return TimeRange(datetime.combine(yesterday, time(18)), datetime.combine(today, time(6)), "last night"), True
+    match = re.search(r"\b(this|yesterday|today) (morning|afternoon|evening|night)\b|\btonight\b", text)
+    if match:
+        day = today - timedelta(days=1) if match[1] == "yesterday" else today
+        start_hour, end_hour = DAY_PARTS[match[2] or "night"]
+        end = datetime.combine(day, time.max) if end_hour == 24 else datetime.combine(day, time(end_hour))
+        return TimeRange(datetime.combine(day, time(start_hour)), end, match[0]), True
+
+    # Whole days
+    if re.search(r"\bday before yesterday\b", text):
+        day = today - timedelta(days=2)
+        return day_range(day, day, "the day before yesterday"), True
+    if re.search(r"\byesterday\b", text):
+        day = today - timedelta(days=1)
+        return day_range(day, day, "yesterday"), True
+    if re.search(r"\btoday\b", text):
+        return day_range(today, today, "today"), True
+
+    # Weeks, months and vague recency
+    match = re.search(r"\b(this|last|previous) (week|month|weekend)\b", text)
+    if match:
+        previous = match[1] != "this"
+        if match[2] == "week":
+            start = today - timedelta(days=today.weekday() + (7 if previous else 0))
+            end = start + timedelta(days=6) if previous else today
+        elif match[2] == "weekend":
+            saturday = today - timedelta(days=(today.weekday() - 5) % 7 + (7 if previous and today.weekday() >= 5 else 0))
+            start, end = saturday, min(saturday + timedelta(days=1), today)
+        else:
+            start = today.replace(day=1)
+            if previous:
+                end = start - timedelta(days=1)
+                start = end.replace(day=1)
+            else:
+                end = today
+        return day_range(start, end, match[0]), True
+    if re.search(r"\b(recently|lately|these days)\b", text):
+        return day_range(today - timedelta(days=7), today, "recently"), True
+
+    # Weekdays: "last tuesday" is before today, "on tuesday" may be today
+    match = re.search(rf"\b(last |this past |on |this )?({WEEKDAY_NAMES})\b", text)
+    if match:
+        back = (today.weekday() - WEEKDAYS.index(match[2])) % 7
+        if back == 0 and match[1] in ("last ", "this past "):
+            back = 7
+        day = today - timedelta(days=back)
+        return day_range(day, day, match[0].strip()), True
+
+    day = explicit_date(text, today)
+    if day is not None:
+        return day_range(day, day, day.strftime("%d %b %Y")), True
+    month = month_range(text, today)
+    if month is not None:
+        return month, True
+
+    return None, not TEMPORAL_HINT.search(text)
+
+def route_query(question, classify_fallback, time_range_fallback, now=None):
+    """Decide whether a question needs a search and over which window.
+
+    Returns (needs_search, time_range). classify_fallback(question) -> bool and
+    time_range_fallback(question) -> TimeRange or None, typically LLM calls, are only used
+    when the local classifier or parser is unsure.
+    """
+    needs_search, confidence = classify_query(question)
+    if confidence < ROUTER_MIN_CONFIDENCE:
+        needs_search = classify_fallback(question)
+    if not needs_search:
+        return False, None
+
+    time_range, confident = parse_time_range(question, now)
+    if not confident:
+        time_range = time_range_fallback(question)
+    return True, time_range
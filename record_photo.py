@@ -1,5 +1,5 @@
 # Author: Elyes Rayane Melbouci
-# Purpose: This script takes screenshots at regular intervals, checks for significant changes using SSIM and histogram similarity, and saves the screenshots if changes are detected.
+# Purpose: This script takes screenshots at regular intervals, checks for significant changes using a block-mean pre-filter backed by SSIM and histogram similarity, and saves the screenshots (or only their changed regions) if changes are detected.
 
 import sqlite3
 import os
@@ -8,11 +8,13 @@ import logging
 from PIL import Image
 import datetime
 import numpy as np
-import pyautogui
 import cv2
 from skimage.metrics import structural_similarity as ssim
 import sys
 import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque, namedtuple
 from pathlib import Path
 
 def resource_path(relative_path):
@@ -34,11 +36,70 @@ def create_folder_for_today():
         daily_folder.mkdir(parents=True, exist_ok=True)
     return daily_folder
 
-def combined_similarity_check(img1, img2, threshold=0.95):
-    """Check both SSIM and histogram similarity to determine if significant changes have occurred."""
-    img1_gray = cv2.cvtColor(img1, cv2.COLOR_BGR2GRAY)
-    img2_gray = cv2.cvtColor(img2, cv2.COLOR_BGR2GRAY)
-    ssim_score, _ = ssim(img1_gray, img2_gray, full=True)
+# Size (rows, cols) of the block-mean signature used as a cheap change pre-filter
+SIGNATURE_SIZE = (32, 32)
+# A block whose mean moved by more than this many grey levels counts as changed
+PREFILTER_BLOCK_TOLERANCE = 12.0
+# If at least this fraction of blocks changed, the frame is different without running SSIM
+PREFILTER_CHANGED_FRACTION = 0.5
+# If at most this fraction of pixels differ, the frame is the same without running SSIM.
+# Each pixel only touches the 7x7 SSIM windows around it, so this many changed pixels
+# cannot pull the mean SSIM down by more than 98 * 0.0004 < 0.05.
+PREFILTER_UNCHANGED_PIXEL_FRACTION = 0.0004
+
+# Grid (rows, cols) of tiles compared to find the changed parts of the screen
+TILE_GRID = (10, 12)
+# A pixel whose grey level moved by more than this marks its tile as changed
+TILE_DIFF_TOLERANCE = 16
+# Margin in pixels added around each changed region so text at its border is not cut
+REGION_PADDING = 8
+# If the changed regions cover more than this fraction of the screen, the whole frame is saved
+FULL_FRAME_FRACTION = 0.6
+# The first save after this interval is always a full keyframe
+KEYFRAME_INTERVAL = datetime.timedelta(minutes=5)
+
+# A captured frame reduced to what the change detector needs
+Frame = namedtuple('Frame', ['gray', 'signature'])
+
+def to_grayscale(img):
+    """Return a single-channel version of the image, leaving grayscale images untouched."""
+    if img.ndim == 2:
+        return img
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+def block_signature(gray, size=SIGNATURE_SIZE):
+    """Downsample a grayscale image to a small grid of block means."""
+    rows, cols = size
+    height, width = gray.shape
+    block_h, block_w = height // rows, width // cols
+    blocks = gray[:block_h * rows, :block_w * cols].reshape(rows, block_h, cols, block_w)
+    return blocks.mean(axis=(1, 3), dtype=np.float32)
+
+def make_frame(img):
+    """Build a Frame (grayscale image and block signature) from a screenshot array."""
+    gray = to_grayscale(img)
+    return Frame(gray, block_signature(gray))
+
+def quick_similarity_check(frame1, frame2):
+    """Compare two frames with cheap tests only.
+
+    Returns False if the block signatures show a large change, True if almost no pixel changed,
+    and None when neither test is conclusive and a full SSIM comparison is needed.
+    """
+    diff = np.abs(frame1.signature - frame2.signature)
+    if np.mean(diff > PREFILTER_BLOCK_TOLERANCE) >= PREFILTER_CHANGED_FRACTION:
+        return False
+    if frame1.gray.shape == frame2.gray.shape:
+        changed_pixels = np.count_nonzero(frame1.gray != frame2.gray)
+        if changed_pixels <= PREFILTER_UNCHANGED_PIXEL_FRACTION * frame1.gray.size:
+            return True
+    return None
+
+def similarity_score(img1, img2):
+    """Return the lower of the SSIM and histogram correlation scores of two images."""
+    img1_gray = to_grayscale(img1)
+    img2_gray = to_grayscale(img2)
+    ssim_score = ssim(img1_gray, img2_gray)
 
     # Convert the histograms to CV_32F
     hist1 = cv2.calcHist([img1_gray], [0], None, [256], [0, 256]).flatten()
@@ -48,44 +109,264 @@ def combined_similarity_check(img1, img2, threshold=0.95):
 
     hist_score = cv2.compareHist(hist1, hist2, cv2.HISTCMP_CORREL)
 
-    return (ssim_score > threshold) and (hist_score > threshold)  # Adjust these thresholds as needed
+    return min(ssim_score, hist_score)
+
+def combined_similarity_check(img1, img2, threshold=0.95):
+    """Check both SSIM and histogram similarity to determine if significant changes have occurred."""
+    return similarity_score(img1, img2) > threshold  # Adjust these thresholds as needed
+
+def frame_similarity(frame1, frame2):
+    """Score two frames, running the cheap pre-filter first and SSIM and histograms only when it is inconclusive.
+
+    A conclusive pre-filter maps to 1.0 (unchanged) or 0.0 (changed), so a single score can be
+    compared against several thresholds without running the comparison again.
+    """
+    verdict = quick_similarity_check(frame1, frame2)
+    if verdict is not None:
+        return 1.0 if verdict else 0.0
+    return similarity_score(frame1.gray, frame2.gray)
+
+def tiered_similarity_check(frame1, frame2, threshold=0.95):
+    """Run the cheap pre-filter first and only fall back to SSIM and histograms when it is inconclusive."""
+    return frame_similarity(frame1, frame2) > threshold
+
+def changed_tiles(gray1, gray2, grid=TILE_GRID):
+    """Return a boolean (rows, cols) mask of the tiles that differ between two grayscale images, and the tile size."""
+    rows, cols = grid
+    height, width = gray1.shape
+    tile_h, tile_w = -(-height // rows), -(-width // cols)
+    changed = np.zeros((tile_h * rows, tile_w * cols), dtype=bool)
+    changed[:height, :width] = cv2.absdiff(gray1, gray2) > TILE_DIFF_TOLERANCE
+    return changed.reshape(rows, tile_h, cols, tile_w).any(axis=(1, 3)), (tile_h, tile_w)
+
+def dirty_regions(gray1, gray2, grid=TILE_GRID, padding=REGION_PADDING):
+    """Return the bounding rectangles (x, y, width, height) of the connected groups of changed tiles."""
+    mask, (tile_h, tile_w) = changed_tiles(gray1, gray2, grid)
+    height, width = gray1.shape
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask.astype(np.uint8), connectivity=8)
+
+    regions = []
+    for col, row, cols, rows, _ in stats[1:]:  # Label 0 is the unchanged background
+        left = max(col * tile_w - padding, 0)
+        top = max(row * tile_h - padding, 0)
+        right = min((col + cols) * tile_w + padding, width)
+        bottom = min((row + rows) * tile_h + padding, height)
+        regions.append((int(left), int(top), int(right - left), int(bottom - top)))
+    return regions
+
+def compose_regions(image, regions, gap=20):
+    """Stack the crops of the given regions vertically on a white canvas so they can be OCR'd as one image."""
+    crops = [image[y:y + h, x:x + w] for x, y, w, h in regions]
+    canvas_w = max(crop.shape[1] for crop in crops)
+    canvas_h = sum(crop.shape[0] for crop in crops) + gap * (len(crops) - 1)
+    canvas = np.full((canvas_h, canvas_w) + image.shape[2:], 255, dtype=image.dtype)
+
+    top = 0
+    for crop in crops:
+        canvas[top:top + crop.shape[0], :crop.shape[1]] = crop
+        top += crop.shape[0] + gap
+    return canvas
+
+def build_capture_event(screenshot_np, frame, last_frame, captured_at, keyframe_due):
+    """Describe what should be stored for a changed screenshot.
+
+    The event holds the capture time, the full image and the changed regions. regions is None
+    for a keyframe, which is stored whole: the first frame, a frame after KEYFRAME_INTERVAL,
+    or a frame whose changes cover most of the screen.
+    """
+    regions = None
+    if last_frame is not None and not keyframe_due and last_frame.gray.shape == frame.gray.shape:
+        regions = dirty_regions(last_frame.gray, frame.gray)
+        changed_area = sum(w * h for _, _, w, h in regions)
+        if not regions or changed_area > FULL_FRAME_FRACTION * frame.gray.size:
+            regions = None
+    return {'captured_at': captured_at, 'image': screenshot_np, 'regions': regions}
+
+def capture_event_image(event):
+    """Return the image to store or OCR for a capture event: the whole screen for a keyframe, otherwise its changed regions."""
+    if event['regions'] is None:
+        return event['image']
+    return compose_regions(event['image'], event['regions'])
+
+def capture_event_path(daily_folder, event):
+    """Return the file path a capture event is saved to."""
+    time_str = event['captured_at'].strftime("%H-%M-%S-%f")
+    if event['regions'] is None:
+        return daily_folder / f'Screen_{time_str}.jpeg'
+    return daily_folder / f'Screen_{time_str}_regions.jpeg'
+
+def save_capture_event(daily_folder, event):
+    """Write a capture event to disk: the whole screen for a keyframe, otherwise only its changed regions."""
+    filepath = capture_event_path(daily_folder, event)
+    partial_path = filepath.with_name(filepath.name + '.part')
+    screenshot = Image.fromarray(capture_event_image(event))
+    screenshot = screenshot.convert('RGB')  # Convert to RGB to avoid RGBA to JPEG issue
+    screenshot.save(str(partial_path), 'JPEG')  # Convert Path to string
+    os.replace(partial_path, filepath)  # The rename tells watchers the file is complete
+    return filepath
+
+def grab_screenshot():
+    """Grab the screen and return the capture time and the resized screenshot array."""
+    import pyautogui  # Imported lazily so the similarity helpers can be used without a display
 
-def take_screenshot_with_feature_check(daily_folder, last_image=None):
-    """Take a screenshot and check feature similarity before saving."""
     screenshot = pyautogui.screenshot()
+    captured_at = datetime.datetime.now()
     screenshot_np = np.array(screenshot.resize((1200, 1000)))  # Resize the screenshot to reduce memory usage
-    screenshot = Image.fromarray(screenshot_np)
+    return captured_at, screenshot_np
 
-    if last_image is not None:
-        if combined_similarity_check(screenshot_np, last_image):
-            return last_image  # Images are similar, do not save
+class CapturePipeline:
+    """Grab screenshots on a fixed schedule and hand them to a change-detection worker and a JPEG encoder pool.
 
-    # Save the image if no similarity is found
-    now = datetime.datetime.now()
-    time_str = now.strftime("%H-%M-%S-%f")
-    filename = f'Screen_{time_str}.jpeg'
-    filepath = daily_folder / filename
-    screenshot = screenshot.convert('RGB')  # Convert to RGB to avoid RGBA to JPEG issue
-    screenshot.save(str(filepath), 'JPEG')  # Convert Path to string
-    return screenshot_np
+    Changed frames are passed to sink(event) on the encoder pool; by default they are saved to
+    daily_folder as JPEGs, but a caller can hand them straight to another stage instead. The
+    capture thread only grabs and enqueues, so the sampling period does not drift with the cost
+    of comparing and encoding. Frames wait in a bounded queue; when the diff worker falls behind,
+    the oldest queued frame is dropped and counted in dropped_frames.
+    """
+
+    def __init__(self, daily_folder, interval, threshold=0.95, buffer_size=10, queue_size=4, encode_workers=2,
+                 similarity_threshold=0.95, sink=None):
+        self.daily_folder = daily_folder
+        self.sink = sink or (lambda event: save_capture_event(self.daily_folder, event))
+        self.interval = interval
+        self.threshold = threshold
+        self.similarity_threshold = similarity_threshold
+        self.recent_matches = deque(maxlen=buffer_size - 1)
+        self.frames = queue.Queue(maxsize=queue_size)
+        self.encoder = ThreadPoolExecutor(max_workers=encode_workers, thread_name_prefix='screenshot-encoder')
+        # Bounds the number of events waiting for the encoder; the diff worker blocks when it is exhausted
+        self.encode_slots = threading.BoundedSemaphore(queue_size)
+        self.stop_event = threading.Event()
+        self.dropped_frames = 0
+        self.skipped_ticks = 0
+        self.saved_events = 0
+        self.stats_lock = threading.Lock()
+
+    def enqueue_frame(self, item):
+        """Queue a grabbed frame, dropping the oldest queued frame if the queue is full."""
+        while True:
+            try:
+                self.frames.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.frames.get_nowait()
+                except queue.Empty:
+                    continue
+                self.dropped_frames += 1
+                logging.warning(f"Screenshot queue full, dropped a frame ({self.dropped_frames} dropped so far)")
+
+    def capture_loop(self, duration):
+        """Grab a screenshot every interval seconds on a fixed-rate schedule until duration elapses."""
+        start = time.monotonic()
+        next_tick = start
+        while not self.stop_event.is_set() and time.monotonic() - start < duration:
+            try:
+                self.enqueue_frame(grab_screenshot())
+            except Exception as e:
+                logging.error(f"Error grabbing screenshot: {e}")
+
+            next_tick += self.interval
+            delay = next_tick - time.monotonic()
+            if delay < 0:
+                # The grab itself overran: skip the missed ticks instead of grabbing in a burst
+                missed = int(-delay // self.interval) + 1
+                self.skipped_ticks += missed
+                next_tick += missed * self.interval
+                delay = next_tick - time.monotonic()
+            self.stop_event.wait(delay)
+
+    def diff_loop(self):
+        """Compare each queued frame with the last kept one and submit changed frames for encoding.
+
+        A frame that fails is logged and skipped, so the worker keeps draining the queue.
+        """
+        last_frame = None
+        last_keyframe_at = None
+        while True:
+            item = self.frames.get()
+            if item is None:
+                break
+            try:
+                captured_at, screenshot_np = item
+                frame = make_frame(screenshot_np)
+
+                if last_frame is not None:
+                    score = frame_similarity(frame, last_frame)
+                    self.recent_matches.append(score > 0.9)
+                    avg_ssim_score = np.mean(self.recent_matches)
+                    if avg_ssim_score < self.threshold:
+                        self.threshold = avg_ssim_score * 0.9
+                    if score > self.similarity_threshold:
+                        continue  # Images are similar, do not save
+
+                keyframe_due = last_keyframe_at is None or captured_at - last_keyframe_at >= KEYFRAME_INTERVAL
+                event = build_capture_event(screenshot_np, frame, last_frame, captured_at, keyframe_due)
+                if event['regions'] is None:
+                    last_keyframe_at = captured_at
+                last_frame = frame
+
+                self.encode_slots.acquire()
+                try:
+                    self.encoder.submit(self.encode_event, event)
+                except Exception:
+                    self.encode_slots.release()
+                    raise
+            except Exception as e:
+                logging.error(f"Error comparing screenshot: {e}", exc_info=True)
+
+    def encode_event(self, event):
+        """Pass a capture event to the sink on an encoder thread."""
+        try:
+            self.sink(event)
+            with self.stats_lock:
+                self.saved_events += 1
+        except Exception as e:
+            logging.error(f"Error saving screenshot: {e}")
+        finally:
+            self.encode_slots.release()
+
+    def run(self, duration):
+        """Run the capture and diff stages until duration elapses or stop() is called."""
+        diff_thread = threading.Thread(target=self.diff_loop, name='screenshot-diff')
+        diff_thread.start()
+        try:
+            self.capture_loop(duration)
+        finally:
+            self.finish_diff_worker(diff_thread)
+            self.encoder.shutdown(wait=True)
+            logging.info(f"Screenshot capture finished: {self.saved_events} saved, "
+                         f"{self.dropped_frames} frames dropped, {self.skipped_ticks} ticks skipped")
+
+    def finish_diff_worker(self, diff_thread):
+        """Tell the diff worker to finish and wait for it.
+
+        The end marker is put with a timeout so that a worker that died with the queue full
+        cannot block shutdown.
+        """
+        while diff_thread.is_alive():
+            try:
+                self.frames.put(None, timeout=0.5)
+                break
+            except queue.Full:
+                continue
+        diff_thread.join()
+
+    def stop(self):
+        """Ask the capture loop to finish after the current frame."""
+        self.stop_event.set()
+
+def run_screenshot_interval(interval, duration, threshold=0.95, buffer_size=10, queue_size=4, encode_workers=2):
+    """Execute taking screenshots at regular intervals for a specified duration, only if changes are detected.
 
-def run_screenshot_interval(interval, duration, threshold=0.95, buffer_size=10):
-    """Execute taking screenshots at regular intervals for a specified duration, only if changes are detected."""
-    start_time = datetime.datetime.now()
+    The adaptive threshold follows the share of the last buffer_size - 1 consecutive frames that were
+    similar at 0.9. Those outcomes come from the one comparison made per screenshot and are kept in a
+    ring buffer, so only the last kept grayscale frame stays resident.
+    """
     daily_folder = create_folder_for_today()
-    last_image = None
-    buffer = []
-
-    while (datetime.datetime.now() - start_time).seconds < duration:
-        last_image = take_screenshot_with_feature_check(daily_folder, last_image)
-        buffer.append(last_image)
-        if len(buffer) > buffer_size:
-            buffer.pop(0)
-        if len(buffer) >= 2:
-            avg_ssim_score = np.mean([combined_similarity_check(buffer[i], buffer[i-1], threshold=0.9) for i in range(1, len(buffer))])
-            if avg_ssim_score < threshold:
-                threshold = avg_ssim_score * 0.9
-        time.sleep(interval)
+    pipeline = CapturePipeline(daily_folder, interval, threshold, buffer_size, queue_size, encode_workers)
+    pipeline.run(duration)
+    return pipeline
 
 if __name__ == "__main__":
     interval_seconds = 2  # Interval between screenshots
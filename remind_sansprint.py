@@ -5,8 +5,6 @@
 import os
 import subprocess
 import threading
-import time
-import json
 import sys
 from pathlib import Path
 import rumps
@@ -29,61 +27,42 @@ base_dir.mkdir(parents=True, exist_ok=True)
 # Path to the regular_db database
 regular_db_path = base_dir / 'regular_data.db'
 
-# Paths to JSON files
-all_texts_path = base_dir / 'all_texts.json'
-new_texts_path = base_dir / 'new_texts.json'
-
 # Script to create the regular_db database if it does not exist
 regular_db_script = resource_path('Regular_database.py')
 
+# Script that adds epoch timestamps to vector store documents written before they carried them
+timestamps_marker_path = base_dir / 'timestamps_migrated'
+migrate_timestamps_script = resource_path('migrate_timestamps.py')
+
+# Script that adds the chunks already in the vector store to the full-text index
+lexical_index_marker_path = base_dir / 'lexical_index_built'
+lexical_index_script = resource_path('lexical_index.py')
+
 # Scripts to run
 scripts = {
     "image_record": resource_path('record_photo.py'),
     "pipeline": resource_path('pipeline_db.py'),
-    "ingestion": resource_path('ingestion.py'),
-    "adding_vectore": resource_path('adding_vectore.py'),
-    "swift": resource_path('swift.py'),
-    "deletedb": resource_path('delete_imagedb.py')
+    "pipeline_daemon": resource_path('pipeline_daemon.py'),
+    "swift": resource_path('swift.py')
 }
 
-# Check and create JSON files if they do not exist
-if not os.path.exists(all_texts_path):
-    sample_data = [
-        {
-            "date": "22 May 2024",
-            "entries": [
-                {
-                    "time": "14:53",
-                    "text": "Sample Data"
-                }
-            ]
-        }
-    ]
-    with open(all_texts_path, 'w') as f:
-        json.dump(sample_data, f, indent=4)
-    logging.debug(f"Created sample all_texts.json at {all_texts_path}")
-
-if not os.path.exists(new_texts_path):
-    sample_data = [
-        {
-            "date": "22 May 2024",
-            "entries": [
-                {
-                    "time": "14:53",
-                    "text": "Sample Data"
-                }
-            ]
-        }
-    ]
-    with open(new_texts_path, 'w') as f:
-        json.dump(sample_data, f)
-    logging.debug(f"Created sample new_texts.json at {new_texts_path}")
+# When True, the pipeline records the screen itself and hands frames to OCR in memory
+# instead of picking up JPEGs written by a separate recorder process
+direct_capture = False
 
 # Check for the existence of the regular_db and run the script if it does not exist
 if not os.path.exists(regular_db_path):
     logging.debug(f"Database not found at {regular_db_path}, running {regular_db_script}")
     subprocess.call(['python', regular_db_script])
 
+# Back-fill the vector store timestamps once, before the query server and the pipeline open it
+if not os.path.exists(timestamps_marker_path):
+    logging.debug(f"Migrating vector store timestamps with {migrate_timestamps_script}")
+    subprocess.call(['python', migrate_timestamps_script])
+if not os.path.exists(lexical_index_marker_path):
+    logging.debug(f"Building the full-text index with {lexical_index_script}")
+    subprocess.call(['python', lexical_index_script])
+
 # List to store all launched processes
 all_processes = []
 
@@ -91,22 +70,17 @@ all_processes = []
 running = True
 
 # Function to run scripts and manage processes
-def run_script(script):
+def run_script(script, *args):
     logging.debug(f"Running script {script}")
-    process = subprocess.Popen(['python', script])
+    process = subprocess.Popen(['python', script, *args])
     all_processes.append(process)
     process.wait()
     logging.debug(f"Completed script {script}")
 
-# Function to run ingestion, adding vectors, and indexing
+# Function to run ingestion, adding vectors, and cleanup; the daemon keeps them resident and
+# triggers them on new transcripts instead of being relaunched every 10 seconds
 def pipeline():
-    global running
-    while running:
-        for script in ["ingestion", "adding_vectore", "deletedb"]:
-            if not running:
-                break
-            run_script(scripts[script])
-        time.sleep(10)
+    run_script(scripts["pipeline_daemon"])
 
 # Function to stop all processes
 def stop_all_processes():
@@ -157,8 +131,12 @@ class RemindEnchantedApp(rumps.App):
 # Main function
 def main():
     # Run audio, image recording, and pipeline scripts
-    for script in ["swift", "image_record", "pipeline"]:
-        threading.Thread(target=run_script, args=(scripts[script],)).start()
+    if direct_capture:
+        threading.Thread(target=run_script, args=(scripts["swift"],)).start()
+        threading.Thread(target=run_script, args=(scripts["pipeline"], '--direct')).start()
+    else:
+        for script in ["swift", "image_record", "pipeline"]:
+            threading.Thread(target=run_script, args=(scripts[script],)).start()
 
     # Start the pipeline in a separate thread
     threading.Thread(target=pipeline).start()
@@ -0,0 +1,93 @@
+# Purpose: This module groups consecutive transcript entries into activity sessions, split on time gaps, content shifts and a token budget, and cuts session text into token-budgeted chunks, so each stretch of activity is embedded once instead of once per screenshot.
+
+import re
+from datetime import datetime, timedelta
+from functools import lru_cache
+import tiktoken
+
+# A pause longer than this ends a session
+SESSION_GAP = timedelta(minutes=5)
+# Tokens per session (and per chunk of an oversized session), header included
+SESSION_TOKEN_BUDGET = 1500
+SESSION_HEADER_TOKENS = 32
+CHUNK_OVERLAP_TOKENS = 150
+# Fraction of an entry's words the session must already contain for the entry to continue it
+SESSION_MIN_OVERLAP = 0.3
+
+WORD_PATTERN = re.compile(r"\w+")
+
+@lru_cache(maxsize=None)
+def get_encoder(name="cl100k_base"):
+    """Return the tiktoken encoder, built once per process."""
+    return tiktoken.get_encoding(name)
+
+def count_tokens(text):
+    return len(get_encoder().encode(text, disallowed_special=()))
+
+def entry_timestamp(entry):
+    """Return the capture time of a log entry, or None if its date or time cannot be read."""
+    try:
+        return datetime.strptime(f"{entry['date']} {entry['time']}", "%d %b %Y %H:%M")
+    except (KeyError, ValueError):
+        return None
+
+def entry_line(entry):
+    return f"[{entry['time']}] {entry['text']}"
+
+def continues_session(session, entry, timestamp, words, tokens, gap, token_budget, min_overlap):
+    """Decide whether an entry belongs to the session before it."""
+    if timestamp is None or session['end'] is None:
+        return False
+    if timestamp.date() != session['end'].date() or abs(timestamp - session['end']) > gap:
+        return False
+    if session['tokens'] + tokens > token_budget:
+        return False
+    if entry.get('parent') in session['entry_ids']:
+        return True  # A delta only holds the lines it added to an entry of this session
+    return not words or len(words & session['words']) / len(words) >= min_overlap
+
+def build_sessions(entries, gap=SESSION_GAP, token_budget=SESSION_TOKEN_BUDGET, min_overlap=SESSION_MIN_OVERLAP):
+    """Group consecutive entries into sessions.
+
+    A new session starts on a new day, after a pause longer than gap, when the entry would
+    take the session over token_budget, or when too few of its words were seen in the session
+    so far (the screen content moved on). Each session is a dict with its entries, start and
+    end timestamps and token count.
+    """
+    sessions = []
+    current = None
+    for entry in entries:
+        timestamp = entry_timestamp(entry)
+        words = set(WORD_PATTERN.findall(entry['text'].lower()))
+        tokens = count_tokens(entry_line(entry))
+        if current is not None and continues_session(current, entry, timestamp, words, tokens,
+                                                     gap, token_budget, min_overlap):
+            current['entries'].append(entry)
+            current['entry_ids'].add(entry['id'])
+            current['end'] = timestamp
+            current['tokens'] += tokens
+            current['words'] |= words
+        else:
+            current = {"entries": [entry], "entry_ids": {entry['id']}, "start": timestamp, "end": timestamp,
+                       "tokens": SESSION_HEADER_TOKENS + tokens, "words": words}
+            sessions.append(current)
+    return sessions
+
+def session_is_open(session, now, gap=SESSION_GAP):
+    """A session may still grow until gap has passed since its last entry."""
+    return session['end'] is not None and now - session['end'] <= gap
+
+def session_text(session):
+    first, last = session['entries'][0], session['entries'][-1]
+    header = f"Date: {first['date']}, Time: {first['time']} - {last['time']}"
+    return "\n".join([header] + [entry_line(entry) for entry in session['entries']])
+
+def chunk_text(text, token_budget=SESSION_TOKEN_BUDGET, overlap=CHUNK_OVERLAP_TOKENS):
+    """Cut a text into pieces of at most token_budget tokens, consecutive pieces sharing overlap tokens."""
+    encoder = get_encoder()
+    tokens = encoder.encode(text, disallowed_special=())
+    if len(tokens) <= token_budget:
+        return [text]
+    step = token_budget - overlap
+    return [encoder.decode(tokens[start:start + token_budget])
+            for start in range(0, len(tokens) - overlap, step)]
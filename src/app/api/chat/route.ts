@@ -4,10 +4,46 @@ import { NextResponse } from "next/server";
 export const runtime = "edge";
 export const dynamic = "force-dynamic";
 
-interface ServerResponse {
-  status: string;
-  results: string[];
-  message?: string;
+interface ServerEvent {
+  event: string;
+  data: any;
+}
+
+// Parse the server-sent events of /query/stream as they arrive
+async function* readServerEvents(body: ReadableStream<Uint8Array>): AsyncGenerator<ServerEvent> {
+  const reader = body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  try {
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) {
+        return;
+      }
+      buffer += decoder.decode(value, { stream: true });
+
+      let boundary;
+      while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+        const rawEvent = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+
+        let event = "message";
+        let data = "";
+        for (const line of rawEvent.split("\n")) {
+          if (line.startsWith("event: ")) {
+            event = line.slice(7);
+          } else if (line.startsWith("data: ")) {
+            data += line.slice(6);
+          }
+        }
+        yield { event, data: data ? JSON.parse(data) : {} };
+      }
+    }
+  } finally {
+    // Also runs when the client goes away, which closes the connection and cancels the generation
+    await reader.cancel();
+  }
 }
 
 export async function POST(req: Request) {
@@ -15,37 +51,54 @@ export async function POST(req: Request) {
   const lastMessage = messages[messages.length - 1];
 
   try {
-    const response = await fetch('http://localhost:8005/query', {
+    const response = await fetch('http://localhost:8005/query/stream', {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
       },
       body: JSON.stringify({ query: lastMessage.content }),
+      signal: req.signal,
     });
 
-    if (!response.ok) {
+    // The server is at capacity: pass its Retry-After on so the client can wait and try again
+    if (response.status === 429) {
+      const retryAfter = response.headers.get('Retry-After') || '5';
+      return new Response(JSON.stringify({ error: 'The assistant is busy, please retry shortly.' }), {
+        status: 429,
+        headers: { 'Content-Type': 'application/json', 'Retry-After': retryAfter },
+      });
+    }
+
+    if (!response.ok || !response.body) {
       const errorText = await response.text();
       console.error('Server response:', errorText);
       throw new Error(`HTTP error! status: ${response.status}, message: ${errorText}`);
     }
 
-    const data: ServerResponse = await response.json();
-
-    if (data.status === "error") {
-      throw new Error(data.message || "Unknown error occurred");
-    }
-
-    if (!data.results || !Array.isArray(data.results) || data.results.length === 0) {
-      throw new Error('Invalid response format from server');
-    }
+    const events = readServerEvents(response.body);
+    const encoder = new TextEncoder();
 
-    const aiResponse = data.results[0];
-
-    // Create a ReadableStream from the AI response
+    // Forward the answer tokens as the server produces them
     const stream = new ReadableStream({
-      start(controller) {
-        controller.enqueue(new TextEncoder().encode(aiResponse));
-        controller.close();
+      async pull(controller) {
+        while (true) {
+          const { done, value } = await events.next();
+          if (done || value.event === "done") {
+            controller.close();
+            return;
+          }
+          if (value.event === "error") {
+            controller.error(new Error(value.data.message || "Unknown error occurred"));
+            return;
+          }
+          if (value.event === "token") {
+            controller.enqueue(encoder.encode(value.data.text));
+            return;
+          }
+        }
+      },
+      async cancel() {
+        await events.return(undefined);
       },
     });
 
@@ -53,7 +106,7 @@ export async function POST(req: Request) {
   } catch (error: unknown) {
     console.error('Error:', error);
     let errorMessage = 'An error occurred while processing your request.';
-    
+
     if (error instanceof Error) {
       errorMessage = error.message;
     }
@@ -63,4 +116,4 @@ export async function POST(req: Request) {
       headers: { 'Content-Type': 'application/json' },
     });
   }
-}
\ No newline at end of file
+}
@@ -0,0 +1,118 @@
+# Purpose: This script serves a stand-in for the Ollama HTTP API for load tests of swift.py: /api/generate streams a canned answer token by token after a prompt-processing delay, /api/embeddings returns a vector derived from the text, and /stats tells how many generations are running and waiting. Like Ollama, it only works on a few generations at a time and queues the rest, so a test shows whether swift.py keeps that queue short. Point swift.py at it with OLLAMA_HOST.
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    """Ollama's /api/generate and /api/embeddings, timed by the class settings."""
+
+    parallel = threading.Semaphore(1)
+    prefill_ms = 200.0
+    token_ms = 20.0
+    tokens = 40
+    dimensions = 768
+    lock = threading.Lock()
+    waiting = 0
+    generating = 0
+
+    def do_GET(self):
+        # Not part of Ollama's API: the generations in progress and waiting, for the load script
+        if self.path != "/stats":
+            self.send_response(404)
+            self.end_headers()
+            return
+        with self.lock:
+            stats = {"generating": self.generating, "waiting": self.waiting}
+        self.send_json(stats)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        if self.path == "/api/embeddings":
+            self.embeddings(body)
+        elif self.path == "/api/generate":
+            self.generate(body)
+        else:
+            self.send_response(404)
+            self.end_headers()
+
+    def embeddings(self, body):
+        seed = hashlib.sha256(body["prompt"].encode('utf-8')).digest()
+        self.send_json({"embedding": [seed[i % len(seed)] / 255 for i in range(self.dimensions)]})
+
+    def generate(self, body):
+        cls = type(self)
+        with cls.lock:
+            cls.waiting += 1
+        cls.parallel.acquire()
+        with cls.lock:
+            cls.waiting -= 1
+            cls.generating += 1
+        try:
+            time.sleep(self.prefill_ms / 1000)
+            if not body.get("stream", True):
+                time.sleep(self.tokens * self.token_ms / 1000)
+                self.send_json({"model": body.get("model"), "response": self.answer(self.tokens), "done": True})
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+            for index in range(self.tokens):
+                time.sleep(self.token_ms / 1000)
+                self.write_line({"model": body.get("model"), "response": f"word{index} ", "done": False})
+            self.write_line({"model": body.get("model"), "response": "", "done": True, "eval_count": self.tokens})
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client went away; stop generating, as Ollama does
+        finally:
+            with cls.lock:
+                cls.generating -= 1
+            cls.parallel.release()
+
+    def answer(self, tokens):
+        return "".join(f"word{index} " for index in range(tokens))
+
+    def write_line(self, data):
+        self.wfile.write((json.dumps(data) + "\n").encode('utf-8'))
+        self.wfile.flush()
+
+    def send_json(self, data):
+        payload = json.dumps(data).encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a stand-in Ollama API for load tests.")
+    parser.add_argument('--port', type=int, default=11435)
+    parser.add_argument('--parallel', type=int, default=1, help="generations worked on at the same time")
+    parser.add_argument('--prefill-ms', type=float, default=200.0)
+    parser.add_argument('--token-ms', type=float, default=20.0)
+    parser.add_argument('--tokens', type=int, default=40)
+    args = parser.parse_args()
+
+    StubOllamaHandler.parallel = threading.Semaphore(args.parallel)
+    StubOllamaHandler.prefill_ms = args.prefill_ms
+    StubOllamaHandler.token_ms = args.token_ms
+    StubOllamaHandler.tokens = args.tokens
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), StubOllamaHandler)
+    server.daemon_threads = True
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    logging.info(f"Stand-in Ollama on http://127.0.0.1:{args.port}, {args.parallel} generations at a time")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,29 @@
 import logging
 from pathlib import Path
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_socketio import SocketIO
 from flask_cors import CORS
 from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import OllamaEmbeddings
 from langchain_community.llms import Ollama
-from langchain.chains import RetrievalQA
 from langchain.schema import Document
 from datetime import datetime, timedelta
+import argparse
 import json
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import namedtuple
+from query_router import day_range, route_query
+from answer_context import StageTimer, build_answer_prompt
+from lexical_index import LexicalIndex
+from hybrid_retrieval import reciprocal_rank_fusion, search_within_budget
+from answer_cache import AnswerCache, document_span
+from embedding_cache import CachedEmbeddings, EmbeddingCache, is_transient
+from add_queue import AddQueue
+from admission import DeadlineExceeded, GenerationLimiter, Overloaded
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -21,14 +35,32 @@ base_dir = Path.home() / 'Library' / 'Application Support' / 'RemindEnchanted'
 persist_directory = base_dir / 'vectoreDB'
 persist_directory.mkdir(parents=True, exist_ok=True)
 
-embedding_model = OllamaEmbeddings(model='nomic-embed-text')
-llm = Ollama(model="llama3.1")
+# The Ollama server, set like Ollama's own clients do, so a stand-in server can be used for load tests
+ollama_url = os.environ.get('OLLAMA_HOST', 'http://localhost:11434')
+if '://' not in ollama_url:
+    ollama_url = f"http://{ollama_url}"
+
+# Same vectors as OllamaEmbeddings ("passage: " and "query: " prefixes included), but documents are
+# embedded in concurrent batches through the shared cache
+embedding_model = CachedEmbeddings(model='nomic-embed-text', base_url=ollama_url, cache=EmbeddingCache())
+llm = Ollama(model="llama3.1", base_url=ollama_url)
+# Bounds the generations sent to Ollama; configured from the command line
+limiter = GenerationLimiter()
 vectorstore = None
-retriever = None
-qa_chain = None
+lexical_index = None
+answer_cache = None
+add_queue = None
+retrieval_pool = ThreadPoolExecutor(max_workers=8)
+
+# Documents embedded and persisted together by the bulk add writer, and seconds between its commits
+ADD_BATCH_SIZE = 256
+ADD_COMMIT_INTERVAL = 1.0
+# Longest wait between tries while the embedding server is unavailable
+ADD_MAX_BACKOFF = 60.0
+add_writer_wakeup = threading.Event()
 
 def initialize_vectorstore():
-    global vectorstore, retriever, qa_chain
+    global vectorstore, lexical_index, answer_cache, add_queue
     try:
         if persist_directory.exists():
             logging.info("Loading existing vector store")
@@ -38,24 +70,122 @@ def initialize_vectorstore():
             logging.info("Creating new vector store")
             vectorstore = Chroma(embedding_function=embedding_model, persist_directory=str(persist_directory))
             logging.info("New vector store created successfully")
-        
-        retriever = vectorstore.as_retriever(search_kwargs={"k": 5})
-        qa_chain = RetrievalQA.from_chain_type(llm=llm, chain_type="stuff", retriever=retriever)
-        logging.info("Retriever and QA chain initialized successfully")
+        lexical_index = LexicalIndex()
+        answer_cache = AnswerCache()
+        add_queue = AddQueue()
     except Exception as e:
         logging.error(f"Error initializing vector store: {e}", exc_info=True)
 
+def index_documents(doc_ids, texts, metadatas):
+    """Embed documents into the vector store with one persist, index them for full-text search and
+    drop the cached answers they change."""
+    docs = [Document(page_content=text, metadata=metadata) for text, metadata in zip(texts, metadatas)]
+    vectorstore.add_documents(docs, ids=doc_ids)
+    vectorstore.persist()
+    # The same ids in both stores, so the full-text search finds the documents too
+    if lexical_index is not None:
+        lexical_index.add(doc_ids, texts, metadatas)
+    if answer_cache is not None:
+        answer_cache.invalidate({document_span(metadata) for metadata in metadatas})
+
 def add_new_document(text, metadata):
-    global vectorstore
     try:
-        doc = Document(page_content=text, metadata=metadata)
-        vectorstore.add_documents([doc])
-        vectorstore.persist()
+        index_documents([f"added-{uuid.uuid4()}"], [text], [metadata])
         logging.info("New document added to the vector store")
     except Exception as e:
         logging.error(f"Error adding new document: {e}", exc_info=True)
 
-def classify_question(question):
+def add_writer():
+    """Index the queued bulk documents, every ADD_COMMIT_INTERVAL seconds or as soon as a full batch is queued.
+
+    Each batch is embedded and persisted at once and only then marked indexed; a batch
+    interrupted by a crash is indexed again under the same ids, which replaces it. While the
+    embedding server is unavailable nothing is charged an attempt; the writer waits twice as
+    long between tries, up to ADD_MAX_BACKOFF seconds.
+    """
+    backoff = 0
+    while True:
+        if backoff:
+            time.sleep(backoff)
+        else:
+            add_writer_wakeup.wait(ADD_COMMIT_INTERVAL)
+        add_writer_wakeup.clear()
+        try:
+            while True:
+                batch = add_queue.next_batch(ADD_BATCH_SIZE)
+                if not batch or not index_batch(batch) or len(batch) < ADD_BATCH_SIZE:
+                    break
+            backoff = 0
+        except Exception as e:
+            backoff = min(backoff * 2 or ADD_COMMIT_INTERVAL * 2, ADD_MAX_BACKOFF)
+            logging.warning(f"Could not index the queued documents ({e}), trying again in {backoff:.0f} s")
+
+def index_batch(batch):
+    """Index one queued batch; returns False if one of its documents failed.
+
+    A failing batch is indexed again one document at a time (see index_one_by_one), so only
+    a document that fails on its own is charged an attempt. Errors of an unavailable
+    embedding server are raised instead, without charging any.
+    """
+    doc_ids = [doc_id for doc_id, _, _ in batch]
+    try:
+        start = time.perf_counter()
+        index_documents(doc_ids, [text for _, text, _ in batch], [metadata for _, _, metadata in batch])
+        add_queue.mark_indexed(doc_ids)
+        logging.info(f"Indexed {len(batch)} queued documents in {time.perf_counter() - start:.2f} s")
+        return True
+    except Exception as e:
+        if is_transient(e):
+            raise
+        logging.error(f"Error indexing {len(batch)} queued documents: {e}", exc_info=True)
+    return index_one_by_one(batch)
+
+def index_one_by_one(batch):
+    """Index the documents of a failed batch one at a time; returns False if one of them fails.
+
+    The failing document is charged an attempt and the rest stay queued for the next commit.
+    """
+    for doc_id, text, metadata in batch:
+        try:
+            index_documents([doc_id], [text], [metadata])
+            add_queue.mark_indexed([doc_id])
+        except Exception as e:
+            if is_transient(e):
+                raise
+            logging.error(f"Error indexing queued document {doc_id}: {e}")
+            add_queue.mark_failed([doc_id], e)
+            return False
+    return True
+
+def ask_llm(prompt, admission=None):
+    """Run one LLM call, in a generation slot of the request's admission if there is one.
+
+    With an admission the call runs in a worker thread and is waited for until the deadline;
+    past it, DeadlineExceeded is raised and the call keeps the slot until Ollama is done.
+    """
+    if admission is None:
+        return llm(prompt)
+    while not admission.wait_for_slot():
+        pass
+    free_slot = admission.detach_slot()
+    result = Future()
+
+    def generate():
+        try:
+            result.set_result(llm(prompt))
+        except Exception as e:
+            result.set_exception(e)
+        finally:
+            free_slot()
+
+    threading.Thread(target=generate, name='llm-call', daemon=True).start()
+    while True:
+        try:
+            return result.result(timeout=max(admission.remaining(), 0))
+        except FutureTimeout:
+            admission.check_deadline()
+
+def classify_question(question, admission=None):
     prompt = f"""Determine if the following question requires searching a knowledge base about the user's personal information and activities, or if it can be answered with general knowledge.
 
 Question: {question}
@@ -65,10 +195,10 @@ If the question can be answered with general knowledge or does not require perso
 
 Response:"""
 
-    response = llm(prompt)
+    response = ask_llm(prompt, admission)
     return "SEARCH_REQUIRED" in response
 
-def determine_time_range(question):
+def determine_time_range(question, admission=None):
     prompt = f"""Analyze the following question and determine the time range it refers to.
 
 Question: {question}
@@ -82,7 +212,7 @@ Respond with one of the following:
 
 Response:"""
 
-    response = llm(prompt).strip().upper()
+    response = ask_llm(prompt, admission).strip().upper()
     return response if response in ["TODAY", "YESTERDAY", "WEEK", "MONTH"] else "ALL"
 
 def get_date_range(time_range):
@@ -101,13 +231,39 @@ def get_date_range(time_range):
     else:
         return None, None  # For "ALL" or undefined ranges
 
-def filter_documents_by_date(docs, start_date, end_date):
-    if start_date is None or end_date is None:
-        return docs
-    return [
-        doc for doc in docs 
-        if start_date <= datetime.strptime(doc.metadata.get('date', '1970-01-01'), '%Y-%m-%d').date() <= end_date
-    ]
+def llm_time_range(question, admission=None):
+    """Ask the LLM for the time range of a question the local parser could not read."""
+    time_range = determine_time_range(question, admission)
+    start_date, end_date = get_date_range(time_range)
+    return day_range(start_date, end_date, time_range.lower()) if start_date else None
+
+def retrieve_documents(query_text, time_range, k=5, query_embedding=None):
+    """Run the vector search and the full-text search inside the time window and fuse their results.
+
+    Both searches run concurrently under one latency budget and keep k results each, all from
+    the window: a document matches when the span between its timestamp and end_timestamp
+    metadata (epoch seconds) overlaps the window. The rankings are fused with reciprocal rank
+    fusion, keyed by the chunk text, which both stores hold alike. A query_embedding already
+    computed for the question is searched with instead of embedding it again.
+    """
+    where, start, end = None, None, None
+    if time_range is not None:
+        start, end = time_range.start.timestamp(), time_range.end.timestamp()
+        where = {"$and": [{"timestamp": {"$lte": end}}, {"end_timestamp": {"$gte": start}}]}
+
+    def vector_search():
+        if query_embedding is not None:
+            docs = vectorstore.similarity_search_by_vector(query_embedding, k=k, filter=where)
+        else:
+            docs = vectorstore.similarity_search(query_text, k=k, filter=where)
+        return [(doc.page_content, doc) for doc in docs]
+
+    def text_search():
+        return [(text, Document(page_content=text, metadata=metadata))
+                for text, metadata in lexical_index.search(query_text, k, start, end)]
+
+    searches = [vector_search] if lexical_index is None else [vector_search, text_search]
+    return reciprocal_rank_fusion(search_within_budget(retrieval_pool, searches), k)
 
 @app.route('/')
 def index():
@@ -121,50 +277,310 @@ def add_document():
     if not text:
         return jsonify({"status": "error", "message": "No text provided"}), 400
     
-    # Ensure the metadata includes the current date
-    metadata['date'] = datetime.now().strftime('%Y-%m-%d')
+    # Ensure the metadata includes the current date, in the format the capture pipeline uses, and its timestamps
+    now = datetime.now()
+    metadata['date'] = now.strftime('%d %b %Y')
+    metadata['time'] = now.strftime('%H:%M')
+    metadata['timestamp'] = metadata['end_timestamp'] = now.timestamp()
     
     add_new_document(text, metadata)
     return jsonify({"status": "success", "message": "Document added successfully"}), 200
 
+def read_bulk_documents():
+    """Return the documents of a bulk /add request: a JSON array, {"documents": [...]} or NDJSON lines,
+    each {"text": ..., "metadata": {...}}. Raises ValueError on a malformed request."""
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        items = [json.loads(line) for line in request.get_data(as_text=True).splitlines() if line.strip()]
+    else:
+        data = request.get_json(silent=True)
+        items = data.get('documents') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        raise ValueError("Expected a non-empty list of documents")
+    for number, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get('text'), str) or not item['text'].strip():
+            raise ValueError(f"Document {number} has no text")
+        # The vector store only takes flat metadata; one bad document would fail its whole batch
+        metadata = item.get('metadata', {})
+        if not isinstance(metadata, dict) or not all(isinstance(value, (str, int, float, bool)) for value in metadata.values()):
+            raise ValueError(f"Document {number} has invalid metadata: values must be strings, numbers or booleans")
+    return items
+
+@app.route('/add/bulk', methods=['POST'])
+def add_bulk_documents():
+    """Queue many documents for indexing and return their ids at once (202).
+
+    A document keeps its own "timestamp" (epoch seconds, and "end_timestamp" if it spans a
+    while), so backfilled notes and transcripts land at the time they were written; the
+    others are stamped with the time they were received. Their progress is at /add/status.
+    """
+    if add_queue is None:
+        return jsonify({"status": "error", "message": "Add queue not initialized. Check server logs for details."}), 500
+    try:
+        items = read_bulk_documents()
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    now = datetime.now()
+    documents = []
+    for item in items:
+        metadata = dict(item.get('metadata', {}))
+        when = now
+        if isinstance(metadata.get('timestamp'), (int, float)) and not isinstance(metadata['timestamp'], bool):
+            try:
+                when = datetime.fromtimestamp(metadata['timestamp'])
+            except (OverflowError, OSError, ValueError):
+                return jsonify({"status": "error", "message": f"Invalid timestamp: {metadata['timestamp']}"}), 400
+        metadata['date'] = when.strftime('%d %b %Y')
+        metadata['time'] = when.strftime('%H:%M')
+        metadata['timestamp'] = when.timestamp()
+        end = metadata.get('end_timestamp')
+        if not isinstance(end, (int, float)) or isinstance(end, bool) or end < metadata['timestamp']:
+            metadata['end_timestamp'] = metadata['timestamp']
+        documents.append((f"added-{uuid.uuid4()}", item['text'], metadata))
+
+    add_queue.enqueue(documents)
+    if len(documents) >= ADD_BATCH_SIZE:
+        add_writer_wakeup.set()
+    return jsonify({"status": "accepted", "ids": [doc_id for doc_id, _, _ in documents]}), 202
+
+@app.route('/add/status', methods=['GET'])
+def add_status():
+    """Return the number of bulk documents in each status and, for ?ids=a,b,..., the status of each."""
+    if add_queue is None:
+        return jsonify({"status": "error", "message": "Add queue not initialized. Check server logs for details."}), 500
+    ids = [doc_id for doc_id in request.args.get('ids', '').split(',') if doc_id]
+    return jsonify({"status": "success", "counts": add_queue.counts(), "documents": add_queue.status(ids)}), 200
+
+# How a question will be answered: the prompt to send to the LLM and the context packed into
+# it, or a ready reply and no prompt; time_range, embedding and retrieved_at let the answer be cached
+AnswerPlan = namedtuple('AnswerPlan', ['prompt', 'context', 'prompt_tokens', 'reply', 'time_range', 'embedding',
+                                       'retrieved_at'])
+
+def plan_answer(query_text, timer, admission=None):
+    """Route a question, then take its answer from the cache or retrieve its context.
+
+    The reply is ready when the answer was cached or nothing was found in the time range.
+    """
+    # Routed locally; the LLM is only asked when the wording is ambiguous
+    needs_search, time_range = route_query(query_text, lambda question: classify_question(question, admission),
+                                           lambda question: llm_time_range(question, admission))
+    timer.mark("route")
+    if not needs_search:
+        # Question can be answered with general knowledge
+        return AnswerPlan(query_text, [], 0, None, None, None, None)
+
+    # Question requires searching the knowledge base; the same embedding finds a cached
+    # answer to a reworded question and searches the vector store
+    query_embedding = embedding_model.embed_query(query_text)
+    retrieved_at = time.time()
+    cached = answer_cache.lookup(query_text, time_range, query_embedding) if answer_cache is not None else None
+    timer.mark("cache")
+    if cached is not None:
+        answer, context = cached
+        return AnswerPlan(None, context, 0, answer, time_range, None, None)
+
+    filtered_docs = retrieve_documents(query_text, time_range, query_embedding=query_embedding)
+    timer.mark("retrieve")
+    if not filtered_docs:
+        start_date, end_date = (time_range.start.date(), time_range.end.date()) if time_range else (None, None)
+        return AnswerPlan(None, [], 0, f"I couldn't find any relevant information for the specified time range ({time_range.label if time_range else 'all'} - {start_date} to {end_date}). Could you please rephrase your question or specify a different time range?", time_range, None, None)
+
+    # Generate a response that interprets what you might have been doing, from one retrieval
+    # and one LLM call, with the context packed to a token budget
+    prompt, context, prompt_tokens = build_answer_prompt(query_text, [doc.page_content for doc in filtered_docs])
+    timer.mark("pack")
+    return AnswerPlan(prompt, context, prompt_tokens, None, time_range, query_embedding, retrieved_at)
+
+def remember_answer(query_text, plan, answer):
+    """Cache the LLM's answer to a knowledge base question."""
+    if answer_cache is None or plan.embedding is None:
+        return
+    if not answer_cache.store(query_text, plan.time_range, answer, plan.context, plan.embedding, plan.retrieved_at):
+        logging.info("Answer not cached: documents were added to its time range while it was generated")
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def answer_tokens(prompt, admission, timer, wait_interval=1.0):
+    """Generate an answer in one of the admission's generation slots, yielding its chunks.
+
+    Yields None every wait_interval seconds while the request waits for a slot, so a caller
+    can show it is queued. The stream is read by a worker thread (see stream_answer), so
+    DeadlineExceeded is raised once the request runs past its deadline, even while Ollama is
+    still processing the prompt. Raising it or closing this generator stops the generation.
+    """
+    chunks = queue.Queue()
+    stop = threading.Event()
+    try:
+        while not admission.wait_for_slot(wait_interval):
+            yield None
+        timer.mark("queue")
+        threading.Thread(target=stream_answer, args=(prompt, chunks, stop, admission.detach_slot()),
+                         name='llm-stream', daemon=True).start()
+        first = True
+        while True:
+            try:
+                chunk = chunks.get(timeout=max(admission.remaining(), 0))
+            except queue.Empty:
+                admission.check_deadline()
+                continue
+            if chunk is None:
+                break
+            if isinstance(chunk, Exception):
+                raise chunk
+            if first:
+                timer.mark("first token")
+                first = False
+            admission.check_deadline()
+            yield chunk
+        timer.mark("generate")
+    finally:
+        stop.set()
+        admission.release_slot()
+
+def stream_answer(prompt, chunks, stop, free_slot):
+    """Put the chunks of llm.stream(prompt) on the chunks queue, then None (or the error).
+
+    Once stop is set the stream is closed at its next chunk, which drops the connection to
+    Ollama; the generation slot is only given back with free_slot() after that.
+    """
+    tokens = None
+    try:
+        tokens = llm.stream(prompt)
+        for chunk in tokens:
+            if stop.is_set():
+                break
+            chunks.put(chunk)
+        chunks.put(None)
+    except Exception as e:
+        chunks.put(e)
+    finally:
+        if tokens is not None:
+            tokens.close()
+        free_slot()
+
+def overloaded_response(error):
+    response = jsonify({"status": "error", "message": str(error)})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 429
+
 @app.route('/query', methods=['POST'])
 def query_endpoint():
-    if not qa_chain or not llm:
-        return jsonify({"status": "error", "message": "QA chain or LLM not initialized. Check server logs for details."}), 500
+    if vectorstore is None or not llm:
+        return jsonify({"status": "error", "message": "Vector store or LLM not initialized. Check server logs for details."}), 500
+
+    query_text = request.json.get('query')
+    try:
+        admission = limiter.admit()
+    except Overloaded as e:
+        logging.warning(f"Query rejected: {e}")
+        return overloaded_response(e)
+
+    with admission:
+        try:
+            timer = StageTimer()
+            plan = plan_answer(query_text, timer, admission)
+            ai_response = plan.reply
+            if plan.prompt is not None:
+                ai_response = "".join(chunk for chunk in answer_tokens(plan.prompt, admission, timer) if chunk is not None)
+                remember_answer(query_text, plan, ai_response)
+            logging.info(f"Query answered: {timer.summary()}, {plan.prompt_tokens} prompt tokens")
+
+            return jsonify({
+                "status": "success",
+                "results": [ai_response],
+                "context": plan.context
+            }), 200
+        except DeadlineExceeded as e:
+            logging.warning(f"Query timed out after {timer.summary()}")
+            return jsonify({"status": "error", "message": str(e)}), 504
+        except Exception as e:
+            logging.error(f"Error processing query: {e}")
+            return jsonify({"status": "error", "message": "An error occurred while processing the query."}), 500
+
+@app.route('/query/stream', methods=['POST'])
+def query_stream_endpoint():
+    """Answer a question as server-sent events: "context" once retrieval is done, "queued" while it
+    waits for a generation slot, then "token" events as the LLM writes, then "done" (or "error").
+
+    When the admission queue is full, the request is turned away with a 429 and Retry-After
+    before any event is sent. If the client disconnects, the server closes this generator at
+    its next write, including a "queued" event, and the LLM stream is closed at its next
+    chunk, which drops the connection to Ollama so that it stops generating.
+    """
+    if vectorstore is None or not llm:
+        return jsonify({"status": "error", "message": "Vector store or LLM not initialized. Check server logs for details."}), 500
 
     query_text = request.json.get('query')
     try:
-        if classify_question(query_text):
-            # Question requires searching the knowledge base
-            time_range = determine_time_range(query_text)
-            start_date, end_date = get_date_range(time_range)
-            relevant_docs = retriever.invoke(query_text)
-            filtered_docs = filter_documents_by_date(relevant_docs, start_date, end_date)
-            
-            if filtered_docs:
-                # Generate a response that interprets what you might have been doing
-                context = "\n".join([doc.page_content for doc in filtered_docs])
-                ai_response = qa_chain.run(f"Given the following context: \n\n{context}\n\n Answer the question: '{query_text}' by interpreting what the user was likely doing with this information. Answer specifically the question about the specific subject with the context you have and nothing else.")
-                ai_response = ai_response
+        admission = limiter.admit()
+    except Overloaded as e:
+        logging.warning(f"Query rejected: {e}")
+        return overloaded_response(e)
+
+    def generate():
+        timer = StageTimer()
+        tokens = None
+        try:
+            plan = plan_answer(query_text, timer, admission)
+            yield sse_event("context", {"context": plan.context})
+            if plan.prompt is None:
+                yield sse_event("token", {"text": plan.reply})
             else:
-                ai_response = f"I couldn't find any relevant information for the specified time range ({time_range.lower()} - {start_date} to {end_date}). Could you please rephrase your question or specify a different time range?"
-            
-            context = [doc.page_content for doc in filtered_docs]
-        else:
-            # Question can be answered with general knowledge
-            ai_response = llm(query_text)
-            context = []
-
-        return jsonify({
-            "status": "success",
-            "results": [ai_response],
-            "context": context
-        }), 200
-    except Exception as e:
-        logging.error(f"Error processing query: {e}")
-        return jsonify({"status": "error", "message": "An error occurred while processing the query."}), 500
+                tokens = answer_tokens(plan.prompt, admission, timer)
+                answer = []
+                for chunk in tokens:
+                    if chunk is None:
+                        yield sse_event("queued", {"queued": limiter.stats()["queued"]})
+                        continue
+                    answer.append(chunk)
+                    yield sse_event("token", {"text": chunk})
+                # Only a complete answer is cached
+                remember_answer(query_text, plan, "".join(answer))
+            yield sse_event("done", {})
+            logging.info(f"Query streamed: {timer.summary()}, {plan.prompt_tokens} prompt tokens")
+        except GeneratorExit:
+            logging.info(f"Client disconnected, query cancelled after {timer.summary()}")
+            raise
+        except DeadlineExceeded as e:
+            logging.warning(f"Query timed out after {timer.summary()}")
+            yield sse_event("error", {"message": str(e)})
+        except Exception as e:
+            logging.error(f"Error processing query: {e}")
+            yield sse_event("error", {"message": "An error occurred while processing the query."})
+        finally:
+            if tokens is not None:
+                tokens.close()
+            admission.release()
+
+    response = Response(generate(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # The generator's cleanup does not run if the client leaves before the first event
+    response.call_on_close(admission.release)
+    return response
+
+@app.route('/query/stats', methods=['GET'])
+def query_stats():
+    return jsonify({"status": "success", **limiter.stats()}), 200
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    if answer_cache is None:
+        return jsonify({"status": "error", "message": "Answer cache not initialized."}), 500
+    return jsonify({"status": "success", **answer_cache.stats()}), 200
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve chat queries and document adds for ReMind.")
+    parser.add_argument('--port', type=int, default=8005)
+    parser.add_argument('--max-generations', type=int, default=limiter.max_generations,
+                        help="LLM generations sent to Ollama at the same time")
+    parser.add_argument('--max-queued', type=int, default=limiter.max_queued,
+                        help="queries allowed to wait for a generation before new ones get a 429")
+    parser.add_argument('--deadline', type=float, default=limiter.deadline, help="seconds a query may take")
+    args = parser.parse_args()
+    limiter = GenerationLimiter(args.max_generations, args.max_queued, args.deadline)
+
     initialize_vectorstore()
-    logging.info("Server is starting...")
-    socketio.run(app, host='0.0.0.0', port=8005, debug=False)
+    if add_queue is not None:
+        threading.Thread(target=add_writer, name="add-writer", daemon=True).start()
+    logging.info(f"Server is starting, {args.max_generations} generations at a time, {args.max_queued} queued...")
+    socketio.run(app, host='0.0.0.0', port=args.port, debug=False)
@@ -0,0 +1,90 @@
+# Purpose: This module suppresses near-duplicate OCR results: consecutive screenshots whose text barely changed are dropped, or stored as only their new lines with a pointer to the entry they extend.
+
+import hashlib
+import re
+import logging
+from collections import Counter, deque
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+def simhash(text, bits=64):
+    """Return the SimHash fingerprint of a text, built from its word counts."""
+    weights = [0] * bits
+    for token, count in Counter(TOKEN_PATTERN.findall(text.lower())).items():
+        token_hash = int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=bits // 8).digest(), 'big')
+        for bit in range(bits):
+            weights[bit] += count if token_hash >> bit & 1 else -count
+    return sum(1 << bit for bit in range(bits) if weights[bit] > 0)
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+def text_lines(text):
+    """Return the non-empty, whitespace-normalised lines of a text."""
+    return [" ".join(line.split()) for line in text.splitlines() if line.strip()]
+
+def line_similarity(lines, parent_lines):
+    """Jaccard similarity of two sets of lines."""
+    lines, parent_lines = set(lines), set(parent_lines)
+    if not lines and not parent_lines:
+        return 1.0
+    return len(lines & parent_lines) / len(lines | parent_lines)
+
+class TextDeduplicator:
+    """Compare each OCR result with the recent full entries and decide how to store it.
+
+    SimHash fingerprints find candidate parents cheaply (within max_distance bits); a candidate
+    is confirmed when the line sets are at least `threshold` similar. A confirmed near-duplicate
+    with no new lines is dropped; otherwise only its new lines are stored as a delta that points
+    at the parent. Deltas are never parents themselves, so they do not chain. Calls must be
+    serialized by the caller, in the order the entries are saved.
+    """
+
+    def __init__(self, threshold=0.8, max_distance=12, window=20):
+        self.threshold = threshold
+        self.max_distance = max_distance
+        self.recent = deque(maxlen=window)
+        self.documents_dropped = 0
+        self.deltas_stored = 0
+        self.bytes_saved = 0
+
+    def check(self, text):
+        """Classify a text.
+
+        Returns (action, stored_text, parent) where action is "full", "delta" or "drop". For
+        "full", parent is the new entry's own record, whose row_id the caller fills in once the
+        entry is saved; for "delta", it is the record of the entry the new lines extend.
+        """
+        fingerprint = simhash(text)
+        lines = text_lines(text)
+        for parent in reversed(self.recent):
+            if hamming_distance(fingerprint, parent['fingerprint']) > self.max_distance:
+                continue
+            if line_similarity(lines, parent['lines']) < self.threshold:
+                continue
+
+            known = set(parent['lines'])
+            new_lines = [line for line in lines if line not in known]
+            if not new_lines:
+                self.documents_dropped += 1
+                self.bytes_saved += len(text.encode('utf-8'))
+                self.report()
+                return "drop", None, parent
+
+            delta = "\n".join(new_lines)
+            self.deltas_stored += 1
+            self.bytes_saved += len(text.encode('utf-8')) - len(delta.encode('utf-8'))
+            self.report()
+            return "delta", delta, parent
+
+        record = {"fingerprint": fingerprint, "lines": lines, "row_id": None}
+        self.recent.append(record)
+        return "full", text, record
+
+    def report(self):
+        if (self.documents_dropped + self.deltas_stored) % 50 == 0:
+            logging.info(self.summary())
+
+    def summary(self):
+        return (f"Text dedup: {self.documents_dropped} near-duplicate documents dropped, "
+                f"{self.deltas_stored} stored as deltas, {self.bytes_saved:,} bytes saved")
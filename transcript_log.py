@@ -0,0 +1,169 @@
+# Purpose: This module keeps the OCR transcripts in an append-only log of JSON-lines segment files, which readers consume incrementally from a saved cursor instead of reloading and rewriting one big JSON file.
+
+import json
+import os
+import time
+import logging
+from collections import defaultdict
+from pathlib import Path
+
+# Define the log directory
+base_dir = Path.home() / 'Library' / 'Application Support' / 'RemindEnchanted'
+transcripts_dir = base_dir / 'transcripts'
+cursors_dir = transcripts_dir / 'cursors'
+
+SEGMENT_PREFIX = 'segment-'
+SEGMENT_SUFFIX = '.jsonl'
+
+def segment_path(directory, number):
+    """Return the path of a numbered segment file."""
+    return Path(directory) / f"{SEGMENT_PREFIX}{number:08d}{SEGMENT_SUFFIX}"
+
+def list_segments(directory=transcripts_dir):
+    """Return the numbers of the existing segment files in ascending order."""
+    directory = Path(directory)
+    if not directory.exists():
+        return []
+    return sorted(int(path.name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+                  for path in directory.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}"))
+
+def repair_segment(path):
+    """Cut a torn trailing line left by a crash mid-write, so the segment ends on a complete entry."""
+    with open(path, 'rb+') as f:
+        size = f.seek(0, os.SEEK_END)
+        end, position = 0, size
+        while position > 0:
+            step = min(4096, position)
+            f.seek(position - step)
+            newline = f.read(step).rfind(b'\n')
+            if newline != -1:
+                end = position - step + newline + 1
+                break
+            position -= step
+        if end != size:
+            logging.warning(f"Truncating torn entry at the end of {path}")
+            f.truncate(end)
+
+def fsync_directory(directory):
+    """Make a file creation or rename in directory durable."""
+    fd = os.open(str(directory), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+class TranscriptLog:
+    """Append-only writer for the transcript log.
+
+    Every entry is one JSON line, written through to the OS at once; fsync is batched every
+    fsync_every entries or fsync_interval seconds. When the active segment would grow past
+    max_segment_bytes it is synced and closed before the next segment is created, so a reader
+    that sees segment n + 1 knows segment n is complete.
+    """
+
+    def __init__(self, directory=transcripts_dir, max_segment_bytes=16 * 1024 * 1024, fsync_every=20,
+                 fsync_interval=5.0):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_segment_bytes = max_segment_bytes
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+
+        segments = list_segments(self.directory)
+        self.segment = segments[-1] if segments else 1
+        path = segment_path(self.directory, self.segment)
+        if path.exists():
+            repair_segment(path)
+        self.file = open(path, 'ab')
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def append(self, entry):
+        """Append one entry (a JSON-serialisable dict) to the log."""
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode('utf-8')
+        if self.file.tell() and self.file.tell() + len(line) > self.max_segment_bytes:
+            self.rotate()
+        self.file.write(line)
+        self.file.flush()
+        self.unsynced += 1
+        if self.unsynced >= self.fsync_every or time.monotonic() - self.last_sync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self):
+        """Force the written entries to disk."""
+        if self.unsynced:
+            os.fsync(self.file.fileno())
+            self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def rotate(self):
+        """Seal the active segment and start the next one."""
+        self.sync()
+        self.file.close()
+        self.segment += 1
+        self.file = open(segment_path(self.directory, self.segment), 'xb')
+        fsync_directory(self.directory)
+        logging.info(f"Transcript log rotated to segment {self.segment}")
+
+    def close(self):
+        self.sync()
+        self.file.close()
+
+def read_entries(cursor=None, directory=transcripts_dir, limit=None):
+    """Return the complete entries written after cursor, and the cursor to resume from.
+
+    A cursor is a (segment, byte offset) pair; None starts at the oldest segment. A line that
+    is still being written is left for the next call.
+    """
+    directory = Path(directory)
+    if cursor is None:
+        segments = list_segments(directory)
+        cursor = (segments[0] if segments else 1, 0)
+    segment, offset = cursor
+
+    entries = []
+    while limit is None or len(entries) < limit:
+        # Check for the next segment before reading: if it already exists, this one is complete
+        sealed = segment_path(directory, segment + 1).exists()
+        path = segment_path(directory, segment)
+        if path.exists():
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b"\n") or (limit is not None and len(entries) >= limit):
+                        break
+                    entries.append(json.loads(line))
+                    offset += len(line)
+        if not sealed or (limit is not None and len(entries) >= limit):
+            break
+        segment, offset = segment + 1, 0
+    return entries, (segment, offset)
+
+def cursor_path(name):
+    return cursors_dir / f"{name}.json"
+
+def load_cursor(name):
+    """Load a reader's saved cursor, or None if it has not read anything yet."""
+    path = cursor_path(name)
+    if path.exists():
+        with open(path, 'r') as f:
+            return tuple(json.load(f))
+    return None
+
+def save_cursor(name, cursor):
+    """Save a reader's cursor atomically (write to a temporary file, then rename)."""
+    cursors_dir.mkdir(parents=True, exist_ok=True)
+    path = cursor_path(name)
+    temp_path = path.with_suffix('.tmp')
+    with open(temp_path, 'w') as f:
+        json.dump(list(cursor), f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+def group_by_date(entries):
+    """Build the [{"date": ..., "entries": [...]}] view of a list of log entries, keeping their order."""
+    grouped = defaultdict(list)
+    for entry in entries:
+        grouped[entry['date']].append({key: value for key, value in entry.items() if key != 'date'})
+    return [{"date": date, "entries": items} for date, items in grouped.items()]